@@ -2478,6 +2478,11 @@ static int hostapd_config_fill(struct hostapd_config *conf,
 			return 1;
 		}
 		conf->acs_num_scans = val;
+#ifdef CONFIG_TESTING_OPTIONS
+	} else if (os_strcmp(buf, "acs_survey_replay") == 0) {
+		os_free(conf->acs_survey_replay);
+		conf->acs_survey_replay = os_strdup(pos);
+#endif /* CONFIG_TESTING_OPTIONS */
 #endif /* CONFIG_ACS */
 	} else if (os_strcmp(buf, "dtim_period") == 0) {
 		bss->dtim_period = atoi(pos);
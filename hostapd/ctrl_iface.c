@@ -1026,6 +1026,103 @@ static int hostapd_ctrl_iface_get_config(struct hostapd_data *hapd,
 }
 
 
+static void hostapd_disconnect_deny_mac(struct hostapd_data *hapd)
+{
+	struct sta_info *sta;
+	int vlan_id;
+
+	for (sta = hapd->sta_list; sta; sta = sta->next) {
+		if (hostapd_maclist_found(hapd->conf->deny_mac,
+					  hapd->conf->num_deny_mac, sta->addr,
+					  &vlan_id) &&
+		    (!vlan_id || vlan_id == sta->vlan_id))
+			ap_sta_disconnect(hapd, sta, sta->addr,
+					  WLAN_REASON_UNSPECIFIED);
+	}
+}
+
+
+static void hostapd_disconnect_accept_mac(struct hostapd_data *hapd)
+{
+	struct sta_info *sta;
+	int vlan_id;
+
+	if (hapd->conf->macaddr_acl != DENY_UNLESS_ACCEPTED)
+		return;
+
+	for (sta = hapd->sta_list; sta; sta = sta->next) {
+		if (!hostapd_maclist_found(hapd->conf->accept_mac,
+					   hapd->conf->num_accept_mac,
+					   sta->addr, &vlan_id) ||
+		    (vlan_id && vlan_id != sta->vlan_id))
+			ap_sta_disconnect(hapd, sta, sta->addr,
+					  WLAN_REASON_UNSPECIFIED);
+	}
+}
+
+
+/*
+ * ACCEPT_ACL/DENY_ACL ADD_MAC <addr> [VLAN_ID=<id>] and
+ * ACCEPT_ACL/DENY_ACL DEL_MAC <addr> update a single entry of the
+ * accept_mac/deny_mac list without reading and sorting the full list again.
+ */
+static int hostapd_ctrl_iface_acl(struct hostapd_data *hapd, char *cmd,
+				  int accept)
+{
+	struct mac_acl_entry **list;
+	int *num;
+	u8 addr[ETH_ALEN];
+	long vlan_id = 0;
+	char *pos, *end;
+
+	if (accept) {
+		list = &hapd->conf->accept_mac;
+		num = &hapd->conf->num_accept_mac;
+	} else {
+		list = &hapd->conf->deny_mac;
+		num = &hapd->conf->num_deny_mac;
+	}
+
+	if (os_strncmp(cmd, "ADD_MAC ", 8) == 0) {
+		if (hwaddr_aton(cmd + 8, addr))
+			return -1;
+		pos = os_strstr(cmd + 8, " VLAN_ID=");
+		if (pos) {
+			pos += 9;
+			errno = 0;
+			vlan_id = strtol(pos, &end, 10);
+			if (errno || end == pos ||
+			    (*end != '\0' && *end != ' ') ||
+			    vlan_id < 0 || vlan_id > MAX_VLAN_ID)
+				return -1;
+		}
+		if (hostapd_maclist_add(list, num, addr, vlan_id))
+			return -1;
+		/*
+		 * Adding an entry may also change the VLAN of an existing one,
+		 * so check the associated stations against the updated list.
+		 */
+		if (accept)
+			hostapd_disconnect_accept_mac(hapd);
+		else
+			hostapd_disconnect_deny_mac(hapd);
+	} else if (os_strncmp(cmd, "DEL_MAC ", 8) == 0) {
+		if (hwaddr_aton(cmd + 8, addr))
+			return -1;
+		if (hostapd_maclist_del(*list, num, addr))
+			return -1;
+		if (accept)
+			hostapd_disconnect_accept_mac(hapd);
+	} else {
+		return -1;
+	}
+
+	wpa_printf(MSG_DEBUG, "%s_ACL %s: %d entries",
+		   accept ? "ACCEPT" : "DENY", cmd, *num);
+	return 0;
+}
+
+
 static int hostapd_ctrl_iface_set(struct hostapd_data *hapd, char *cmd)
 {
 	char *value;
@@ -1076,37 +1173,14 @@ static int hostapd_ctrl_iface_set(struct hostapd_data *hapd, char *cmd)
 		hapd->ext_mgmt_frame_handling = atoi(value);
 #endif /* CONFIG_TESTING_OPTIONS */
 	} else {
-		struct sta_info *sta;
-		int vlan_id;
-
 		ret = hostapd_set_iface(hapd->iconf, hapd->conf, cmd, value);
 		if (ret)
 			return ret;
 
-		if (os_strcasecmp(cmd, "deny_mac_file") == 0) {
-			for (sta = hapd->sta_list; sta; sta = sta->next) {
-				if (hostapd_maclist_found(
-					    hapd->conf->deny_mac,
-					    hapd->conf->num_deny_mac, sta->addr,
-					    &vlan_id) &&
-				    (!vlan_id || vlan_id == sta->vlan_id))
-					ap_sta_disconnect(
-						hapd, sta, sta->addr,
-						WLAN_REASON_UNSPECIFIED);
-			}
-		} else if (hapd->conf->macaddr_acl == DENY_UNLESS_ACCEPTED &&
-			   os_strcasecmp(cmd, "accept_mac_file") == 0) {
-			for (sta = hapd->sta_list; sta; sta = sta->next) {
-				if (!hostapd_maclist_found(
-					    hapd->conf->accept_mac,
-					    hapd->conf->num_accept_mac,
-					    sta->addr, &vlan_id) ||
-				    (vlan_id && vlan_id != sta->vlan_id))
-					ap_sta_disconnect(
-						hapd, sta, sta->addr,
-						WLAN_REASON_UNSPECIFIED);
-			}
-		}
+		if (os_strcasecmp(cmd, "deny_mac_file") == 0)
+			hostapd_disconnect_deny_mac(hapd);
+		else if (os_strcasecmp(cmd, "accept_mac_file") == 0)
+			hostapd_disconnect_accept_mac(hapd);
 	}
 
 	return ret;
@@ -1535,6 +1609,12 @@ static void hostapd_ctrl_iface_receive(int sock, void *eloop_ctx,
 	} else if (os_strncmp(buf, "GET ", 4) == 0) {
 		reply_len = hostapd_ctrl_iface_get(hapd, buf + 4, reply,
 						   reply_size);
+	} else if (os_strncmp(buf, "ACCEPT_ACL ", 11) == 0) {
+		if (hostapd_ctrl_iface_acl(hapd, buf + 11, 1))
+			reply_len = -1;
+	} else if (os_strncmp(buf, "DENY_ACL ", 9) == 0) {
+		if (hostapd_ctrl_iface_acl(hapd, buf + 9, 0))
+			reply_len = -1;
 	} else if (os_strncmp(buf, "ENABLE", 6) == 0) {
 		if (hostapd_ctrl_iface_enable(hapd->iface))
 			reply_len = -1;
@@ -64,6 +64,10 @@ static const char *commands_help =
 "   new_sta <addr>       add a new station\n"
 "   deauthenticate <addr>  deauthenticate a station\n"
 "   disassociate <addr>  disassociate a station\n"
+"   accept_acl <ADD_MAC|DEL_MAC> <addr> [VLAN_ID=<id>]\n"
+"                        add/remove an accept_mac entry\n"
+"   deny_acl <ADD_MAC|DEL_MAC> <addr>\n"
+"                        add/remove a deny_mac entry\n"
 #ifdef CONFIG_IEEE80211W
 "   sa_query <addr>      send SA Query to a station\n"
 #endif /* CONFIG_IEEE80211W */
@@ -346,6 +350,42 @@ static int hostapd_cli_cmd_disassociate(struct wpa_ctrl *ctrl, int argc,
 }
 
 
+static int hostapd_cli_cmd_acl(struct wpa_ctrl *ctrl, const char *acl,
+			       int argc, char *argv[])
+{
+	char buf[128];
+	int res;
+
+	if (argc < 2) {
+		printf("Invalid '%s' command - at least two arguments, "
+		       "ADD_MAC/DEL_MAC and STA address, are required.\n",
+		       acl);
+		return -1;
+	}
+	res = os_snprintf(buf, sizeof(buf), "%s %s %s%s%s", acl, argv[0],
+			  argv[1], argc > 2 ? " " : "", argc > 2 ? argv[2] : "");
+	if (res < 0 || (size_t) res >= sizeof(buf) - 1) {
+		printf("Too long %s command.\n", acl);
+		return -1;
+	}
+	return wpa_ctrl_command(ctrl, buf);
+}
+
+
+static int hostapd_cli_cmd_accept_acl(struct wpa_ctrl *ctrl, int argc,
+				      char *argv[])
+{
+	return hostapd_cli_cmd_acl(ctrl, "ACCEPT_ACL", argc, argv);
+}
+
+
+static int hostapd_cli_cmd_deny_acl(struct wpa_ctrl *ctrl, int argc,
+				    char *argv[])
+{
+	return hostapd_cli_cmd_acl(ctrl, "DENY_ACL", argc, argv);
+}
+
+
 #ifdef CONFIG_IEEE80211W
 static int hostapd_cli_cmd_sa_query(struct wpa_ctrl *ctrl, int argc,
 				    char *argv[])
@@ -978,6 +1018,8 @@ static struct hostapd_cli_cmd hostapd_cli_commands[] = {
 	{ "new_sta", hostapd_cli_cmd_new_sta },
 	{ "deauthenticate", hostapd_cli_cmd_deauthenticate },
 	{ "disassociate", hostapd_cli_cmd_disassociate },
+	{ "accept_acl", hostapd_cli_cmd_accept_acl },
+	{ "deny_acl", hostapd_cli_cmd_deny_acl },
 #ifdef CONFIG_IEEE80211W
 	{ "sa_query", hostapd_cli_cmd_sa_query },
 #endif /* CONFIG_IEEE80211W */
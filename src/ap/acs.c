@@ -737,6 +737,95 @@ fail:
 }
 
 
+#ifdef CONFIG_TESTING_OPTIONS
+static int acs_survey_replay(struct hostapd_iface *iface)
+{
+	const char *fname = iface->conf->acs_survey_replay;
+	FILE *f;
+	char buf[200], *pos;
+	union wpa_event_data event;
+	struct freq_survey *survey, *tmp;
+	int scan, replay_scan, num_scans = 0, line = 0, ret = 0, nf;
+	unsigned int freq;
+	unsigned long long chan_time, busy, rx, tx;
+
+	f = fopen(fname, "r");
+	if (f == NULL) {
+		wpa_printf(MSG_ERROR, "ACS: Could not open survey replay file '%s'",
+			   fname);
+		return -1;
+	}
+
+	while (fgets(buf, sizeof(buf), f)) {
+		if (buf[0] == '#' || buf[0] == '\n')
+			continue;
+		scan = atoi(buf);
+		if (scan >= num_scans)
+			num_scans = scan + 1;
+	}
+	if (num_scans == 0) {
+		wpa_printf(MSG_ERROR, "ACS: No survey data in '%s'", fname);
+		fclose(f);
+		return -1;
+	}
+	replay_scan = iface->acs_num_completed_scans % num_scans;
+	rewind(f);
+
+	os_memset(&event, 0, sizeof(event));
+	dl_list_init(&event.survey_results.survey_list);
+
+	while (fgets(buf, sizeof(buf), f)) {
+		line++;
+		pos = os_strchr(buf, '\n');
+		if (pos)
+			*pos = '\0';
+		if (buf[0] == '#' || buf[0] == '\0')
+			continue;
+		if (sscanf(buf, "%d %u %d %llu %llu %llu %llu", &scan, &freq,
+			   &nf, &chan_time, &busy, &rx, &tx) != 7) {
+			wpa_printf(MSG_ERROR, "ACS: Invalid survey replay line %d: '%s'",
+				   line, buf);
+			ret = -1;
+			break;
+		}
+		if (scan != replay_scan)
+			continue;
+
+		survey = os_zalloc(sizeof(*survey));
+		if (survey == NULL) {
+			ret = -1;
+			break;
+		}
+		survey->freq = freq;
+		survey->nf = nf;
+		survey->channel_time = chan_time;
+		survey->channel_time_busy = busy;
+		survey->channel_time_rx = rx;
+		survey->channel_time_tx = tx;
+		survey->filled = SURVEY_HAS_NF | SURVEY_HAS_CHAN_TIME |
+			SURVEY_HAS_CHAN_TIME_BUSY | SURVEY_HAS_CHAN_TIME_RX |
+			SURVEY_HAS_CHAN_TIME_TX;
+		dl_list_add_tail(&event.survey_results.survey_list,
+				 &survey->list);
+	}
+	fclose(f);
+
+	wpa_printf(MSG_DEBUG, "ACS: Replaying survey data for scan %d from '%s'",
+		   replay_scan, fname);
+	if (ret == 0)
+		wpa_supplicant_event(iface->bss[0], EVENT_SURVEY, &event);
+
+	dl_list_for_each_safe(survey, tmp, &event.survey_results.survey_list,
+			      struct freq_survey, list) {
+		dl_list_del(&survey->list);
+		os_free(survey);
+	}
+
+	return ret;
+}
+#endif /* CONFIG_TESTING_OPTIONS */
+
+
 static void acs_scan_complete(struct hostapd_iface *iface)
 {
 	int err;
@@ -746,6 +835,11 @@ static void acs_scan_complete(struct hostapd_iface *iface)
 	wpa_printf(MSG_DEBUG, "ACS: Using survey based algorithm (acs_num_scans=%d)",
 		   iface->conf->acs_num_scans);
 
+#ifdef CONFIG_TESTING_OPTIONS
+	if (iface->conf->acs_survey_replay && iface->conf->acs_survey_replay[0])
+		err = acs_survey_replay(iface);
+	else
+#endif /* CONFIG_TESTING_OPTIONS */
 	err = hostapd_drv_get_survey(iface->bss[0], 0);
 	if (err) {
 		wpa_printf(MSG_ERROR, "ACS: Failed to get survey data");
@@ -314,10 +314,94 @@ static int hostapd_derive_psk(struct hostapd_ssid *ssid)
 }
 
 
+void hostapd_wpa_psk_index_free(struct hostapd_ssid *ssid)
+{
+	if (ssid->wpa_psk_index == NULL)
+		return;
+	os_free(ssid->wpa_psk_index->hash);
+	os_free(ssid->wpa_psk_index);
+	ssid->wpa_psk_index = NULL;
+}
+
+
+static size_t wpa_psk_hash(const u8 *addr, size_t hash_size)
+{
+	u32 h = WPA_GET_BE32(addr + 2);
+
+	h ^= h >> 16;
+	h *= 0x45d9f3b;
+	h ^= h >> 16;
+	return h & (hash_size - 1);
+}
+
+
+static void hostapd_wpa_psk_index_build(struct hostapd_ssid *ssid)
+{
+	struct hostapd_wpa_psk_index *idx;
+	struct hostapd_wpa_psk *psk, **entries;
+	unsigned int count = 0, i;
+	size_t h;
+
+	hostapd_wpa_psk_index_free(ssid);
+
+	for (psk = ssid->wpa_psk; psk; psk = psk->next)
+		count++;
+	if (count == 0)
+		return;
+
+	idx = os_zalloc(sizeof(*idx));
+	entries = os_calloc(count, sizeof(*entries));
+	if (idx == NULL || entries == NULL)
+		goto fail;
+	idx->hash_size = 16;
+	while (idx->hash_size < count)
+		idx->hash_size <<= 1;
+	idx->hash = os_calloc(idx->hash_size, sizeof(*idx->hash));
+	if (idx->hash == NULL)
+		goto fail;
+
+	for (psk = ssid->wpa_psk, i = 0; psk; psk = psk->next, i++) {
+		psk->pos = i;
+		entries[i] = psk;
+	}
+
+	/* Insert in reverse order to keep the chains in list order */
+	for (i = count; i > 0; i--) {
+		psk = entries[i - 1];
+		if (psk->group) {
+			psk->hnext = idx->group;
+			idx->group = psk;
+		} else {
+			h = wpa_psk_hash(psk->addr, idx->hash_size);
+			psk->hnext = idx->hash[h];
+			idx->hash[h] = psk;
+		}
+	}
+	os_free(entries);
+
+	idx->list = ssid->wpa_psk;
+	ssid->wpa_psk_index = idx;
+	wpa_printf(MSG_DEBUG, "Indexed %u WPA PSK entries (%u hash buckets)",
+		   count, (unsigned int) idx->hash_size);
+	return;
+
+fail:
+	/* The PSK lookup falls back to walking the list without an index */
+	wpa_printf(MSG_INFO, "WPA PSK index allocation failed - use linear "
+		   "PSK lookup");
+	os_free(entries);
+	if (idx)
+		os_free(idx->hash);
+	os_free(idx);
+}
+
+
 int hostapd_setup_wpa_psk(struct hostapd_bss_config *conf)
 {
 	struct hostapd_ssid *ssid = &conf->ssid;
 
+	hostapd_wpa_psk_index_free(ssid);
+
 	if (ssid->wpa_passphrase != NULL) {
 		if (ssid->wpa_psk != NULL) {
 			wpa_printf(MSG_DEBUG, "Using pre-configured WPA PSK "
@@ -335,6 +419,7 @@ int hostapd_setup_wpa_psk(struct hostapd_bss_config *conf)
 		if (hostapd_config_read_wpa_psk(ssid->wpa_psk_file,
 						&conf->ssid))
 			return -1;
+		hostapd_wpa_psk_index_build(ssid);
 	}
 
 	return 0;
@@ -404,6 +489,7 @@ void hostapd_config_free_bss(struct hostapd_bss_config *conf)
 	if (conf == NULL)
 		return;
 
+	hostapd_wpa_psk_index_free(&conf->ssid);
 	psk = conf->ssid.wpa_psk;
 	while (psk) {
 		prev = psk;
@@ -566,6 +652,9 @@ void hostapd_config_free(struct hostapd_config *conf)
 	os_free(conf->supported_rates);
 	os_free(conf->basic_rates);
 	os_free(conf->chanlist);
+#if defined(CONFIG_ACS) && defined(CONFIG_TESTING_OPTIONS)
+	os_free(conf->acs_survey_replay);
+#endif /* CONFIG_ACS && CONFIG_TESTING_OPTIONS */
 
 	os_free(conf);
 }
@@ -607,6 +696,87 @@ int hostapd_maclist_found(struct mac_acl_entry *list, int num_entries,
 }
 
 
+/**
+ * hostapd_maclist_add - Add a MAC address to a sorted list
+ * @list: Pointer to the list (reallocated as needed)
+ * @num_entries: Pointer to the number of entries in the list
+ * @addr: MAC address to add
+ * @vlan_id: VLAN ID for the entry
+ * Returns: 0 on success, -1 on failure
+ *
+ * The entry is inserted in sorted order so that the list does not need to
+ * be sorted again. If the address is already in the list, its VLAN ID is
+ * updated.
+ */
+int hostapd_maclist_add(struct mac_acl_entry **list, int *num_entries,
+			const u8 *addr, int vlan_id)
+{
+	struct mac_acl_entry *newacl;
+	int start, end, middle, res;
+
+	start = 0;
+	end = *num_entries - 1;
+	while (start <= end) {
+		middle = (start + end) / 2;
+		res = os_memcmp((*list)[middle].addr, addr, ETH_ALEN);
+		if (res == 0) {
+			(*list)[middle].vlan_id = vlan_id;
+			return 0;
+		}
+		if (res < 0)
+			start = middle + 1;
+		else
+			end = middle - 1;
+	}
+
+	newacl = os_realloc_array(*list, *num_entries + 1, sizeof(**list));
+	if (newacl == NULL)
+		return -1;
+	*list = newacl;
+	if (start < *num_entries)
+		os_memmove(&newacl[start + 1], &newacl[start],
+			   (*num_entries - start) * sizeof(*newacl));
+	os_memcpy(newacl[start].addr, addr, ETH_ALEN);
+	newacl[start].vlan_id = vlan_id;
+	(*num_entries)++;
+
+	return 0;
+}
+
+
+/**
+ * hostapd_maclist_del - Remove a MAC address from a sorted list
+ * @list: The list
+ * @num_entries: Pointer to the number of entries in the list
+ * @addr: MAC address to remove
+ * Returns: 0 if the address was removed, -1 if it was not in the list
+ */
+int hostapd_maclist_del(struct mac_acl_entry *list, int *num_entries,
+			const u8 *addr)
+{
+	int start, end, middle, res;
+
+	start = 0;
+	end = *num_entries - 1;
+	while (start <= end) {
+		middle = (start + end) / 2;
+		res = os_memcmp(list[middle].addr, addr, ETH_ALEN);
+		if (res == 0) {
+			os_remove_in_array(list, *num_entries, sizeof(*list),
+					   middle);
+			(*num_entries)--;
+			return 0;
+		}
+		if (res < 0)
+			start = middle + 1;
+		else
+			end = middle - 1;
+	}
+
+	return -1;
+}
+
+
 int hostapd_rate_found(int *list, int rate)
 {
 	int i;
@@ -646,11 +816,43 @@ const char * hostapd_get_vlan_id_ifname(struct hostapd_vlan *vlan, int vlan_id)
 }
 
 
+static const u8 * hostapd_get_psk_index(struct hostapd_wpa_psk_index *idx,
+					 const u8 *addr, const u8 *prev_psk)
+{
+	struct hostapd_wpa_psk *sta, *group, *psk;
+	int next_ok = prev_psk == NULL;
+
+	sta = idx->hash[wpa_psk_hash(addr, idx->hash_size)];
+	group = idx->group;
+	for (;;) {
+		while (sta && os_memcmp(sta->addr, addr, ETH_ALEN) != 0)
+			sta = sta->hnext;
+		if (sta && (group == NULL || sta->pos < group->pos)) {
+			psk = sta;
+			sta = sta->hnext;
+		} else if (group) {
+			psk = group;
+			group = group->hnext;
+		} else {
+			break;
+		}
+
+		if (next_ok)
+			return psk->psk;
+		if (psk->psk == prev_psk)
+			next_ok = 1;
+	}
+
+	return NULL;
+}
+
+
 const u8 * hostapd_get_psk(const struct hostapd_bss_config *conf,
 			   const u8 *addr, const u8 *p2p_dev_addr,
 			   const u8 *prev_psk)
 {
 	struct hostapd_wpa_psk *psk;
+	struct hostapd_wpa_psk_index *idx = conf->ssid.wpa_psk_index;
 	int next_ok = prev_psk == NULL;
 
 	if (p2p_dev_addr && !is_zero_ether_addr(p2p_dev_addr)) {
@@ -662,6 +864,8 @@ const u8 * hostapd_get_psk(const struct hostapd_bss_config *conf,
 		wpa_printf(MSG_DEBUG, "Searching a PSK for " MACSTR
 			   " prev_psk=%p",
 			   MAC2STR(addr), prev_psk);
+		if (idx && idx->list == conf->ssid.wpa_psk)
+			return hostapd_get_psk_index(idx, addr, prev_psk);
 	}
 
 	for (psk = conf->ssid.wpa_psk; psk != NULL; psk = psk->next) {
@@ -61,6 +61,7 @@ struct hostapd_ssid {
 	secpolicy security_policy;
 
 	struct hostapd_wpa_psk *wpa_psk;
+	struct hostapd_wpa_psk_index *wpa_psk_index;
 	char *wpa_passphrase;
 	char *wpa_psk_file;
 
@@ -105,12 +106,30 @@ struct hostapd_sta_wpa_psk_short {
 
 struct hostapd_wpa_psk {
 	struct hostapd_wpa_psk *next;
+	struct hostapd_wpa_psk *hnext; /* next entry in the same index chain */
+	unsigned int pos; /* position in the wpa_psk list when indexed */
 	int group;
 	u8 psk[PMK_LEN];
 	u8 addr[ETH_ALEN];
 	u8 p2p_dev_addr[ETH_ALEN];
 };
 
+/**
+ * struct hostapd_wpa_psk_index - Lookup index for a large wpa_psk list
+ *
+ * Per-station entries are hashed by the station address and wildcard
+ * entries are kept in a separate list; both chains are in wpa_psk list
+ * order, so lookups return the PSKs in the same order as a list walk. The
+ * index is only used while ssid->wpa_psk still points to the list it was
+ * built for.
+ */
+struct hostapd_wpa_psk_index {
+	struct hostapd_wpa_psk *list;
+	struct hostapd_wpa_psk *group;
+	struct hostapd_wpa_psk **hash;
+	size_t hash_size;
+};
+
 struct hostapd_eap_user {
 	struct hostapd_eap_user *next;
 	u8 *identity;
@@ -598,6 +617,9 @@ struct hostapd_config {
 
 #ifdef CONFIG_ACS
 	unsigned int acs_num_scans;
+#ifdef CONFIG_TESTING_OPTIONS
+	char *acs_survey_replay;
+#endif /* CONFIG_TESTING_OPTIONS */
 #endif /* CONFIG_ACS */
 };
 
@@ -611,7 +633,12 @@ void hostapd_config_free_bss(struct hostapd_bss_config *conf);
 void hostapd_config_free(struct hostapd_config *conf);
 int hostapd_maclist_found(struct mac_acl_entry *list, int num_entries,
 			  const u8 *addr, int *vlan_id);
+int hostapd_maclist_add(struct mac_acl_entry **list, int *num_entries,
+			const u8 *addr, int vlan_id);
+int hostapd_maclist_del(struct mac_acl_entry *list, int *num_entries,
+			const u8 *addr);
 int hostapd_rate_found(int *list, int rate);
+void hostapd_wpa_psk_index_free(struct hostapd_ssid *ssid);
 const u8 * hostapd_get_psk(const struct hostapd_bss_config *conf,
 			   const u8 *addr, const u8 *p2p_dev_addr,
 			   const u8 *prev_psk);
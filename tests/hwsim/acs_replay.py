@@ -0,0 +1,181 @@
+# ACS survey trace capture, replay files, and offline channel scoring
+#
+# This software may be distributed under the terms of the BSD license.
+# See README for more details.
+
+import logging
+import random
+import re
+import subprocess
+
+logger = logging.getLogger()
+
+# Enabled 2.4 GHz channels (1-13)
+FREQS_24 = [ 2407 + 5 * c for c in range(1, 14) ]
+
+IW_SURVEY_FIELDS = { 'frequency': 'freq', 'noise': 'nf',
+                     'channel active time': 'time',
+                     'channel busy time': 'busy',
+                     'channel receive time': 'rx',
+                     'channel transmit time': 'tx' }
+
+def parse_iw_survey(text):
+    """Parse 'iw dev <ifname> survey dump' output into a list of survey
+    dictionaries (freq, nf, time, busy, rx, tx); entries without noise,
+    active time, and busy time are skipped like hostapd does"""
+    res = []
+    entry = None
+    for l in text.splitlines():
+        if l.startswith("Survey data from"):
+            entry = {}
+            res.append(entry)
+            continue
+        m = re.match(r'\s+([a-z ]+):\s+(-?\d+)', l)
+        if m and entry is not None and m.group(1) in IW_SURVEY_FIELDS:
+            entry[IW_SURVEY_FIELDS[m.group(1)]] = int(m.group(2))
+    surveys = []
+    for entry in res:
+        if 'freq' not in entry or 'nf' not in entry or \
+           'time' not in entry or 'busy' not in entry:
+            continue
+        entry.setdefault('rx', 0)
+        entry.setdefault('tx', 0)
+        surveys.append(entry)
+    return surveys
+
+def capture_survey(ifname, num_scans):
+    """Record survey data after each of num_scans passive scans"""
+    scans = []
+    for i in range(0, num_scans):
+        subprocess.call([ 'sudo', 'iw', 'dev', ifname, 'scan', 'passive' ],
+                        stdout=subprocess.PIPE)
+        out = subprocess.check_output([ 'sudo', 'iw', 'dev', ifname, 'survey',
+                                        'dump' ])
+        scans.append(parse_iw_survey(out))
+    return scans
+
+def write_trace(fname, scans):
+    """Write a trace (a list of scans, each a list of surveys) in the
+    hostapd acs_survey_replay format"""
+    with open(fname, "w") as f:
+        f.write("# scan freq nf time busy rx tx\n")
+        for i in range(0, len(scans)):
+            for s in scans[i]:
+                f.write("%d %d %d %d %d %d %d\n" % (i, s['freq'], s['nf'],
+                                                    s['time'], s['busy'],
+                                                    s['rx'], s['tx']))
+
+def read_trace(fname):
+    scans = []
+    with open(fname, "r") as f:
+        for l in f:
+            if l.startswith('#') or not l.strip():
+                continue
+            vals = [ int(v) for v in l.split() ]
+            while len(scans) <= vals[0]:
+                scans.append([])
+            scans[vals[0]].append(dict(zip([ 'freq', 'nf', 'time', 'busy',
+                                             'rx', 'tx' ], vals[1:])))
+    return scans
+
+def random_trace(rng, num_scans, freqs=FREQS_24[0:11], num_aps=None):
+    """Generate a trace with neighbor APs whose load leaks to the adjacent
+    channels and varies between scans"""
+    if num_aps is None:
+        num_aps = rng.randint(0, 12)
+    aps = [ (rng.choice(freqs), rng.uniform(0.02, 0.5))
+            for i in range(0, num_aps) ]
+    base_nf = rng.randint(-96, -90)
+    scans = []
+    for i in range(0, num_scans):
+        scan = []
+        for freq in freqs:
+            load = 0.0
+            for (ap_freq, ap_load) in aps:
+                dist = abs(freq - ap_freq) / 5
+                if dist <= 3:
+                    load += ap_load * [ 1.0, 0.6, 0.3, 0.1 ][dist]
+            # traffic bursts make single scans noisy
+            load *= rng.uniform(0.3, 1.7)
+            load = min(load + rng.uniform(0, 0.03), 0.95)
+            time = rng.randint(100, 110)
+            busy = int(time * load)
+            tx = rng.randint(0, 2)
+            scan.append({ 'freq': freq, 'nf': base_nf + rng.randint(0, 3),
+                          'time': time, 'busy': busy + tx,
+                          'rx': busy, 'tx': tx })
+        scans.append(scan)
+    return scans
+
+def interference_factor(survey, min_nf):
+    """Interference factor of a single survey as in acs.c"""
+    busy = float(survey['busy'] - survey['tx'])
+    total = survey['time'] - survey['tx']
+    nf = survey['nf']
+    return 10 ** (nf / 5.0) + \
+        (busy / total) * 2 ** (10 ** (nf / 10.0) - 10 ** (min_nf / 10.0))
+
+def acs_choose(scans, num_scans, freqs=FREQS_24, n_chans=1):
+    """Return the frequency ACS selects after num_scans scans of the trace
+    (replayed in order and repeated as needed) and the total interference
+    factor of each candidate frequency"""
+    surveys = {}
+    for i in range(0, num_scans):
+        for s in scans[i % len(scans)]:
+            if s['freq'] in freqs and s['time'] > s['tx']:
+                surveys.setdefault(s['freq'], []).append(s)
+    if not surveys:
+        return None, {}
+    min_nf = min([ s['nf'] for l in surveys.values() for s in l ])
+    chan_factor = {}
+    for freq, l in surveys.items():
+        chan_factor[freq] = sum([ interference_factor(s, min_nf)
+                                  for s in l ]) / len(l)
+
+    totals = {}
+    ideal = None
+    for freq in freqs:
+        if any([ freq + j * 20 not in freqs for j in range(1, n_chans) ]):
+            continue
+        factor = 0
+        for j in range(0, n_chans):
+            factor += chan_factor.get(freq + j * 20, 0)
+            if freq < 4000:
+                for adj in [ -5, -10, 5, 10 ]:
+                    factor += chan_factor.get(freq + j * 20 + adj, 0)
+        totals[freq] = factor
+        if freq in chan_factor and (ideal is None or factor < totals[ideal]):
+            ideal = freq
+    return ideal, totals
+
+def evaluate(traces, num_scans_list, reference_scans=None):
+    """Evaluate ACS channel choices over a set of traces for different
+    acs_num_scans values
+
+    The choice with reference_scans scans (default: all scans in each
+    trace) is used as the reference; the result tells how often each
+    acs_num_scans value picks the same channel and the mean increase in
+    the total interference factor (as a ratio) of the channel it picks."""
+    res = {}
+    for num_scans in num_scans_list:
+        res[num_scans] = { 'same': 0, 'regret': 0.0 }
+    for scans in traces:
+        ref_scans = reference_scans or len(scans)
+        ref, ref_totals = acs_choose(scans, ref_scans)
+        for num_scans in num_scans_list:
+            freq, totals = acs_choose(scans, num_scans)
+            if freq == ref:
+                res[num_scans]['same'] += 1
+            elif freq is not None and ref_totals.get(ref):
+                res[num_scans]['regret'] += ref_totals[freq] / \
+                    ref_totals[ref] - 1
+    for num_scans in num_scans_list:
+        res[num_scans]['same_ratio'] = float(res[num_scans]['same']) / \
+            len(traces)
+        res[num_scans]['regret'] /= len(traces)
+        logger.info("acs_num_scans=%d: same channel as reference in %d/%d traces, mean interference increase %.3f" % (num_scans, res[num_scans]['same'], len(traces), res[num_scans]['regret']))
+    return res
+
+def random_traces(seed, count, num_scans):
+    rng = random.Random(seed)
+    return [ random_trace(rng, num_scans) for i in range(0, count) ]
@@ -0,0 +1,257 @@
+# Synthetic Beacon and Probe Response frame injection
+#
+# This software may be distributed under the terms of the BSD license.
+# See README for more details.
+
+import errno
+import logging
+import select
+import socket
+import subprocess
+import threading
+import time
+
+import frames
+from frames import MgmtFrame, mgmt_frame
+from hwsim import HWSimController, radio_ifname, radio_phy
+
+logger = logging.getLogger()
+
+# Minimal radiotap header (no fields present)
+RADIOTAP_HDR = '\x00\x00\x08\x00\x00\x00\x00\x00'
+
+RATES_B = [ 2, 4, 11, 22 ]
+RATES_G = [ 2, 4, 11, 22, 12, 18, 24, 36, 48, 72, 96, 108 ]
+RATES_A = [ 12, 18, 24, 36, 48, 72, 96, 108 ]
+BASIC_RATES = { 'b': [ 2, 4 ], 'g': [ 2, 4, 11, 22 ], 'a': [ 12, 24, 48 ] }
+
+VHT_CENTER = [ 42, 58, 106, 122, 138, 155 ]
+
+def chan_to_freq(chan):
+    if chan == 14:
+        return 2484
+    if chan < 14:
+        return 2407 + 5 * chan
+    return 5000 + 5 * chan
+
+class BSSSpec(object):
+    """Compact description of a synthetic BSS
+
+    rates is 'b', 'g', or 'a'; ht is None (no HT), '20', '40+', or '40-';
+    vht is None or the VHT operating channel width ('20' or '80'); rsn
+    enables WPA2-PSK/CCMP; interworking adds an Interworking element with
+    an optional HESSID. A spec can also be parsed from a string like
+    "bssid=02:00:00:00:10:00,ssid=test,channel=6,ht=40-,rsn"."""
+
+    __slots__ = [ 'bssid', 'ssid', 'channel', 'rates', 'ht', 'vht', 'rsn',
+                  'interworking', 'hessid', 'beacon_int' ]
+
+    def __init__(self, bssid, ssid, channel=1, rates='g', ht=None, vht=None,
+                 rsn=False, interworking=False, hessid=None, beacon_int=100):
+        self.bssid = bssid
+        self.ssid = ssid
+        self.channel = channel
+        self.rates = rates
+        self.ht = ht
+        self.vht = vht
+        self.rsn = rsn
+        self.interworking = interworking
+        self.hessid = hessid
+        self.beacon_int = beacon_int
+
+    @classmethod
+    def parse(cls, text):
+        args = {}
+        for item in text.split(','):
+            if '=' in item:
+                name, val = item.split('=', 1)
+            else:
+                name, val = item, True
+            if name in [ 'channel', 'beacon_int' ]:
+                val = int(val)
+            args[name] = val
+        return cls(**args)
+
+    @property
+    def freq(self):
+        return chan_to_freq(self.channel)
+
+    def capab(self):
+        capab = frames.WLAN_CAPAB_ESS
+        if self.rsn:
+            capab |= frames.WLAN_CAPAB_PRIVACY
+        if self.rates != 'b':
+            capab |= frames.WLAN_CAPAB_SHORT_SLOT_TIME
+        return capab
+
+    def elements(self):
+        rates = { 'b': RATES_B, 'g': RATES_G, 'a': RATES_A }[self.rates]
+        res = frames.ie_ssid(self.ssid)
+        res += frames.ie_rates(rates, BASIC_RATES[self.rates])
+        res += frames.ie_ds_params(self.channel)
+        if self.rsn:
+            res += frames.ie_rsn_psk()
+        if self.ht:
+            sec = 0
+            if self.ht == '40+':
+                sec = 1
+            elif self.ht == '40-':
+                sec = -1
+            res += frames.ie_ht_capab(ht40=sec != 0)
+            res += frames.ie_ht_oper(self.channel, sec)
+        if self.interworking:
+            res += frames.ie_interworking(hessid=self.hessid)
+        if self.ht and self.vht:
+            width = 0
+            seg0 = 0
+            if self.vht == '80':
+                width = 1
+                for c in VHT_CENTER:
+                    if abs(self.channel - c) <= 6:
+                        seg0 = c
+            res += frames.ie_vht_capab()
+            res += frames.ie_vht_oper(width, seg0)
+        return res
+
+    def frame(self, subtype=frames.MGMT_SUBTYPE_BEACON,
+              da="ff:ff:ff:ff:ff:ff"):
+        body = frames.BEACON_FIXED.pack(0, self.beacon_int, self.capab())
+        return mgmt_frame(MgmtFrame(subtype << 4, da, self.bssid, self.bssid,
+                                    body + self.elements()))
+
+def dense_specs(count, channel=1, prefix="dense", start=0, **kwargs):
+    """Generate count specs with unique BSSIDs and SSIDs; kwargs values
+    that are lists are assigned to the BSSes in round robin order"""
+    res = []
+    for i in range(start, start + count):
+        args = {}
+        for name, val in kwargs.items():
+            args[name] = val[i % len(val)] if isinstance(val, list) else val
+        bssid = "02:be:%02x:%02x:%02x:%02x" % ((i >> 24) & 0xff,
+                                               (i >> 16) & 0xff,
+                                               (i >> 8) & 0xff, i & 0xff)
+        res.append(BSSSpec(bssid, "%s-%d" % (prefix, i), channel, **args))
+    return res
+
+class BSSInjector(object):
+    """Transmit Beacon (or Probe Response) frames for a set of BSSSpecs
+    through a monitor interface on a dynamically created radio
+
+    The frames are built once and then sent back to back (or with a
+    minimum interval between rounds) from a background thread, so a single
+    radio can simulate thousands of BSSes on its channel."""
+
+    def __init__(self, channel):
+        self.hwsim = HWSimController()
+        self.radio = self.hwsim.create_radio()
+        self.channel = channel
+        self.frames = []
+        self.thread = None
+        self.sock = None
+        self.running = False
+        self.sent = 0
+        self.tx_fail = 0
+        self.rounds = 0
+        self.elapsed = 0
+        self.ifname = None
+        try:
+            self.base = radio_ifname(self.radio)
+            self.ifname = "inj%d" % self.radio
+            phy = radio_phy(self.radio)
+            subprocess.call([ 'sudo', 'ip', 'link', 'set', 'dev', self.base,
+                              'down' ])
+            if subprocess.call([ 'sudo', 'iw', 'phy', phy, 'interface', 'add',
+                                 self.ifname, 'type', 'monitor' ]) != 0:
+                raise Exception("Could not add monitor interface on " + phy)
+            subprocess.call([ 'sudo', 'ip', 'link', 'set', 'dev',
+                              self.ifname, 'up' ])
+            if subprocess.call([ 'sudo', 'iw', 'dev', self.ifname, 'set',
+                                 'channel', str(channel) ]) != 0:
+                raise Exception("Could not set monitor interface channel")
+            self.sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW)
+            self.sock.bind((self.ifname, 0))
+        except:
+            self.close()
+            raise
+
+    def add(self, specs, subtype=frames.MGMT_SUBTYPE_BEACON,
+            da="ff:ff:ff:ff:ff:ff"):
+        """Add frames for specs; specs on other channels are ignored"""
+        count = 0
+        for spec in specs:
+            if spec.channel != self.channel:
+                continue
+            self.frames.append(RADIOTAP_HDR + spec.frame(subtype, da))
+            count += 1
+        return count
+
+    def clear(self):
+        self.frames = []
+
+    def _send(self, frame):
+        while True:
+            try:
+                self.sock.send(frame)
+                self.sent += 1
+                return
+            except socket.error, e:
+                if e.errno not in [ errno.ENOBUFS, errno.EAGAIN ]:
+                    raise
+                # TX queue full; wait for it to drain
+                self.tx_fail += 1
+                select.select([], [ self.sock ], [], 0.01)
+
+    def send_round(self):
+        """Send each frame once"""
+        for frame in list(self.frames):
+            if not self.running and self.thread:
+                break
+            self._send(frame)
+        self.rounds += 1
+
+    def _run(self, interval):
+        start = time.time()
+        while self.running:
+            t = time.time()
+            self.send_round()
+            if interval:
+                wait = t + interval - time.time()
+                if wait > 0:
+                    time.sleep(wait)
+        self.elapsed += time.time() - start
+
+    def start(self, interval=None):
+        """Keep sending the frames from a background thread; interval is
+        the minimum time in seconds between the starts of two rounds
+        (e.g., 0.1024 to follow the beacon interval)"""
+        self.stop()
+        self.running = True
+        self.thread = threading.Thread(target=self._run, args=(interval,))
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        if self.thread:
+            self.running = False
+            self.thread.join()
+            self.thread = None
+
+    def stats(self):
+        res = { 'frames': len(self.frames), 'sent': self.sent,
+                'tx_fail': self.tx_fail, 'rounds': self.rounds,
+                'elapsed': self.elapsed }
+        if self.elapsed > 0:
+            res['frames_per_sec'] = self.sent / self.elapsed
+        return res
+
+    def close(self):
+        self.stop()
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+        if self.ifname:
+            subprocess.call([ 'sudo', 'iw', 'dev', self.ifname, 'del' ])
+            self.ifname = None
+        if self.radio is not None:
+            self.hwsim.destroy_radio(self.radio)
+            self.radio = None
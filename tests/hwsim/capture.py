@@ -0,0 +1,92 @@
+# Access to wlantest capture files
+#
+# This software may be distributed under the terms of the BSD license.
+# See README for more details.
+
+import getpass
+import os
+import struct
+import subprocess
+
+from frames import mac2str
+from wlantest import Wlantest
+
+PCAPNG_BLOCK_SECTION_HEADER = 0x0a0d0d0a
+PCAPNG_BLOCK_ENHANCED_PACKET = 6
+
+FC_TYPE_MGMT = 0
+FC_TYPE_DATA = 2
+
+WLAN_ACTION_FT = 6
+
+_BLOCK_HDR = struct.Struct('<II')
+_EPB = struct.Struct('<IIIII')
+_HDR = struct.Struct('<HH6s6s6s')
+_LLC_EAPOL = '\xaa\xaa\x03\x00\x00\x00\x88\x8e'
+
+class CapturedFrame(object):
+    """IEEE 802.11 frame from a capture file with the fields needed for
+    following an exchange between a station and an AP"""
+
+    __slots__ = [ 'ts', 'type', 'subtype', 'addr1', 'addr2', 'addr3',
+                  'protected', 'eapol', 'category' ]
+
+    def __init__(self, ts, frame):
+        (fc, duration, a1, a2, a3) = _HDR.unpack_from(frame)
+        self.ts = ts
+        self.type = (fc >> 2) & 0x3
+        self.subtype = (fc >> 4) & 0xf
+        self.addr1 = mac2str(a1)
+        self.addr2 = mac2str(a2)
+        self.addr3 = mac2str(a3)
+        self.protected = bool(fc & 0x4000)
+        self.eapol = False
+        self.category = None
+        hdrlen = 24
+        if self.type == FC_TYPE_DATA:
+            if self.subtype & 0x08:
+                hdrlen += 2
+            if not self.protected:
+                self.eapol = frame[hdrlen:hdrlen + 8] == _LLC_EAPOL
+        elif self.type == FC_TYPE_MGMT and self.subtype == 13 and \
+             len(frame) > hdrlen:
+            self.category = ord(frame[hdrlen])
+
+    def is_mgmt(self, subtypes):
+        return self.type == FC_TYPE_MGMT and self.subtype in subtypes
+
+    def is_data(self):
+        return self.type == FC_TYPE_DATA and (self.subtype & 0x04) == 0
+
+def read_pcapng(fname, start=None, end=None):
+    """Return the frames captured between start and end (time.time()
+    values) from a wlantest pcapng file"""
+    with open(fname, 'rb') as f:
+        data = f.read()
+    res = []
+    pos = 0
+    while pos + _BLOCK_HDR.size <= len(data):
+        (btype, blen) = _BLOCK_HDR.unpack_from(data, pos)
+        if blen < 12 or pos + blen > len(data):
+            break
+        if btype == PCAPNG_BLOCK_ENHANCED_PACKET:
+            (iface, ts_high, ts_low, caplen, plen) = \
+                _EPB.unpack_from(data, pos + 8)
+            ts = ((ts_high << 32) | ts_low) / 1000000.0
+            if (start is None or ts >= start) and (end is None or ts <= end):
+                pkt = data[pos + 28:pos + 28 + caplen]
+                rtap_len = struct.unpack_from('<H', pkt, 2)[0]
+                if caplen >= rtap_len + _HDR.size:
+                    res.append(CapturedFrame(ts, pkt[rtap_len:]))
+        pos += blen
+    return res
+
+def snapshot(logdir, name):
+    """Move the frames captured so far into logdir/<name>.pcapng and let
+    wlantest continue with a new hwsim0.pcapng"""
+    src = os.path.join(logdir, "hwsim0.pcapng")
+    dst = os.path.join(logdir, name + ".pcapng")
+    os.rename(src, dst)
+    Wlantest().relog()
+    subprocess.call(['sudo', 'chown', '-f', getpass.getuser(), src])
+    return dst
@@ -0,0 +1,177 @@
+# Table-driven EAP server scenarios for protocol tests
+#
+# This software may be distributed under the terms of the BSD license.
+# See README for more details.
+
+import logging
+import struct
+import threading
+
+import radius_srv
+
+logger = logging.getLogger()
+
+EAP_CODE_REQUEST = 1
+EAP_CODE_RESPONSE = 2
+EAP_CODE_SUCCESS = 3
+EAP_CODE_FAILURE = 4
+
+_structs = {}
+
+def packer(fmt):
+    """Return a cached struct.Struct for fmt"""
+    s = _structs.get(fmt)
+    if s is None:
+        s = struct.Struct(fmt)
+        _structs[fmt] = s
+    return s
+
+def eap_message(code, fmt="", *vals, **kwargs):
+    """Reply builder for an EAP packet with the given Code
+
+    fmt and vals describe the payload following the Length field. id_offset
+    can be used to send an unexpected Identifier, set_id to set the
+    Identifier of this and the following messages, and length to override
+    the Length field."""
+    id_offset = kwargs.get('id_offset', 0)
+    set_id = kwargs.get('set_id')
+    s = packer(">BBH" + fmt.lstrip(">"))
+    length = kwargs.get('length', s.size)
+    def build(ctx):
+        if set_id is not None:
+            ctx['id'] = set_id
+        return s.pack(code, (ctx['id'] + id_offset) % 256, length, *vals)
+    return build
+
+def eap_request(eap_type, fmt="", *vals, **kwargs):
+    """Reply builder for an EAP-Request/<eap_type>
+
+    fmt and vals describe the type specific payload following the Type
+    octet; see eap_message() for the keyword arguments."""
+    return eap_message(EAP_CODE_REQUEST, "B" + fmt.lstrip(">"), eap_type,
+                       *vals, **kwargs)
+
+def eap_status(code, id_offset=0):
+    """Reply builder for an EAP-Success or EAP-Failure"""
+    return eap_message(code, id_offset=id_offset)
+
+def eap_success(id_offset=0):
+    return eap_status(EAP_CODE_SUCCESS, id_offset)
+
+def eap_failure(id_offset=0):
+    return eap_status(EAP_CODE_FAILURE, id_offset)
+
+def expect_response(eap_type=None):
+    """Predicate matching an EAP-Response (optionally of the given type)"""
+    def match(req):
+        if len(req) < 4 or ord(req[0]) != EAP_CODE_RESPONSE:
+            return False
+        if eap_type is None:
+            return True
+        return len(req) >= 5 and ord(req[4]) == eap_type
+    return match
+
+class EapStep(object):
+    __slots__ = [ 'desc', 'reply', 'expect' ]
+
+    def __init__(self, desc, reply, expect=None):
+        self.desc = desc
+        self.reply = reply
+        self.expect = expect
+
+class EapScenario(object):
+    """Named list of EapSteps (or (desc, reply, expect) tuples); default is
+    an optional reply builder for the messages after the last step"""
+
+    def __init__(self, name, steps, default=None):
+        self.name = name
+        self.steps = [ s if isinstance(s, EapStep) else EapStep(*s)
+                       for s in steps ]
+        self.default = default
+
+class EapScenarioSession(object):
+    def __init__(self, scenario):
+        self.scenario = scenario
+        self.ctx = { 'num': 0, 'id': 1 }
+        self.mismatches = []
+
+    def process(self, req):
+        """Return the EAP message for the next step; reply builders can
+        access the received EAP packet as ctx['req']"""
+        logger.debug("%s: RX %s" % (self.scenario.name, req.encode("hex")))
+        ctx = self.ctx
+        ctx['num'] += 1
+        ctx['id'] = (ctx['id'] + 1) % 256
+        ctx['req'] = req
+        num = ctx['num']
+        if num > len(self.scenario.steps):
+            if self.scenario.default:
+                return self.scenario.default(ctx)
+            logger.info("%s: no step %d" % (self.scenario.name, num))
+            return None
+        step = self.scenario.steps[num - 1]
+        if step.expect and not step.expect(req):
+            logger.info("%s: step %d (%s): unexpected response %s" %
+                        (self.scenario.name, num, step.desc,
+                         req.encode("hex")))
+            self.mismatches.append((num, req))
+        logger.info("%s: Test: %s" % (self.scenario.name, step.desc))
+        return step.reply(ctx)
+
+def station_id(pkt):
+    if radius_srv.RADIUS_ATTR_CALLING_STATION_ID in pkt:
+        val = pkt[radius_srv.RADIUS_ATTR_CALLING_STATION_ID][0]
+        return val.lower().replace('-', ':')
+    return None
+
+class EapScenarioEngine(object):
+    """Run independent EAP scenarios for multiple stations concurrently
+
+    Each station (identified by Calling-Station-Id) is bound to its own
+    scenario with assign() and has its own step counter and EAP Identifier.
+    Access-Requests without Calling-Station-Id are not answered."""
+
+    def __init__(self):
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def assign(self, addr, scenario):
+        with self.lock:
+            self.sessions[addr.lower()] = EapScenarioSession(scenario)
+
+    def mismatches(self):
+        res = []
+        for addr, sess in self.sessions.items():
+            for num, req in sess.mismatches:
+                res.append((addr, sess.scenario.name, num, req))
+        return res
+
+    def auth_handler(self, srv, pkt):
+        eap = radius_srv.eap_message_reassemble(pkt)
+        if eap is None:
+            logger.info("No EAP-Message in Access-Request")
+            return None
+        addr = station_id(pkt)
+        with self.lock:
+            sess = self.sessions.get(addr)
+        if sess is None:
+            logger.info("No EAP scenario for station " + str(addr))
+            return None
+        return radius_srv.eap_challenge(srv, pkt, sess.process(eap))
+
+def run_parallel(funcs):
+    """Run the callables in separate threads and re-raise the first failure"""
+    errors = []
+    def run(func):
+        try:
+            func()
+        except Exception, e:
+            logger.info("Parallel run failed: " + str(e))
+            errors.append(e)
+    threads = [ threading.Thread(target=run, args=(f,)) for f in funcs ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if errors:
+        raise errors[0]
@@ -0,0 +1,237 @@
+# Large sets of station interfaces controlled through one wpa_supplicant
+#
+# This software may be distributed under the terms of the BSD license.
+# See README for more details.
+
+import logging
+import select
+import subprocess
+import time
+
+import wpaspy
+from hwsim import HWSimController, radio_ifname
+from utils import latency_stats, format_latency_stats
+from wpasupplicant import WpaSupplicant, ctrl_group
+from wpasupplicant import NETWORK_QUOTED, NETWORK_NOT_QUOTED
+
+logger = logging.getLogger()
+
+CONNECT_FAILURES = [ "CTRL-EVENT-ASSOC-REJECT", "CTRL-EVENT-AUTH-REJECT",
+                     "CTRL-EVENT-EAP-FAILURE", "CTRL-EVENT-SSID-TEMP-DISABLED",
+                     "WPA: 4-Way Handshake failed" ]
+
+class StationFleet(object):
+    """A set of station interfaces in a single wpa_supplicant process
+
+    The interfaces are either virtual interfaces added on the radio of the
+    wpa_supplicant global control interface (default: wlan5) or one
+    dynamically created mac80211_hwsim radio per station. All interfaces
+    are added through a single global control interface connection and
+    the vectorized operations send a command to every station before
+    waiting for any of the responses, so the control and event sockets of
+    all stations are multiplexed through one select() call instead of
+    being served one station at a time.
+
+    The stations are WpaSupplicant instances without a global control
+    interface of their own; the fleet can be iterated and indexed like a
+    list of them."""
+
+    def __init__(self, count, global_iface='/tmp/wpas-wlan5', phy='wlan5',
+                 prefix="sta5-", addr=5, radios=False, drv_params=None):
+        self.global_iface = global_iface
+        self.global_ctrl = wpaspy.Ctrl(global_iface)
+        self.hwsim = HWSimController() if radios else None
+        self.radios = []
+        self.vifs = []
+        self.stas = []
+        try:
+            for i in range(0, count):
+                if radios:
+                    radio = self.hwsim.create_radio()
+                    self.radios.append(radio)
+                    ifname = radio_ifname(radio)
+                else:
+                    ifname = "%s%d" % (prefix, i)
+                    subprocess.check_call(['sudo', 'iw', 'dev', phy,
+                                           'interface', 'add', ifname,
+                                           'type', 'station'])
+                    self.vifs.append(ifname)
+                    subprocess.check_call(['sudo', 'ip', 'link', 'set', 'dev',
+                                           ifname, 'address',
+                                           "02:00:00:%02x:%02x:%02x" % (addr, i >> 8, i & 0xff)])
+                self._add_interface(ifname, drv_params)
+        except:
+            self.close()
+            raise
+
+    def _add_interface(self, ifname, drv_params):
+        cmd = "INTERFACE_ADD " + ifname + "\t\tnl80211\tDIR=/var/run/wpa_supplicant GROUP=" + ctrl_group()
+        if drv_params:
+            cmd += "\t" + drv_params
+        if "FAIL" in self.global_ctrl.request(cmd):
+            raise Exception("Failed to add a dynamic wpa_supplicant interface " + ifname)
+        sta = WpaSupplicant(ifname)
+        self.stas.append(sta)
+
+    def __len__(self):
+        return len(self.stas)
+
+    def __iter__(self):
+        return iter(self.stas)
+
+    def __getitem__(self, i):
+        return self.stas[i]
+
+    def close(self):
+        for sta in self.stas:
+            ifname = sta.ifname
+            sta.remove_ifname()
+            self.global_ctrl.request("INTERFACE_REMOVE " + ifname)
+        self.stas = []
+        for ifname in self.vifs:
+            subprocess.call(['sudo', 'iw', 'dev', ifname, 'del'])
+        self.vifs = []
+        for radio in self.radios:
+            self.hwsim.destroy_radio(radio)
+        self.radios = []
+        if self.global_ctrl:
+            self.global_ctrl.close()
+            self.global_ctrl = None
+
+    def request_all(self, cmd, timeout=10):
+        """Send a command to all stations and return the responses in
+        station order; cmd is either a string or a function returning the
+        command for station index i"""
+        pending = {}
+        for i in range(0, len(self.stas)):
+            sta = self.stas[i]
+            c = cmd(i) if callable(cmd) else cmd
+            logger.debug(sta.ifname + ": CTRL: " + c)
+            sta.ctrl.s.send(c)
+            pending[sta.ctrl.s] = i
+        res = [ None ] * len(self.stas)
+        deadline = time.time() + timeout
+        while pending:
+            [r, w, e] = select.select(pending.keys(), [], [],
+                                      max(0, deadline - time.time()))
+            if not r:
+                raise Exception("Timeout on waiting response from %d station(s)" % len(pending))
+            for sock in r:
+                res[pending.pop(sock)] = sock.recv(4096)
+        return res
+
+    def dump_monitor(self):
+        for sta in self.stas:
+            sta.dump_monitor()
+
+    def wait_all(self, events, timeout, fail_events=None):
+        """Wait until each station has reported one of events
+
+        Returns a dictionary mapping the station index to the time (seconds
+        from the call) and text of the first matching event, and a
+        dictionary of the number of fail_events seen by event name."""
+        index = dict([ (self.stas[i].mon.s, i)
+                       for i in range(0, len(self.stas)) ])
+        waiting = dict([ (sta.mon.s, sta) for sta in self.stas ])
+        done = {}
+        failures = {}
+        start = time.time()
+        deadline = start + timeout
+        while waiting and time.time() < deadline:
+            [r, w, e] = select.select(waiting.keys(), [], [],
+                                      max(0, deadline - time.time()))
+            now = time.time()
+            for sock in r:
+                mon = waiting[sock].mon
+                while sock in waiting and mon.pending():
+                    ev = mon.recv()
+                    logger.debug(waiting[sock].ifname + ": " + ev)
+                    for f in fail_events or []:
+                        if f in ev:
+                            failures[f] = failures.get(f, 0) + 1
+                    for event in events:
+                        if event in ev:
+                            done[index[sock]] = (now - start, ev)
+                            del waiting[sock]
+                            break
+        return done, failures
+
+    def add_network_all(self, ssid, **kwargs):
+        """Add the same network block on all stations and return the
+        network ids"""
+        ids = [ int(id) for id in self.request_all("ADD_NETWORK") ]
+        params = [ ("ssid", '"' + ssid + '"') ]
+        for field in NETWORK_QUOTED:
+            if kwargs.get(field):
+                params.append((field, '"' + kwargs[field] + '"'))
+        for field in NETWORK_NOT_QUOTED:
+            if kwargs.get(field):
+                params.append((field, str(kwargs[field])))
+        for (field, value) in params:
+            cmd = lambda i: "SET_NETWORK %d %s %s" % (ids[i], field, value)
+            if any([ "FAIL" in r for r in self.request_all(cmd) ]):
+                raise Exception("SET_NETWORK failed for " + field)
+        return ids
+
+    def connect_all(self, ssid, timeout=30, **kwargs):
+        """Connect all stations to the SSID at the same time
+
+        The keyword arguments are the NETWORK_QUOTED and NETWORK_NOT_QUOTED
+        network block parameters of WpaSupplicant.connect(). The returned dictionary has the time
+        it took to configure the network blocks and to get all stations
+        connected, the number of connections per second, the connection
+        latency statistics, and the failure events."""
+        t = time.time()
+        ids = self.add_network_all(ssid, **kwargs)
+        setup = time.time() - t
+        self.dump_monitor()
+        t = time.time()
+        self.request_all(lambda i: "SELECT_NETWORK %d" % ids[i])
+        done, failures = self.wait_all([ "CTRL-EVENT-CONNECTED" ], timeout,
+                                       CONNECT_FAILURES)
+        elapsed = time.time() - t
+        res = {}
+        res['stations'] = len(self.stas)
+        res['connected'] = len(done)
+        res['setup'] = setup
+        res['elapsed'] = elapsed
+        res['per_sec'] = len(done) / elapsed
+        res['latency'] = latency_stats([ d[0] for d in done.values() ])
+        res['failures'] = failures
+        res['not_connected'] = [ self.stas[i].ifname
+                                 for i in range(0, len(self.stas))
+                                 if i not in done ]
+        logger.info("Fleet connect to %s: %d/%d stations connected in %.2f s (network setup %.2f s): %.1f connections/s failures=%s" % (ssid, len(done), len(self.stas), elapsed, setup, res['per_sec'], str(failures)))
+        logger.info("Fleet connection latency: " + format_latency_stats(res['latency']))
+        return res
+
+    def states(self):
+        """Collect the STATUS of all stations
+
+        Returns the list of per-station status dictionaries and a summary
+        with the number of stations in each wpa_state and the time it took
+        to collect them."""
+        t = time.time()
+        replies = self.request_all("STATUS")
+        elapsed = time.time() - t
+        status = []
+        counts = {}
+        for reply in replies:
+            vals = dict([ l.split('=', 1) for l in reply.splitlines()
+                          if '=' in l ])
+            status.append(vals)
+            state = vals.get('wpa_state', 'UNKNOWN')
+            counts[state] = counts.get(state, 0) + 1
+        return status, { 'states': counts, 'elapsed': elapsed }
+
+    def disconnect_all(self, timeout=10):
+        self.dump_monitor()
+        t = time.time()
+        self.request_all("DISCONNECT")
+        done, failures = self.wait_all([ "CTRL-EVENT-DISCONNECTED" ],
+                                       timeout)
+        return { 'disconnected': len(done), 'elapsed': time.time() - t }
+
+    def remove_networks(self):
+        self.request_all("REMOVE_NETWORK all")
+        self.dump_monitor()
@@ -0,0 +1,559 @@
+# IEEE 802.11, P2P, WSC and GAS frame encoding and decoding
+#
+# This software may be distributed under the terms of the BSD license.
+# See README for more details.
+
+import binascii
+import struct
+
+MGMT_SUBTYPE_ASSOC_REQ = 0
+MGMT_SUBTYPE_ASSOC_RESP = 1
+MGMT_SUBTYPE_PROBE_REQ = 4
+MGMT_SUBTYPE_PROBE_RESP = 5
+MGMT_SUBTYPE_BEACON = 8
+MGMT_SUBTYPE_DISASSOC = 10
+MGMT_SUBTYPE_AUTH = 11
+MGMT_SUBTYPE_DEAUTH = 12
+MGMT_SUBTYPE_ACTION = 13
+
+WLAN_CAPAB_ESS = 0x0001
+WLAN_CAPAB_PRIVACY = 0x0010
+WLAN_CAPAB_SHORT_SLOT_TIME = 0x0400
+
+ACTION_CATEG_PUBLIC = 4
+PUBLIC_ACTION_VENDOR_SPECIFIC = 9
+
+WLAN_EID_SSID = 0
+WLAN_EID_SUPP_RATES = 1
+WLAN_EID_DS_PARAMS = 3
+WLAN_EID_HT_CAP = 45
+WLAN_EID_RSN = 48
+WLAN_EID_EXT_SUPP_RATES = 50
+WLAN_EID_HT_OPERATION = 61
+WLAN_EID_INTERWORKING = 107
+WLAN_EID_ADV_PROTO = 108
+WLAN_EID_VHT_CAP = 191
+WLAN_EID_VHT_OPERATION = 192
+WLAN_EID_VENDOR_SPECIFIC = 221
+
+P2P_GO_NEG_REQ = 0
+P2P_GO_NEG_RESP = 1
+P2P_GO_NEG_CONF = 2
+P2P_INVITATION_REQ = 3
+P2P_INVITATION_RESP = 4
+P2P_DEV_DISC_REQ = 5
+P2P_DEV_DISC_RESP = 6
+P2P_PROV_DISC_REQ = 7
+P2P_PROV_DISC_RESP = 8
+
+P2P_ATTR_STATUS = 0
+P2P_ATTR_MINOR_REASON_CODE = 1
+P2P_ATTR_CAPABILITY = 2
+P2P_ATTR_DEVICE_ID = 3
+P2P_ATTR_GROUP_OWNER_INTENT = 4
+P2P_ATTR_CONFIGURATION_TIMEOUT = 5
+P2P_ATTR_LISTEN_CHANNEL = 6
+P2P_ATTR_GROUP_BSSID = 7
+P2P_ATTR_EXT_LISTEN_TIMING = 8
+P2P_ATTR_INTENDED_INTERFACE_ADDR = 9
+P2P_ATTR_MANAGEABILITY = 10
+P2P_ATTR_CHANNEL_LIST = 11
+P2P_ATTR_NOTICE_OF_ABSENCE = 12
+P2P_ATTR_DEVICE_INFO = 13
+P2P_ATTR_GROUP_INFO = 14
+P2P_ATTR_GROUP_ID = 15
+P2P_ATTR_INTERFACE = 16
+P2P_ATTR_OPERATING_CHANNEL = 17
+P2P_ATTR_INVITATION_FLAGS = 18
+P2P_ATTR_OOB_GO_NEG_CHANNEL = 19
+P2P_ATTR_VENDOR_SPECIFIC = 221
+
+P2P_SC_SUCCESS = 0
+P2P_SC_FAIL_INFO_CURRENTLY_UNAVAILABLE = 1
+P2P_SC_FAIL_INCOMPATIBLE_PARAMS = 2
+P2P_SC_FAIL_LIMIT_REACHED = 3
+P2P_SC_FAIL_INVALID_PARAMS = 4
+P2P_SC_FAIL_UNABLE_TO_ACCOMMODATE = 5
+P2P_SC_FAIL_PREV_PROTOCOL_ERROR = 6
+P2P_SC_FAIL_NO_COMMON_CHANNELS = 7
+P2P_SC_FAIL_UNKNOWN_GROUP = 8
+P2P_SC_FAIL_BOTH_GO_INTENT_15 = 9
+P2P_SC_FAIL_INCOMPATIBLE_PROV_METHOD = 10
+P2P_SC_FAIL_REJECTED_BY_USER = 11
+
+WSC_ATTR_CONFIG_METHODS = 0x1008
+
+GAS_INITIAL_REQUEST = 10
+GAS_INITIAL_RESPONSE = 11
+GAS_COMEBACK_REQUEST = 12
+GAS_COMEBACK_RESPONSE = 13
+GAS_ACTIONS = [ GAS_INITIAL_REQUEST, GAS_INITIAL_RESPONSE,
+                GAS_COMEBACK_REQUEST, GAS_COMEBACK_RESPONSE ]
+
+P2P_OUI_TYPE = '\x50\x6f\x9a\x09'
+WSC_OUI_TYPE = '\x00\x50\xf2\x04'
+COUNTRY_XX4 = '\x58\x58\x04'
+
+MGMT_HDR = struct.Struct('<HH6s6s6sH')
+IE_HDR = struct.Struct('<BB')
+P2P_ATTR_HDR = struct.Struct('<BH')
+WSC_ATTR_HDR = struct.Struct('>HH')
+U8 = struct.Struct('<B')
+U16 = struct.Struct('<H')
+BEACON_FIXED = struct.Struct('<QHH')
+
+_P2P_ATTR_U8 = struct.Struct('<BHB')
+_P2P_ATTR_U8_U8 = struct.Struct('<BHBB')
+_P2P_ATTR_U16_U16 = struct.Struct('<BHHH')
+_P2P_ATTR_ADDR = struct.Struct('<BH6s')
+_P2P_ATTR_CHANNEL = struct.Struct('<BH3sBB')
+_P2P_ATTR_DEVICE_INFO = struct.Struct('<BH6sH8sB')
+_WSC_ATTR_U16 = struct.Struct('>HHH')
+_HT_CAP = struct.Struct('<BBHB16sHIB')
+_HT_OPER = struct.Struct('<BBBBHH16s')
+_VHT_CAP = struct.Struct('<BBIHHHH')
+_VHT_OPER = struct.Struct('<BBBBBH')
+_GAS_INITIAL_RESP = struct.Struct('<BBBHH')
+_GAS_COMEBACK_RESP = struct.Struct('<BBBHBH')
+_GAS_HDR = struct.Struct('BBB')
+_GAS_INITIAL_RESP_FIELDS = struct.Struct('<HH')
+_GAS_COMEBACK_RESP_FIELDS = struct.Struct('<HBH')
+
+def mac2str(val):
+    """Format a 6-octet address as a colon separated string"""
+    h = binascii.hexlify(val)
+    return h[0:2] + ':' + h[2:4] + ':' + h[4:6] + ':' + h[6:8] + ':' + \
+        h[8:10] + ':' + h[10:12]
+
+def str2mac(addr):
+    return binascii.unhexlify(addr.replace(':', ''))
+
+class MgmtFrame(object):
+    """IEEE 802.11 Management frame
+
+    Fields can also be accessed as items (frame['sa']) for compatibility with
+    the dictionary based frame representation used in test cases. Addresses
+    are formatted only when first accessed."""
+
+    __slots__ = [ 'fc', 'duration', '_da', '_sa', '_bssid', 'seq_ctrl',
+                  'payload', 'frame', 'freq' ]
+
+    def __init__(self, fc=0, da=None, sa=None, bssid=None, payload='',
+                 duration=0, seq_ctrl=0):
+        self.fc = fc
+        self.duration = duration
+        self._da = da
+        self._sa = sa
+        self._bssid = bssid
+        self.seq_ctrl = seq_ctrl
+        self.payload = payload
+        self.frame = None
+        self.freq = None
+
+    @classmethod
+    def parse(cls, frame):
+        (fc, duration, da, sa, bssid, seq_ctrl) = MGMT_HDR.unpack_from(frame)
+        msg = cls.__new__(cls)
+        msg.fc = fc
+        msg.duration = duration
+        msg._da = da
+        msg._sa = sa
+        msg._bssid = bssid
+        msg.seq_ctrl = seq_ctrl
+        msg.payload = frame[MGMT_HDR.size:]
+        msg.frame = frame
+        msg.freq = None
+        return msg
+
+    def _addr(self, val):
+        if val is None or len(val) != 6:
+            return val
+        return mac2str(val)
+
+    @property
+    def subtype(self):
+        return (self.fc >> 4) & 0xf
+
+    @property
+    def da(self):
+        return self._addr(self._da)
+
+    @da.setter
+    def da(self, val):
+        self._da = val
+
+    @property
+    def sa(self):
+        return self._addr(self._sa)
+
+    @sa.setter
+    def sa(self, val):
+        self._sa = val
+
+    @property
+    def bssid(self):
+        return self._addr(self._bssid)
+
+    @bssid.setter
+    def bssid(self, val):
+        self._bssid = val
+
+    def __getitem__(self, key):
+        try:
+            val = getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+        if val is None and key in [ 'frame', 'freq' ]:
+            raise KeyError(key)
+        return val
+
+    def __setitem__(self, key, val):
+        setattr(self, key, val)
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+def addr_bytes(addr):
+    if len(addr) == 6:
+        return addr
+    return str2mac(addr)
+
+def mgmt_frame(msg):
+    """Encode a management frame from a MgmtFrame or a dictionary with fc,
+    da, sa, bssid, and payload"""
+    return MGMT_HDR.pack(msg['fc'], 0, addr_bytes(msg['da']),
+                         addr_bytes(msg['sa']), addr_bytes(msg['bssid']),
+                         0) + msg['payload']
+
+def iter_tlv(buf, hdr, strict=False, allow_trailing=True):
+    """Iterate over (id, value) pairs of a TLV encoded buffer without copying
+    the values (memoryview slices)
+
+    With strict=True, a truncated value raises ValueError and so do octets
+    left after the last element if allow_trailing=False."""
+    view = memoryview(buf)
+    pos = 0
+    end = len(buf)
+    hlen = hdr.size
+    while pos + hlen <= end:
+        (tid, tlen) = hdr.unpack_from(buf, pos)
+        pos += hlen
+        if pos + tlen > end:
+            if strict:
+                raise ValueError("Truncated element (id=%d len=%d left=%d)" % (tid, tlen, end - pos))
+            return
+        yield tid, view[pos:pos + tlen]
+        pos += tlen
+    if strict and not allow_trailing and pos != end:
+        raise ValueError("Extra octets after the last element")
+
+def iter_ies(buf, strict=False, allow_trailing=True):
+    return iter_tlv(buf, IE_HDR, strict, allow_trailing)
+
+def iter_p2p_attrs(buf, strict=False):
+    return iter_tlv(buf, P2P_ATTR_HDR, strict)
+
+def iter_wsc_attrs(buf, strict=False):
+    return iter_tlv(buf, WSC_ATTR_HDR, strict)
+
+def ie(eid, payload):
+    return IE_HDR.pack(eid, len(payload)) + payload
+
+def ie_ssid(ssid):
+    return ie(WLAN_EID_SSID, ssid)
+
+_SUPP_RATES = ie(WLAN_EID_SUPP_RATES,
+                 struct.pack("8B", 2*6, 2*9, 2*12, 2*18, 2*24, 2*36, 2*48,
+                             2*54))
+
+def ie_supp_rates():
+    return _SUPP_RATES
+
+def ie_rates(rates, basic=[]):
+    """Supported Rates and Extended Supported Rates elements for a list of
+    rates in units of 500 kbps"""
+    vals = [ r | 0x80 if r in basic else r for r in rates ]
+    res = ie(WLAN_EID_SUPP_RATES, struct.pack("%dB" % len(vals[0:8]),
+                                              *vals[0:8]))
+    if len(vals) > 8:
+        res += ie(WLAN_EID_EXT_SUPP_RATES,
+                  struct.pack("%dB" % len(vals[8:]), *vals[8:]))
+    return res
+
+def ie_ds_params(chan):
+    return struct.pack('BBB', WLAN_EID_DS_PARAMS, 1, chan)
+
+def ie_ht_capab(ht40=False):
+    # SM Power Save disabled, Short GI for 20 MHz, one spatial stream
+    capab = 0x000c | 0x0020
+    if ht40:
+        capab |= 0x0002 | 0x0040
+    return _HT_CAP.pack(WLAN_EID_HT_CAP, _HT_CAP.size - 2, capab, 0x17,
+                        '\xff' + 15 * '\x00', 0, 0, 0)
+
+def ie_ht_oper(chan, sec=0, op_mode=0):
+    """HT Operation element; sec is 1 for HT40+, -1 for HT40-, 0 for 20
+    MHz"""
+    info = 0
+    if sec > 0:
+        info = 0x01 | 0x04
+    elif sec < 0:
+        info = 0x03 | 0x04
+    return _HT_OPER.pack(WLAN_EID_HT_OPERATION, _HT_OPER.size - 2, chan, info,
+                         op_mode, 0, '\xff' + 15 * '\x00')
+
+def ie_vht_capab():
+    # MCS 0-7 for one spatial stream
+    return _VHT_CAP.pack(WLAN_EID_VHT_CAP, _VHT_CAP.size - 2, 0, 0xfffc, 0,
+                         0xfffc, 0)
+
+def ie_vht_oper(width=0, seg0=0, seg1=0):
+    return _VHT_OPER.pack(WLAN_EID_VHT_OPERATION, _VHT_OPER.size - 2, width,
+                          seg0, seg1, 0xfffc)
+
+# WPA2-PSK with CCMP as the group and pairwise cipher
+_RSN_PSK_CCMP = ie(WLAN_EID_RSN,
+                   struct.pack('<H4sH4sH4sH', 1, '\x00\x0f\xac\x04', 1,
+                               '\x00\x0f\xac\x04', 1, '\x00\x0f\xac\x02',
+                               0))
+
+def ie_rsn_psk():
+    return _RSN_PSK_CCMP
+
+def ie_interworking(ant=2, internet=True, hessid=None):
+    """Interworking element with the given Access Network Type and an
+    optional HESSID"""
+    payload = U8.pack(ant | (0x10 if internet else 0))
+    if hessid:
+        payload += addr_bytes(hessid)
+    return ie(WLAN_EID_INTERWORKING, payload)
+
+def ie_p2p(attrs):
+    return IE_HDR.pack(WLAN_EID_VENDOR_SPECIFIC, 4 + len(attrs)) + \
+        P2P_OUI_TYPE + attrs
+
+def ie_wsc(attrs):
+    return IE_HDR.pack(WLAN_EID_VENDOR_SPECIFIC, 4 + len(attrs)) + \
+        WSC_OUI_TYPE + attrs
+
+def wsc_attr_config_methods(methods=0):
+    return _WSC_ATTR_U16.pack(WSC_ATTR_CONFIG_METHODS, 2, methods)
+
+def p2p_attr(attr_id, payload):
+    return P2P_ATTR_HDR.pack(attr_id, len(payload)) + payload
+
+def p2p_attr_status(status=P2P_SC_SUCCESS):
+    return _P2P_ATTR_U8.pack(P2P_ATTR_STATUS, 1, status)
+
+def p2p_attr_minor_reason_code(code=0):
+    return _P2P_ATTR_U8.pack(P2P_ATTR_MINOR_REASON_CODE, 1, code)
+
+def p2p_attr_capability(dev_capab=0, group_capab=0):
+    return _P2P_ATTR_U8_U8.pack(P2P_ATTR_CAPABILITY, 2, dev_capab,
+                                group_capab)
+
+def p2p_attr_device_id(addr):
+    return _P2P_ATTR_ADDR.pack(P2P_ATTR_DEVICE_ID, 6, str2mac(addr))
+
+def p2p_attr_go_intent(go_intent=0, tie_breaker=0):
+    return _P2P_ATTR_U8.pack(P2P_ATTR_GROUP_OWNER_INTENT, 1,
+                             (go_intent << 1) | (tie_breaker & 0x01))
+
+def p2p_attr_config_timeout(go_config_timeout=0, client_config_timeout=0):
+    return _P2P_ATTR_U8_U8.pack(P2P_ATTR_CONFIGURATION_TIMEOUT, 2,
+                                go_config_timeout, client_config_timeout)
+
+def p2p_attr_listen_channel(op_class=81, chan=1):
+    return _P2P_ATTR_CHANNEL.pack(P2P_ATTR_LISTEN_CHANNEL, 5, COUNTRY_XX4,
+                                  op_class, chan)
+
+def p2p_attr_group_bssid(addr):
+    return _P2P_ATTR_ADDR.pack(P2P_ATTR_GROUP_BSSID, 6, str2mac(addr))
+
+def p2p_attr_ext_listen_timing(period=0, interval=0):
+    return _P2P_ATTR_U16_U16.pack(P2P_ATTR_EXT_LISTEN_TIMING, 4, period,
+                                  interval)
+
+def p2p_attr_intended_interface_addr(addr):
+    return _P2P_ATTR_ADDR.pack(P2P_ATTR_INTENDED_INTERFACE_ADDR, 6,
+                               str2mac(addr))
+
+def p2p_attr_manageability(bitmap=0):
+    return _P2P_ATTR_U8.pack(P2P_ATTR_MANAGEABILITY, 1, bitmap)
+
+_CHANNEL_LIST = p2p_attr(P2P_ATTR_CHANNEL_LIST,
+                         COUNTRY_XX4 + struct.pack("13B", 81, 11, 1, 2, 3, 4,
+                                                   5, 6, 7, 8, 9, 10, 11))
+
+def p2p_attr_channel_list():
+    return _CHANNEL_LIST
+
+def p2p_attr_device_info(addr, name="Test", config_methods=0, dev_type="00010050F2040001"):
+    return _P2P_ATTR_DEVICE_INFO.pack(P2P_ATTR_DEVICE_INFO,
+                                      6 + 2 + 8 + 1 + 4 + len(name),
+                                      str2mac(addr), config_methods,
+                                      binascii.unhexlify(dev_type), 0) + \
+        WSC_ATTR_HDR.pack(0x1011, len(name)) + name
+
+def p2p_attr_group_id(addr, ssid):
+    return _P2P_ATTR_ADDR.pack(P2P_ATTR_GROUP_ID, 6 + len(ssid),
+                               str2mac(addr)) + ssid
+
+def p2p_attr_operating_channel(op_class=81, chan=1):
+    return _P2P_ATTR_CHANNEL.pack(P2P_ATTR_OPERATING_CHANNEL, 5, COUNTRY_XX4,
+                                  op_class, chan)
+
+def p2p_attr_invitation_flags(bitmap=0):
+    return _P2P_ATTR_U8.pack(P2P_ATTR_INVITATION_FLAGS, 1, bitmap)
+
+_P2P_PUBLIC_ACTION = struct.pack("<BB", ACTION_CATEG_PUBLIC,
+                                 PUBLIC_ACTION_VENDOR_SPECIFIC) + P2P_OUI_TYPE
+
+def p2p_hdr_helper(dst, src, type=None, dialog_token=1, req=True):
+    msg = {}
+    msg['fc'] = MGMT_SUBTYPE_ACTION << 4
+    msg['da'] = dst
+    msg['sa'] = src
+    if req:
+        msg['bssid'] = dst
+    else:
+        msg['bssid'] = src
+    msg['payload'] = _P2P_PUBLIC_ACTION
+    if type is not None:
+        msg['payload'] += U8.pack(type)
+        if dialog_token:
+            msg['payload'] += U8.pack(dialog_token)
+    return msg
+
+def p2p_hdr(dst, src, type=None, dialog_token=1):
+    return p2p_hdr_helper(dst, src, type, dialog_token, True)
+
+def p2p_hdr_resp(dst, src, type=None, dialog_token=1):
+    return p2p_hdr_helper(dst, src, type, dialog_token, False)
+
+def parse_p2p_public_action(payload):
+    if len(payload) < 8 or payload[0:6] != _P2P_PUBLIC_ACTION:
+        return None
+    (subtype, dialog_token) = struct.unpack_from('BB', payload, 6)
+    p2p = {}
+    p2p['subtype'] = subtype
+    p2p['dialog_token'] = dialog_token
+    p2p['elements'] = payload[8:]
+    p2p_data = []
+    wsc_data = []
+    try:
+        for eid, val in iter_ies(p2p['elements'], strict=True,
+                                 allow_trailing=False):
+            if eid != WLAN_EID_VENDOR_SPECIFIC:
+                continue
+            if len(val) < 4:
+                raise Exception("Too short vendor specific IE in P2P Public Action frame (elen=%d)" % len(val))
+            oui_type = val[0:4].tobytes()
+            if oui_type == P2P_OUI_TYPE:
+                p2p_data.append(val[4:].tobytes())
+            elif oui_type == WSC_OUI_TYPE:
+                # Only the last WSC IE is used
+                wsc_data = [ val[4:].tobytes() ]
+    except ValueError, e:
+        raise Exception("Invalid element in P2P Public Action frame: " + str(e))
+
+    if p2p_data:
+        p2p['p2p'] = ''.join(p2p_data)
+        p2p['p2p_attrs'] = {}
+        try:
+            for aid, val in iter_p2p_attrs(p2p['p2p'], strict=True):
+                p2p['p2p_attrs'][aid] = val.tobytes()
+        except ValueError, e:
+            raise Exception("Truncated P2P attribute in P2P Public Action frame (p2p-payload=%d): %s" % (len(p2p['p2p']), str(e)))
+        if P2P_ATTR_STATUS in p2p['p2p_attrs']:
+            p2p['p2p_status'] = U8.unpack(p2p['p2p_attrs'][P2P_ATTR_STATUS])[0]
+
+    if wsc_data:
+        p2p['wsc'] = wsc_data[0]
+        p2p['wsc_attrs'] = {}
+        try:
+            for aid, val in iter_wsc_attrs(p2p['wsc'], strict=True):
+                p2p['wsc_attrs'][aid] = val.tobytes()
+        except ValueError, e:
+            raise Exception("Truncated WSC attribute in P2P Public Action frame (wsc-payload=%d): %s" % (len(p2p['wsc']), str(e)))
+
+    return p2p
+
+_ANQP_ADV_PROTO = struct.pack('BBBB', WLAN_EID_ADV_PROTO, 2, 127, 0)
+_ANQP_ADV_PROTO_BOGUS = struct.pack('BBBB', WLAN_EID_ADV_PROTO, 2, 127, 1)
+
+def anqp_adv_proto():
+    return _ANQP_ADV_PROTO
+
+def anqp_initial_resp(dialog_token, status_code, comeback_delay=0):
+    return _GAS_INITIAL_RESP.pack(ACTION_CATEG_PUBLIC, GAS_INITIAL_RESPONSE,
+                                  dialog_token, status_code,
+                                  comeback_delay) + _ANQP_ADV_PROTO
+
+def anqp_comeback_resp(dialog_token, status_code=0, id=0, more=False, comeback_delay=0, bogus_adv_proto=False):
+    if more:
+        id |= 0x80
+    if bogus_adv_proto:
+        adv = _ANQP_ADV_PROTO_BOGUS
+    else:
+        adv = _ANQP_ADV_PROTO
+    return _GAS_COMEBACK_RESP.pack(ACTION_CATEG_PUBLIC, GAS_COMEBACK_RESPONSE,
+                                   dialog_token, status_code, id,
+                                   comeback_delay) + adv
+
+def parse_gas(payload):
+    if len(payload) < 3:
+        return None
+    (category, action, dialog_token) = _GAS_HDR.unpack_from(payload)
+    if category != ACTION_CATEG_PUBLIC:
+        return None
+    if action not in GAS_ACTIONS:
+        return None
+    gas = {}
+    gas['action'] = action
+    left = len(payload) - 3
+
+    if left < 1 and action != GAS_COMEBACK_REQUEST:
+        return None
+
+    gas['dialog_token'] = dialog_token
+
+    if action == GAS_INITIAL_RESPONSE:
+        if left < 4:
+            return None
+        (status_code, comeback_delay) = \
+            _GAS_INITIAL_RESP_FIELDS.unpack_from(payload, 3)
+        gas['status_code'] = status_code
+        gas['comeback_delay'] = comeback_delay
+
+    if action == GAS_COMEBACK_RESPONSE:
+        if left < 5:
+            return None
+        (status_code, frag, comeback_delay) = \
+            _GAS_COMEBACK_RESP_FIELDS.unpack_from(payload, 3)
+        gas['status_code'] = status_code
+        gas['frag'] = frag
+        gas['comeback_delay'] = comeback_delay
+
+    return gas
+
+def is_gas_frame(msg):
+    if msg['subtype'] != MGMT_SUBTYPE_ACTION:
+        return False
+    payload = msg['payload']
+    if len(payload) < 2:
+        return False
+    return ord(payload[0]) == ACTION_CATEG_PUBLIC and \
+        ord(payload[1]) in GAS_ACTIONS
+
+def action_response(req):
+    resp = {}
+    resp['fc'] = req['fc']
+    resp['da'] = req['sa']
+    resp['sa'] = req['da']
+    resp['bssid'] = req['bssid']
+    return resp
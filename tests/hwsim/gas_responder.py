@@ -0,0 +1,307 @@
+# Programmable GAS/ANQP responder
+#
+# This software may be distributed under the terms of the BSD license.
+# See README for more details.
+
+import binascii
+import heapq
+import logging
+import os
+import random
+import select
+import struct
+import threading
+import time
+
+import hostapd
+import frames
+from frames import GAS_INITIAL_REQUEST, GAS_COMEBACK_REQUEST
+from frames import WLAN_EID_ADV_PROTO, U16
+from utils import latency_stats
+
+logger = logging.getLogger()
+
+ANQP_QUERY_LIST = 256
+ANQP_VENDOR_SPECIFIC = 56797
+HS20_ANQP_OUI_TYPE = '\x50\x6f\x9a\x11'
+HS20_STYPE_QUERY_LIST = 1
+
+ACCESS_NETWORK_QUERY_PROTOCOL = 0
+
+GAS_STATUS_SUCCESS = 0
+GAS_STATUS_ADV_PROTO_NOT_SUPPORTED = 59
+GAS_STATUS_NO_OUTSTANDING_REQ = 60
+GAS_STATUS_RESP_NOT_RECEIVED = 61
+
+ANQP_ELEM_HDR = struct.Struct('<HH')
+
+def anqp_element(info_id, payload):
+    return ANQP_ELEM_HDR.pack(info_id, len(payload)) + payload
+
+def hs20_anqp_element(subtype, payload):
+    return anqp_element(ANQP_VENDOR_SPECIFIC,
+                        HS20_ANQP_OUI_TYPE + struct.pack('BB', subtype, 0) +
+                        payload)
+
+def parse_anqp_query(query):
+    """Return the ANQP Info IDs and ('hs20', subtype) keys requested in an
+    ANQP Query list and a Hotspot 2.0 Query list"""
+    keys = []
+    for info_id, val in frames.iter_tlv(query, ANQP_ELEM_HDR):
+        if info_id == ANQP_QUERY_LIST:
+            count = len(val) / 2
+            keys += struct.unpack('<%dH' % count, val[0:2 * count].tobytes())
+        elif info_id == ANQP_VENDOR_SPECIFIC and len(val) >= 6 and \
+             val[0:4].tobytes() == HS20_ANQP_OUI_TYPE and \
+             ord(val[4]) == HS20_STYPE_QUERY_LIST:
+            keys += [ ('hs20', ord(c)) for c in val[6:].tobytes() ]
+    return keys
+
+def default_anqp_table(domains=2):
+    """ANQP payloads for GasResponder
+
+    The number of Domain Name list entries can be increased to make the
+    responses large enough to require fragmentation."""
+    table = {}
+    table[257] = struct.pack('<5H', 257, 258, 261, 263, 268)
+    name = "Example venue"
+    table[258] = struct.pack('BBB', 7, 1, 3 + len(name)) + "eng" + name
+    table[261] = struct.pack('B', 3) + '\x11\x22\x33'
+    realm = "example.com"
+    table[263] = struct.pack('<HHBB', 1, 3 + len(realm), 0, len(realm)) + \
+        realm + '\x00'
+    names = [ "example.com" ] + [ "domain%d.example.com" % i
+                                  for i in range(1, domains) ]
+    table[268] = ''.join([ chr(len(n)) + n for n in names ])
+    name = "Example operator"
+    table[('hs20', 3)] = struct.pack('B', 3 + len(name)) + "eng" + name
+    table[('hs20', 4)] = struct.pack('<BIIBBH', 1, 8000, 1000, 80, 240, 3000)
+    return table
+
+class GasDialog(object):
+    __slots__ = [ 'addr', 'dialog_token', 'resp', 'offset', 'frag_id',
+                  'start' ]
+
+    def __init__(self, addr, dialog_token, resp):
+        self.addr = addr
+        self.dialog_token = dialog_token
+        self.resp = resp
+        self.offset = 0
+        self.frag_id = 0
+        self.start = time.time()
+
+class GasResponder(object):
+    """GAS/ANQP server running in the background on a hostapd interface
+
+    hostapd is set to ext_mgmt_frame_handling=1 and GAS Initial/Comeback
+    Request frames from any number of stations and dialog tokens are
+    answered from table, a dictionary mapping ANQP Info ID or ('hs20',
+    subtype) to the element payload. The responder uses its own control
+    interface connections, so the Hostapd instance can still be used for
+    other commands (but not for receiving management frames) while the
+    responder is running.
+
+    Responses longer than frag_limit octets (or all responses when
+    comeback_delay is set) are delivered with GAS Comeback Response
+    fragments. Faults can be injected with delay (seconds before each
+    response or a (min, max) range), drop_rate (no response),
+    error_rate/error_status (failure status code), and bad_frag_rate
+    (unexpected Fragment ID). These attributes can be changed while the
+    responder is running."""
+
+    def __init__(self, hapd, table=None, frag_limit=1400, comeback_delay=0,
+                 delay=0, drop_rate=0, error_rate=0,
+                 error_status=GAS_STATUS_RESP_NOT_RECEIVED, bad_frag_rate=0,
+                 seed=None):
+        self.ifname = hapd.ifname
+        if table is None:
+            table = default_anqp_table()
+        self.elements = {}
+        for key, payload in table.items():
+            if isinstance(key, tuple):
+                self.elements[key] = hs20_anqp_element(key[1], payload)
+            else:
+                self.elements[key] = anqp_element(key, payload)
+        self.frag_limit = frag_limit
+        self.comeback_delay = comeback_delay
+        self.delay = delay
+        self.drop_rate = drop_rate
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.bad_frag_rate = bad_frag_rate
+        self.rng = random.Random(seed)
+        self.dialogs = {}
+        self._responses = {}
+        self._queue = []
+        self._seq = 0
+        self._thread = None
+        self.latency = []
+        self.stats = dict([ (k, 0) for k in [ 'initial_req', 'comeback_req',
+                                              'initial_resp', 'comeback_resp',
+                                              'dropped', 'errors', 'bad_frag',
+                                              'unknown_dialog', 'ignored',
+                                              'tx_ok', 'tx_fail',
+                                              'max_pending' ] ])
+
+    def start(self):
+        self.hapd = hostapd.Hostapd(self.ifname)
+        self.hapd.set("ext_mgmt_frame_handling", "1")
+        self._stop_r, self._stop_w = os.pipe()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        os.write(self._stop_w, "x")
+        self._thread.join()
+        self._thread = None
+        os.close(self._stop_r)
+        os.close(self._stop_w)
+        self.hapd.set("ext_mgmt_frame_handling", "0")
+        self.hapd.mon.close()
+        self.hapd.ctrl.close()
+
+    def report(self):
+        res = dict(self.stats)
+        res['pending'] = len(self.dialogs)
+        res['latency'] = latency_stats(self.latency)
+        return res
+
+    def _response(self, query):
+        resp = self._responses.get(query)
+        if resp is None:
+            resp = ''.join([ self.elements[key]
+                             for key in parse_anqp_query(query)
+                             if key in self.elements ])
+            self._responses[query] = resp
+        return resp
+
+    def _fault(self, rate):
+        return rate and self.rng.random() < rate
+
+    def _schedule(self, req, payload):
+        resp = frames.action_response(req)
+        resp['payload'] = payload
+        delay = self.delay
+        if isinstance(delay, tuple):
+            delay = self.rng.uniform(delay[0], delay[1])
+        if not delay:
+            self.hapd.mgmt_tx(resp)
+            return
+        self._seq += 1
+        heapq.heappush(self._queue, (time.time() + delay, self._seq, resp))
+
+    def _send_due(self):
+        now = time.time()
+        while self._queue and self._queue[0][0] <= now:
+            self.hapd.mgmt_tx(heapq.heappop(self._queue)[2])
+
+    def _done(self, key, dialog):
+        del self.dialogs[key]
+        self.latency.append(time.time() - dialog.start)
+
+    def _initial(self, req, token):
+        self.stats['initial_req'] += 1
+        payload = req.payload
+        if len(payload) < 7 or ord(payload[3]) != WLAN_EID_ADV_PROTO:
+            self.stats['ignored'] += 1
+            return
+        pos = 5 + ord(payload[4])
+        if pos + 2 > len(payload):
+            self.stats['ignored'] += 1
+            return
+        if ord(payload[6]) != ACCESS_NETWORK_QUERY_PROTOCOL:
+            self.stats['initial_resp'] += 1
+            self._schedule(req, frames.anqp_initial_resp(token, GAS_STATUS_ADV_PROTO_NOT_SUPPORTED) + U16.pack(0))
+            return
+        qlen = U16.unpack_from(payload, pos)[0]
+        resp = self._response(payload[pos + 2:pos + 2 + qlen])
+        if self._fault(self.drop_rate):
+            self.stats['dropped'] += 1
+            return
+        self.stats['initial_resp'] += 1
+        if self._fault(self.error_rate):
+            self.stats['errors'] += 1
+            self._schedule(req, frames.anqp_initial_resp(token, self.error_status) + U16.pack(0))
+            return
+        key = (req.sa, token)
+        dialog = GasDialog(req.sa, token, resp)
+        if len(resp) > self.frag_limit or self.comeback_delay:
+            self.dialogs[key] = dialog
+            if len(self.dialogs) > self.stats['max_pending']:
+                self.stats['max_pending'] = len(self.dialogs)
+            self._schedule(req, frames.anqp_initial_resp(token, GAS_STATUS_SUCCESS, comeback_delay=max(1, self.comeback_delay)) + U16.pack(0))
+        else:
+            self._schedule(req, frames.anqp_initial_resp(token, GAS_STATUS_SUCCESS) + U16.pack(len(resp)) + resp)
+            self.latency.append(time.time() - dialog.start)
+
+    def _comeback(self, req, token):
+        self.stats['comeback_req'] += 1
+        key = (req.sa, token)
+        dialog = self.dialogs.get(key)
+        if dialog is None:
+            self.stats['unknown_dialog'] += 1
+            self._schedule(req, frames.anqp_comeback_resp(token, GAS_STATUS_NO_OUTSTANDING_REQ) + U16.pack(0))
+            return
+        if self._fault(self.drop_rate):
+            self.stats['dropped'] += 1
+            return
+        self.stats['comeback_resp'] += 1
+        if self._fault(self.error_rate):
+            self.stats['errors'] += 1
+            self._schedule(req, frames.anqp_comeback_resp(token, self.error_status, id=dialog.frag_id) + U16.pack(0))
+            del self.dialogs[key]
+            return
+        frag = dialog.resp[dialog.offset:dialog.offset + self.frag_limit]
+        more = dialog.offset + len(frag) < len(dialog.resp)
+        frag_id = dialog.frag_id
+        if self._fault(self.bad_frag_rate):
+            self.stats['bad_frag'] += 1
+            frag_id = (frag_id + 2) & 0x7f
+        self._schedule(req, frames.anqp_comeback_resp(token, GAS_STATUS_SUCCESS, id=frag_id, more=more) + U16.pack(len(frag)) + frag)
+        dialog.frag_id += 1
+        dialog.offset += len(frag)
+        if not more:
+            self._done(key, dialog)
+
+    def _event(self, ev):
+        if "MGMT-TX-STATUS" in ev:
+            if "ok=1" in ev:
+                self.stats['tx_ok'] += 1
+            else:
+                self.stats['tx_fail'] += 1
+            return
+        if "MGMT-RX " not in ev:
+            return
+        req = frames.MgmtFrame.parse(binascii.unhexlify(ev.split(' ')[1]))
+        gas = None
+        if frames.is_gas_frame(req):
+            gas = frames.parse_gas(req.payload)
+        if gas is None:
+            self.stats['ignored'] += 1
+        elif gas['action'] == GAS_INITIAL_REQUEST:
+            self._initial(req, gas['dialog_token'])
+        elif gas['action'] == GAS_COMEBACK_REQUEST:
+            self._comeback(req, gas['dialog_token'])
+        else:
+            self.stats['ignored'] += 1
+
+    def _run(self):
+        mon = self.hapd.mon
+        poll = select.poll()
+        poll.register(self._stop_r, select.POLLIN)
+        poll.register(mon.s.fileno(), select.POLLIN)
+        while True:
+            timeout = None
+            if self._queue:
+                timeout = max(0, (self._queue[0][0] - time.time()) * 1000)
+            for (fd, event) in poll.poll(timeout):
+                if fd == self._stop_r:
+                    return
+                while mon.pending():
+                    try:
+                        self._event(mon.recv())
+                    except Exception, e:
+                        logger.info("GAS responder failed to process event: " + str(e))
+            self._send_due()
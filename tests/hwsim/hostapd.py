@@ -8,16 +8,13 @@ import os
 import time
 import logging
 import binascii
-import struct
 import wpaspy
+import frames
 
 logger = logging.getLogger()
 hapd_ctrl = '/var/run/hostapd'
 hapd_global = '/var/run/hostapd-global'
 
-def mac2tuple(mac):
-    return struct.unpack('6B', binascii.unhexlify(mac.replace(':','')))
-
 class HostapdGlobal:
     def __init__(self):
         self.ctrl = wpaspy.Ctrl(hapd_global)
@@ -181,31 +178,10 @@ class Hostapd:
         ev = self.wait_event(["MGMT-RX"], timeout=timeout)
         if ev is None:
             return None
-        msg = {}
-        frame = binascii.unhexlify(ev.split(' ')[1])
-        msg['frame'] = frame
-
-        hdr = struct.unpack('<HH6B6B6BH', frame[0:24])
-        msg['fc'] = hdr[0]
-        msg['subtype'] = (hdr[0] >> 4) & 0xf
-        hdr = hdr[1:]
-        msg['duration'] = hdr[0]
-        hdr = hdr[1:]
-        msg['da'] = "%02x:%02x:%02x:%02x:%02x:%02x" % hdr[0:6]
-        hdr = hdr[6:]
-        msg['sa'] = "%02x:%02x:%02x:%02x:%02x:%02x" % hdr[0:6]
-        hdr = hdr[6:]
-        msg['bssid'] = "%02x:%02x:%02x:%02x:%02x:%02x" % hdr[0:6]
-        hdr = hdr[6:]
-        msg['seq_ctrl'] = hdr[0]
-        msg['payload'] = frame[24:]
-
-        return msg
+        return frames.MgmtFrame.parse(binascii.unhexlify(ev.split(' ')[1]))
 
     def mgmt_tx(self, msg):
-        t = (msg['fc'], 0) + mac2tuple(msg['da']) + mac2tuple(msg['sa']) + mac2tuple(msg['bssid']) + (0,)
-        hdr = struct.pack('<HH6B6B6BH', *t)
-        self.request("MGMT_TX " + binascii.hexlify(hdr + msg['payload']))
+        return self.request("MGMT_TX " + binascii.hexlify(frames.mgmt_frame(msg)))
 
     def get_sta(self, addr, info=None, next=False):
         cmd = "STA-NEXT " if next else "STA "
@@ -291,6 +267,34 @@ def add_iface(ifname, confname):
     if not hapd.ping():
         raise Exception("Could not ping hostapd")
 
+def write_conf_params(f, params):
+    """Write the parameters from a dictionary into an open configuration
+    file (list values are written as separate lines)"""
+    for field, value in params.items():
+        if not isinstance(value, list):
+            value = [ value ]
+        for val in value:
+            f.write("%s=%s\n" % (field, val))
+
+def write_bss_conf(fname, ifname, bssid, params):
+    """Write a configuration file for add_bss() from a parameter dictionary"""
+    with open(fname, 'w') as f:
+        f.write("driver=nl80211\nhw_mode=g\nchannel=1\nieee80211n=1\n")
+        f.write("interface=%s\nbssid=%s\nctrl_interface=%s\n" %
+                (ifname, bssid, hapd_ctrl))
+        write_conf_params(f, params)
+
+def write_multi_bss_conf(fname, ifnames, bssids, params):
+    """Write a configuration file for add_iface() with a BSS for each of
+    ifnames; params is a function returning the parameters for BSS i"""
+    with open(fname, 'w') as f:
+        f.write("driver=nl80211\nhw_mode=g\nchannel=1\nieee80211n=1\n")
+        for i in range(0, len(ifnames)):
+            f.write("\n%s=%s\nbssid=%s\nctrl_interface=%s\n" %
+                    ("interface" if i == 0 else "bss", ifnames[i], bssids[i],
+                     hapd_ctrl))
+            write_conf_params(f, params(i))
+
 def remove_bss(ifname):
     logger.info("Removing BSS " + ifname)
     hapd_global = HostapdGlobal()
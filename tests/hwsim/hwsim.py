@@ -7,6 +7,9 @@
 # This software may be distributed under the terms of the BSD license.
 # See README for more details.
 
+import os
+import time
+
 import netlink
 
 # constants
@@ -44,6 +47,28 @@ class HWSimController(object):
                                   attrs = attrs)
         msg.send_and_recv(self._conn)
 
+def radio_ifname(radio, timeout=5):
+    """Return the netdev name of a mac80211_hwsim radio created with
+    HWSimController.create_radio()"""
+    path = "/sys/class/mac80211_hwsim/hwsim%d/net" % radio
+    end = time.time() + timeout
+    while time.time() < end:
+        if os.path.isdir(path):
+            ifnames = os.listdir(path)
+            if ifnames:
+                return ifnames[0]
+        time.sleep(0.1)
+    raise Exception("No network interface for hwsim radio %d" % radio)
+
+def radio_phy(radio):
+    """Return the wiphy name of a mac80211_hwsim radio"""
+    return os.listdir("/sys/class/mac80211_hwsim/hwsim%d/ieee80211" % radio)[0]
+
+def ifname_phy(ifname):
+    """Return the wiphy name of the radio a network interface belongs to"""
+    with open("/sys/class/net/%s/phy80211/name" % ifname, "r") as f:
+        return f.read().strip()
+
 def create(args):
     print 'Created radio %d' % c.create_radio(n_channels=args.channels,
                                               use_chanctx=args.chanctx)
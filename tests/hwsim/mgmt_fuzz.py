@@ -0,0 +1,576 @@
+# Management frame fuzzer
+#
+# This software may be distributed under the terms of the BSD license.
+# See README for more details.
+
+import binascii
+import hashlib
+import logging
+import os
+import random
+import struct
+import time
+
+import frames
+from frames import MgmtFrame, addr_bytes
+from frames import IE_HDR, P2P_ATTR_HDR, WSC_ATTR_HDR
+from frames import P2P_OUI_TYPE, WSC_OUI_TYPE, WLAN_EID_VENDOR_SPECIFIC
+
+logger = logging.getLogger()
+
+INTERESTING_U8 = [ 0, 1, 2, 0x7f, 0x80, 0xfe, 0xff ]
+INTERESTING_U16 = [ 0, 1, 2, 0xff, 0x100, 0x7fff, 0x8000, 0xfffe, 0xffff ]
+ELEMENT_IDS = [ frames.WLAN_EID_SSID, frames.WLAN_EID_SUPP_RATES,
+                frames.WLAN_EID_RSN, frames.WLAN_EID_ADV_PROTO, 127,
+                WLAN_EID_VENDOR_SPECIFIC ]
+
+# Keep the hexdump of the frame within the control interface buffer
+MAX_BODY_LEN = 1500
+
+_U16_LE = struct.Struct('<H')
+_U16_BE = struct.Struct('>H')
+
+class FuzzTemplate(object):
+    """Management frame template for MgmtFuzzer
+
+    prefix is sent unmodified after the IEEE 802.11 header (e.g., Action
+    frame Category, Action, and Dialog Token) so that the mutated body gets
+    to the parser of interest. elements tells whether the body is a plain
+    list of information elements. setup is a list of (subtype, payload)
+    frames to send before each fuzzed frame, e.g., Authentication before
+    Association Request."""
+
+    __slots__ = [ 'name', 'fc', 'prefix', 'body', 'elements', 'setup',
+                  'seeds' ]
+
+    def __init__(self, name, subtype, prefix, body, elements=True,
+                 setup=None):
+        self.name = name
+        self.fc = subtype << 4
+        self.prefix = prefix
+        self.body = body
+        self.elements = elements
+        self.setup = [ (s << 4, p) for (s, p) in (setup or []) ]
+        self.seeds = [ body ]
+
+def element_offsets(buf):
+    """Offsets of the element headers in buf"""
+    res = []
+    pos = 0
+    end = len(buf)
+    while pos + IE_HDR.size <= end:
+        res.append(pos)
+        pos += IE_HDR.size + buf[pos + 1]
+    return res
+
+def vendor_attr_len_offsets(buf):
+    """Offsets and struct of the attribute Length fields within P2P and WSC
+    vendor specific elements in buf"""
+    res = []
+    for pos in element_offsets(buf):
+        if buf[pos] != WLAN_EID_VENDOR_SPECIFIC or buf[pos + 1] < 4:
+            continue
+        oui_type = str(buf[pos + 2:pos + 6])
+        if oui_type == P2P_OUI_TYPE:
+            hdr = P2P_ATTR_HDR
+            len_s = _U16_LE
+        elif oui_type == WSC_OUI_TYPE:
+            hdr = WSC_ATTR_HDR
+            len_s = _U16_BE
+        else:
+            continue
+        apos = pos + 6
+        end = min(pos + 2 + buf[pos + 1], len(buf))
+        while apos + hdr.size <= end:
+            len_pos = apos + hdr.size - 2
+            res.append((len_pos, len_s))
+            apos += hdr.size + len_s.unpack_from(buffer(buf), len_pos)[0]
+    return res
+
+class Mutator(object):
+    """Random byte and element level mutations"""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.ops = [ self.flip_bit, self.set_u8, self.set_u16, self.truncate,
+                     self.insert, self.delete, self.duplicate ]
+        self.element_ops = [ self.element_length, self.attr_length,
+                             self.add_element, self.delete_element ]
+
+    def mutate(self, body, elements=False, rounds=1):
+        buf = bytearray(body)
+        ops = self.ops + self.element_ops if elements else self.ops
+        for i in range(rounds):
+            self.rng.choice(ops)(buf)
+        if len(buf) > MAX_BODY_LEN:
+            del buf[MAX_BODY_LEN:]
+        return str(buf)
+
+    def random_bytes(self, length):
+        return bytearray(self.rng.getrandbits(8) for i in range(length))
+
+    def flip_bit(self, buf):
+        if buf:
+            pos = self.rng.randrange(len(buf))
+            buf[pos] ^= 1 << self.rng.randrange(8)
+
+    def set_u8(self, buf):
+        if buf:
+            buf[self.rng.randrange(len(buf))] = \
+                self.rng.choice(INTERESTING_U8 + [ self.rng.randrange(256) ])
+
+    def set_u16(self, buf):
+        if len(buf) >= 2:
+            s = self.rng.choice([ _U16_LE, _U16_BE ])
+            pos = self.rng.randrange(len(buf) - 1)
+            buf[pos:pos + 2] = s.pack(self.rng.choice(INTERESTING_U16))
+
+    def truncate(self, buf):
+        if buf:
+            del buf[self.rng.randrange(len(buf)):]
+
+    def insert(self, buf):
+        pos = self.rng.randint(0, len(buf))
+        buf[pos:pos] = self.random_bytes(self.rng.randint(1, 32))
+
+    def delete(self, buf):
+        if buf:
+            pos = self.rng.randrange(len(buf))
+            del buf[pos:pos + self.rng.randint(1, 16)]
+
+    def duplicate(self, buf):
+        if buf:
+            pos = self.rng.randrange(len(buf))
+            chunk = buf[pos:pos + self.rng.randint(1, 64)]
+            dst = self.rng.randint(0, len(buf))
+            buf[dst:dst] = chunk
+
+    def element_length(self, buf):
+        offsets = element_offsets(buf)
+        if not offsets:
+            return self.set_u8(buf)
+        pos = self.rng.choice(offsets) + 1
+        cur = buf[pos]
+        buf[pos] = self.rng.choice(INTERESTING_U8 +
+                                   [ (cur + 1) & 0xff, (cur - 1) & 0xff ])
+
+    def attr_length(self, buf):
+        offsets = vendor_attr_len_offsets(buf)
+        if not offsets:
+            return self.element_length(buf)
+        (pos, s) = self.rng.choice(offsets)
+        cur = s.unpack_from(buffer(buf), pos)[0]
+        buf[pos:pos + 2] = s.pack(self.rng.choice(INTERESTING_U16 +
+                                                  [ (cur + 1) & 0xffff,
+                                                    (cur - 1) & 0xffff ]))
+
+    def add_element(self, buf):
+        offsets = element_offsets(buf) + [ len(buf) ]
+        pos = self.rng.choice(offsets)
+        eid = self.rng.choice(ELEMENT_IDS + [ self.rng.randrange(256) ])
+        payload = self.random_bytes(self.rng.choice([ 0, 1, 4,
+                                                      self.rng.randint(0, 255) ]))
+        buf[pos:pos] = IE_HDR.pack(eid, len(payload)) + payload
+
+    def delete_element(self, buf):
+        offsets = element_offsets(buf)
+        if not offsets:
+            return self.delete(buf)
+        pos = self.rng.choice(offsets)
+        del buf[pos:pos + IE_HDR.size + buf[pos + 1]]
+
+class MgmtFuzzer(object):
+    """Inject mutated management frames from a hostapd interface (with
+    ext_mgmt_frame_handling=1) towards a hostapd or wpa_supplicant target
+
+    Target liveness is verified with PING after every check_interval frames.
+    If the target stops responding, the frames sent since the previous
+    successful check are stored into the corpus directory. If restart is
+    provided, it is called to restart the processes and has to return the
+    new (injector, target) pair; the crash is then reproduced frame by frame
+    and the reproducing frame body is minimized before it is stored.
+
+    Corpus files contain one or more lines of "<template> <hexdump of body>".
+    Existing corpus entries are replayed first and used as additional seeds
+    for the mutations."""
+
+    def __init__(self, injector, target, templates, da, sa, bssid=None,
+                 seed=None, corpus_dir=None, check_interval=16,
+                 max_rounds=4, rate=None, settle=0.05, ping_timeout=2,
+                 restart=None, max_minimize_trials=500):
+        self.injector = injector
+        self.target = target
+        self.templates = templates
+        self.da = addr_bytes(da)
+        self.sa = addr_bytes(sa)
+        self.bssid = addr_bytes(bssid or da)
+        if seed is None:
+            seed = struct.unpack('>I', os.urandom(4))[0]
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.mutator = Mutator(self.rng)
+        self.corpus_dir = corpus_dir
+        self.check_interval = check_interval
+        self.max_rounds = max_rounds
+        self.rate = rate
+        self.settle = settle
+        self.ping_timeout = ping_timeout
+        self.restart = restart
+        self.max_minimize_trials = max_minimize_trials
+        self.by_name = dict([ (t.name, t) for t in templates ])
+        self.sent = 0
+        self.tx_fail = 0
+        self.checks = 0
+        self.counts = dict([ (t.name, 0) for t in templates ])
+        self.crashes = []
+        self.replayed = []
+        self.elapsed = 0
+        self.corpus = []
+        if corpus_dir:
+            self.load_corpus()
+
+    def load_corpus(self):
+        if not os.path.isdir(self.corpus_dir):
+            os.makedirs(self.corpus_dir)
+            return
+        for fname in sorted(os.listdir(self.corpus_dir)):
+            entry = []
+            with open(os.path.join(self.corpus_dir, fname), 'r') as f:
+                for line in f:
+                    vals = line.split()
+                    if len(vals) != 2 or vals[0] not in self.by_name:
+                        continue
+                    tmpl = self.by_name[vals[0]]
+                    body = binascii.unhexlify(vals[1])
+                    tmpl.seeds.append(body)
+                    entry.append((tmpl, body))
+            if entry:
+                self.corpus.append((fname, entry))
+        logger.info("Loaded %d corpus entries from %s" % (len(self.corpus),
+                                                          self.corpus_dir))
+
+    def save(self, kind, entry):
+        if not self.corpus_dir:
+            return None
+        lines = [ "%s %s\n" % (tmpl.name, binascii.hexlify(body))
+                  for (tmpl, body) in entry ]
+        digest = hashlib.sha1(''.join(lines)).hexdigest()[0:16]
+        fname = os.path.join(self.corpus_dir,
+                             "%s-%s-%s" % (kind, entry[-1][0].name, digest))
+        with open(fname, 'w') as f:
+            f.writelines(lines)
+        logger.info("Saved %d frame(s) to %s" % (len(entry), fname))
+        return fname
+
+    def send(self, tmpl, body):
+        for (fc, payload) in tmpl.setup:
+            self.injector.mgmt_tx(MgmtFrame(fc, self.da, self.sa, self.bssid,
+                                            payload))
+        res = self.injector.mgmt_tx(MgmtFrame(tmpl.fc, self.da, self.sa,
+                                              self.bssid, tmpl.prefix + body))
+        if res is not None and "FAIL" in res:
+            self.tx_fail += 1
+
+    def alive(self):
+        self.checks += 1
+        try:
+            res = self.target.ctrl.request("PING", timeout=self.ping_timeout)
+        except Exception, e:
+            logger.info("Fuzzing target did not reply to PING: " + str(e))
+            return False
+        self.injector.dump_monitor()
+        return "PONG" in res
+
+    def reproduces(self, entry):
+        if not self.alive():
+            (self.injector, self.target) = self.restart()
+        for (tmpl, body) in entry:
+            self.send(tmpl, body)
+        time.sleep(self.settle)
+        return not self.alive()
+
+    def minimize(self, window):
+        """Find a single frame from window that stops the target and remove
+        as much of its body as possible while it still does so"""
+        for (tmpl, body) in reversed(window):
+            if self.reproduces([ (tmpl, body) ]):
+                break
+        else:
+            logger.info("Crash did not reproduce with a single frame")
+            return None
+        trials = 0
+        chunk = len(body) / 2
+        while chunk >= 1 and trials < self.max_minimize_trials:
+            pos = 0
+            while pos < len(body) and trials < self.max_minimize_trials:
+                trials += 1
+                cand = body[0:pos] + body[pos + chunk:]
+                if self.reproduces([ (tmpl, cand) ]):
+                    body = cand
+                else:
+                    pos += chunk
+            chunk /= 2
+        logger.info("Minimized crash to %s %s (%d trials)" %
+                    (tmpl.name, binascii.hexlify(body), trials))
+        return (tmpl, body)
+
+    def crash(self, window):
+        logger.info("Fuzzing target stopped responding within %d frames" %
+                    len(window))
+        crash = { 'window': self.save("window", window),
+                  'frames': len(window) }
+        if self.restart:
+            res = self.minimize(window)
+            if res:
+                crash['template'] = res[0].name
+                crash['body'] = binascii.hexlify(res[1])
+                crash['file'] = self.save("crash", [ res ])
+            if not self.alive():
+                (self.injector, self.target) = self.restart()
+        self.crashes.append(crash)
+
+    def replay(self):
+        """Replay the corpus entries and return the names of the ones that
+        stop the target"""
+        failed = []
+        for (fname, entry) in self.corpus:
+            for (tmpl, body) in entry:
+                self.send(tmpl, body)
+            time.sleep(self.settle)
+            if not self.alive():
+                logger.info("Corpus entry %s stopped the target" % fname)
+                failed.append(fname)
+                if not self.restart:
+                    break
+                (self.injector, self.target) = self.restart()
+        return failed
+
+    def run(self, count=None, duration=None):
+        """Replay the corpus and send count fuzzed frames (or for duration
+        seconds); stops at the first crash unless restart is available"""
+        logger.info("Management frame fuzzing with seed %d" % self.seed)
+        start = time.time()
+        self.replayed = self.replay()
+        if self.replayed and not self.restart:
+            self.elapsed = time.time() - start
+            return self.report()
+        end = start + duration if duration else None
+        interval = 1.0 / self.rate if self.rate else 0
+        next_send = time.time()
+        window = []
+        prev_window = []
+        while (count is None or self.sent < count) and \
+              (end is None or time.time() < end):
+            tmpl = self.rng.choice(self.templates)
+            base = self.rng.choice(tmpl.seeds)
+            body = self.mutator.mutate(base, tmpl.elements,
+                                       self.rng.randint(1, self.max_rounds))
+            self.send(tmpl, body)
+            self.sent += 1
+            self.counts[tmpl.name] += 1
+            window.append((tmpl, body))
+            if len(window) >= self.check_interval:
+                if not self.alive():
+                    # The frame may have been processed after the PING that
+                    # ended the previous window.
+                    self.crash(prev_window + window)
+                    if not self.restart:
+                        break
+                    window = []
+                prev_window = window
+                window = []
+            if interval:
+                next_send += interval
+                wait = next_send - time.time()
+                if wait > 0:
+                    time.sleep(wait)
+        if window:
+            time.sleep(self.settle)
+            if not self.alive():
+                self.crash(prev_window + window)
+        self.elapsed = time.time() - start
+        return self.report()
+
+    def report(self):
+        res = {}
+        res['seed'] = self.seed
+        res['sent'] = self.sent
+        res['tx_fail'] = self.tx_fail
+        res['checks'] = self.checks
+        res['elapsed'] = self.elapsed
+        if self.elapsed > 0:
+            res['frames_per_sec'] = self.sent / self.elapsed
+        res['templates'] = dict(self.counts)
+        res['replay_failed'] = list(self.replayed)
+        res['crashes'] = list(self.crashes)
+        return res
+
+def log_report(res):
+    logger.info("Management frame fuzzing (seed %d): %d frames in %.2f s (%.1f frames/s) tx_fail=%d checks=%d crashes=%d replay_failed=%d" % (res['seed'], res['sent'], res['elapsed'], res.get('frames_per_sec', 0), res['tx_fail'], res['checks'], len(res['crashes']), len(res['replay_failed'])))
+    logger.info("Frames per template: " + str(res['templates']))
+    for crash in res['crashes']:
+        logger.info("Crash: " + str(crash))
+
+def wsc_attr(attr, val):
+    return WSC_ATTR_HDR.pack(attr, len(val)) + val
+
+_GAS_INITIAL_REQ = struct.Struct('<BBB')
+_ANQP_ELEM_HDR = struct.Struct('<HH')
+
+def anqp_elem(info_id, payload):
+    return _ANQP_ELEM_HDR.pack(info_id, len(payload)) + payload
+
+def gas_initial_req_body(query):
+    return frames.anqp_adv_proto() + _U16_LE.pack(len(query)) + query
+
+def p2p_templates(dst, src):
+    """Templates for a P2P Device target (dst) receiving frames from src"""
+    dev_info = frames.p2p_attr_device_info(src, config_methods=0x0188)
+    group_id = frames.p2p_attr_group_id(src, "DIRECT-fuzz")
+    wsc = frames.ie_wsc(frames.wsc_attr_config_methods(0x0188))
+    res = []
+    for (name, subtype, attrs) in [
+            ("p2p-go-neg-req", frames.P2P_GO_NEG_REQ,
+             [ frames.p2p_attr_capability(),
+               frames.p2p_attr_go_intent(go_intent=7, tie_breaker=1),
+               frames.p2p_attr_config_timeout(),
+               frames.p2p_attr_listen_channel(),
+               frames.p2p_attr_ext_listen_timing(),
+               frames.p2p_attr_intended_interface_addr(src),
+               frames.p2p_attr_channel_list(), dev_info,
+               frames.p2p_attr_operating_channel() ]),
+            ("p2p-go-neg-resp", frames.P2P_GO_NEG_RESP,
+             [ frames.p2p_attr_status(), frames.p2p_attr_capability(),
+               frames.p2p_attr_go_intent(go_intent=7),
+               frames.p2p_attr_config_timeout(),
+               frames.p2p_attr_intended_interface_addr(src),
+               frames.p2p_attr_channel_list(), dev_info,
+               frames.p2p_attr_operating_channel() ]),
+            ("p2p-invitation-req", frames.P2P_INVITATION_REQ,
+             [ frames.p2p_attr_config_timeout(),
+               frames.p2p_attr_invitation_flags(),
+               frames.p2p_attr_operating_channel(),
+               frames.p2p_attr_group_bssid(src),
+               frames.p2p_attr_channel_list(), group_id, dev_info ]),
+            ("p2p-prov-disc-req", frames.P2P_PROV_DISC_REQ,
+             [ frames.p2p_attr_capability(), dev_info, group_id ]),
+            ("p2p-dev-disc-req", frames.P2P_DEV_DISC_REQ,
+             [ frames.p2p_attr_device_id(dst), group_id ]) ]:
+        prefix = frames.p2p_hdr(dst, src, type=subtype)['payload']
+        res.append(FuzzTemplate(name, frames.MGMT_SUBTYPE_ACTION, prefix,
+                                frames.ie_p2p(''.join(attrs)) + wsc))
+
+    probe = frames.ie_ssid("DIRECT-") + frames.ie_supp_rates() + \
+        frames.ie_p2p(frames.p2p_attr_listen_channel()) + wsc
+    res.append(FuzzTemplate("p2p-probe-req", frames.MGMT_SUBTYPE_PROBE_REQ,
+                            '', probe))
+
+    # P2P service discovery request for all services
+    sd = P2P_OUI_TYPE + _U16_LE.pack(0) + _U16_LE.pack(2) + \
+        struct.pack('BB', 0, 1)
+    prefix = _GAS_INITIAL_REQ.pack(frames.ACTION_CATEG_PUBLIC,
+                                   frames.GAS_INITIAL_REQUEST, 1)
+    res.append(FuzzTemplate("p2p-sd-req", frames.MGMT_SUBTYPE_ACTION, prefix,
+                            gas_initial_req_body(anqp_elem(0xdddd, sd)),
+                            elements=False))
+    return res
+
+def ap_templates(bssid, src, ssid):
+    """Templates for a hostapd target BSS with WPA2, WPS, and Interworking
+    (ANQP server) enabled"""
+    res = []
+
+    # ANQP Query list and Hotspot 2.0 Query list
+    query = anqp_elem(256, struct.pack('<8H', 257, 258, 260, 261, 262, 263,
+                                       264, 268))
+    query += anqp_elem(0xdddd, '\x50\x6f\x9a\x11' + struct.pack('BB', 1, 0) +
+                       struct.pack('6B', 2, 3, 4, 5, 6, 7))
+    prefix = _GAS_INITIAL_REQ.pack(frames.ACTION_CATEG_PUBLIC,
+                                   frames.GAS_INITIAL_REQUEST, 1)
+    res.append(FuzzTemplate("gas-anqp-query", frames.MGMT_SUBTYPE_ACTION,
+                            prefix, gas_initial_req_body(query),
+                            elements=False))
+    prefix = _GAS_INITIAL_REQ.pack(frames.ACTION_CATEG_PUBLIC,
+                                   frames.GAS_COMEBACK_REQUEST, 1)
+    res.append(FuzzTemplate("gas-comeback-req", frames.MGMT_SUBTYPE_ACTION,
+                            prefix, '', elements=False))
+
+    wsc = wsc_attr(0x104a, '\x10') + wsc_attr(0x103a, '\x01') + \
+        frames.wsc_attr_config_methods(0x0188) + \
+        wsc_attr(0x1047, 16 * '\x11') + \
+        wsc_attr(0x1054, binascii.unhexlify("00010050F2040001")) + \
+        wsc_attr(0x103c, '\x01') + wsc_attr(0x1002, '\x00\x00') + \
+        wsc_attr(0x1009, '\x00\x00') + wsc_attr(0x1012, '\x00\x00') + \
+        wsc_attr(0x1049, '\x00\x37\x2a\x00\x01\x20')
+    res.append(FuzzTemplate("wps-probe-req", frames.MGMT_SUBTYPE_PROBE_REQ,
+                            '', frames.ie_ssid(ssid) + frames.ie_supp_rates() +
+                            frames.ie_wsc(wsc)))
+
+    rsn = struct.pack('<H4sH4sH4sH', 1, '\x00\x0f\xac\x04', 1,
+                      '\x00\x0f\xac\x04', 1, '\x00\x0f\xac\x02', 0)
+    auth = struct.pack('<HHH', 0, 1, 0)
+    res.append(FuzzTemplate("rsn-assoc-req", frames.MGMT_SUBTYPE_ASSOC_REQ,
+                            struct.pack('<HH', 0x0431, 10),
+                            frames.ie_ssid(ssid) + frames.ie_supp_rates() +
+                            frames.ie(frames.WLAN_EID_RSN, rsn),
+                            setup=[ (frames.MGMT_SUBTYPE_AUTH, auth) ]))
+    return res
+
+if __name__ == '__main__':
+    import argparse
+    import subprocess
+
+    import hostapd
+    from wpasupplicant import WpaSupplicant
+
+    parser = argparse.ArgumentParser(description='Management frame fuzzer')
+    parser.add_argument('--injector', required=True,
+                        help='hostapd interface used for frame injection')
+    parser.add_argument('--target', required=True,
+                        help='target interface')
+    parser.add_argument('--target-type', choices=[ 'hostapd', 'p2p' ],
+                        default='hostapd')
+    parser.add_argument('--ssid', default='fuzz')
+    parser.add_argument('--count', type=int)
+    parser.add_argument('--duration', type=float)
+    parser.add_argument('--rate', type=float)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--corpus', help='corpus directory')
+    parser.add_argument('--restart-cmd',
+                        help='shell command to restart the processes after a crash')
+    args = parser.parse_args()
+
+    logger.setLevel(logging.INFO)
+    logger.addHandler(logging.StreamHandler())
+
+    def connect():
+        injector = hostapd.Hostapd(args.injector)
+        injector.set("ext_mgmt_frame_handling", "1")
+        if args.target_type == 'hostapd':
+            target = hostapd.Hostapd(args.target)
+            da = target.get_status_field("bssid[0]")
+        else:
+            target = WpaSupplicant(args.target)
+            da = target.p2p_dev_addr()
+        return injector, target, da
+
+    def restart():
+        subprocess.call(args.restart_cmd, shell=True)
+        for i in range(50):
+            try:
+                injector, target, da = connect()
+                return injector, target
+            except Exception:
+                time.sleep(0.2)
+        raise Exception("Processes did not come back after restart")
+
+    injector, target, da = connect()
+    sa = injector.get_status_field("bssid[0]")
+    if args.target_type == 'hostapd':
+        templates = ap_templates(da, sa, args.ssid)
+    else:
+        templates = p2p_templates(da, sa)
+    fuzzer = MgmtFuzzer(injector, target, templates, da, sa, seed=args.seed,
+                        corpus_dir=args.corpus, rate=args.rate,
+                        restart=restart if args.restart_cmd else None)
+    log_report(fuzzer.run(count=args.count, duration=args.duration))
@@ -0,0 +1,120 @@
+# Dynamically created P2P Devices
+#
+# This software may be distributed under the terms of the BSD license.
+# See README for more details.
+
+import os
+import time
+import logging
+import subprocess
+
+from hwsim import HWSimController, radio_ifname
+from wpasupplicant import WpaSupplicant, ctrl_group
+from utils import get_pid
+
+logger = logging.getLogger()
+
+WPAS = "../../wpa_supplicant/wpa_supplicant"
+wpas_ctrl = '/var/run/wpa_supplicant'
+
+class P2PDevices(object):
+    """A set of additional P2P Devices for tests that need more than the
+    three static wpa_supplicant instances
+
+    Each device uses its own mac80211_hwsim radio and its own wpa_supplicant
+    process since P2P state is per process. The processes can be restarted
+    with a different configuration (e.g., listen channel) without recreating
+    the radios."""
+
+    def __init__(self, logdir, count):
+        self.logdir = logdir
+        self.hwsim = HWSimController()
+        self.group = ctrl_group()
+        self.radios = []
+        self.ifnames = []
+        self.procs = []
+        self.devs = []
+        try:
+            for i in range(0, count):
+                radio = self.hwsim.create_radio()
+                self.radios.append(radio)
+                self.ifnames.append(radio_ifname(radio))
+        except:
+            self.close()
+            raise
+
+    def _global_iface(self, i):
+        return "/tmp/wpas-p2p-dev%d" % i
+
+    def start(self, listen_channels=None, extra=None):
+        """Start a wpa_supplicant process for each device and return the
+        WpaSupplicant instances
+
+        listen_channels is an optional list of 2.4 GHz listen channels that
+        are assigned to the devices in round robin order. extra is an
+        optional list of additional configuration lines."""
+        self.stop()
+        for i in range(0, len(self.ifnames)):
+            ifname = self.ifnames[i]
+            confname = os.path.join(self.logdir, "p2p-dev%d.conf" % i)
+            with open(confname, "w") as f:
+                f.write("ctrl_interface=DIR=%s GROUP=%s\n" % (wpas_ctrl,
+                                                             self.group))
+                f.write("device_name=Device D%d\n" % i)
+                f.write("p2p_no_group_iface=1\n")
+                if listen_channels:
+                    chan = listen_channels[i % len(listen_channels)]
+                    f.write("p2p_listen_reg_class=81\n")
+                    f.write("p2p_listen_channel=%d\n" % chan)
+                for line in extra or []:
+                    f.write(line + "\n")
+            global_iface = self._global_iface(i)
+            cmd = [ 'sudo', WPAS, '-g', global_iface, '-G' + self.group,
+                    '-Dnl80211', '-i' + ifname, '-c', confname, '-ddKt',
+                    '-f', self.logfile(i) ]
+            self.procs.append(subprocess.Popen(cmd))
+        for i in range(0, len(self.ifnames)):
+            path = os.path.join(wpas_ctrl, self.ifnames[i])
+            for j in range(0, 50):
+                if os.path.exists(path):
+                    break
+                time.sleep(0.1)
+            dev = WpaSupplicant(self.ifnames[i], self._global_iface(i))
+            if not dev.ping():
+                raise Exception("Could not ping wpa_supplicant on " +
+                                self.ifnames[i])
+            self.devs.append(dev)
+        return self.devs
+
+    def logfile(self, i):
+        """Return the debug log file of the wpa_supplicant process of
+        device i"""
+        return os.path.join(self.logdir, "log-p2p-dev%d" % i)
+
+    def pid(self, i):
+        """Return the PID of the wpa_supplicant process of device i"""
+        return get_pid(self._global_iface(i) + " ")
+
+    def stop(self):
+        for dev in self.devs:
+            try:
+                dev.global_request("TERMINATE")
+            except Exception, e:
+                logger.info("Failed to terminate wpa_supplicant: " + str(e))
+        for proc in self.procs:
+            for i in range(0, 50):
+                if proc.poll() is not None:
+                    break
+                time.sleep(0.1)
+            else:
+                subprocess.call([ 'sudo', 'kill', str(proc.pid) ])
+                proc.wait()
+        self.devs = []
+        self.procs = []
+
+    def close(self):
+        self.stop()
+        for radio in self.radios:
+            self.hwsim.destroy_radio(radio)
+        self.radios = []
+        self.ifnames = []
@@ -0,0 +1,214 @@
+# RADIUS DAS Disconnect/CoA burst generator
+#
+# This software may be distributed under the terms of the BSD license.
+# See README for more details.
+
+import hashlib
+import logging
+import select
+import socket
+import struct
+import time
+
+import pyrad.packet
+import pyrad.dictionary
+
+import radius_das
+from utils import latency_stats, format_latency_stats
+
+logger = logging.getLogger()
+
+RADIUS_HDR = struct.Struct(">BBH16s")
+
+RESPONSE_CODES = {
+    pyrad.packet.DisconnectACK: 'ack',
+    pyrad.packet.DisconnectNAK: 'nak',
+    pyrad.packet.CoAACK: 'ack',
+    pyrad.packet.CoANAK: 'nak',
+}
+
+class DasBurst(object):
+    """Send a burst of Disconnect-Request or CoA-Request messages
+
+    Requests are built with radius_das.DisconnectPacket/CoAPacket from a
+    list of attribute dictionaries (pyrad keyword style, e.g.,
+    Calling_Station_Id) and sent at the target rate. Up to 256 requests can
+    be pending per source socket, so the number of sockets limits the
+    number of concurrently pending requests. Responses are matched to
+    requests by socket and Identifier and accepted only with a valid
+    Response Authenticator."""
+
+    def __init__(self, server="127.0.0.1", port=3799, secret="secret",
+                 coa=False, socks=4, rate=1000, timeout=2,
+                 event_timestamp=True, dict_file="dictionary.radius"):
+        self.dict = pyrad.dictionary.Dictionary(dict_file)
+        self.server = (server, port)
+        self.secret = secret
+        self.packet_class = radius_das.CoAPacket if coa else radius_das.DisconnectPacket
+        self.num_socks = socks
+        self.rate = rate
+        self.timeout = timeout
+        self.event_timestamp = event_timestamp
+        self.pending = {}
+        self.latency = []
+        self.sent = 0
+        self.results = { 'ack': 0, 'nak': 0, 'timeout': 0, 'invalid': 0 }
+        self.error_causes = {}
+        self.elapsed = 0
+
+    def _send(self, sock, rad_id, attrs):
+        if self.event_timestamp and 'Event_Timestamp' not in attrs:
+            attrs = dict(attrs)
+            attrs['Event_Timestamp'] = int(time.time())
+        req = self.packet_class(dict=self.dict, secret=self.secret, id=rad_id,
+                                **attrs)
+        msg = req.RequestPacket()
+        now = time.time()
+        self.pending[(sock.fileno(), rad_id)] = (req.authenticator, now)
+        self.sent += 1
+        sock.sendto(msg, self.server)
+
+    def _receive(self, sock):
+        while True:
+            try:
+                msg = sock.recv(4096)
+            except socket.error:
+                return
+            now = time.time()
+            if len(msg) < RADIUS_HDR.size:
+                self.results['invalid'] += 1
+                continue
+            code, rad_id, length, resp_auth = RADIUS_HDR.unpack_from(msg)
+            key = (sock.fileno(), rad_id)
+            if key not in self.pending or length > len(msg):
+                self.results['invalid'] += 1
+                continue
+            msg = msg[0:length]
+            req_auth, start = self.pending[key]
+            if hashlib.md5(msg[0:4] + req_auth + msg[20:] +
+                           self.secret).digest() != resp_auth:
+                logger.debug("Invalid Response Authenticator")
+                self.results['invalid'] += 1
+                continue
+            del self.pending[key]
+            self.free_ids[sock.fileno()].append(rad_id)
+            self.latency.append(now - start)
+            res = RESPONSE_CODES.get(code, 'invalid')
+            self.results[res] += 1
+            if res == 'nak':
+                reply = pyrad.packet.Packet(packet=msg, secret=self.secret,
+                                            dict=self.dict)
+                if 'Error-Cause' in reply:
+                    cause = reply['Error-Cause'][0]
+                    self.error_causes[cause] = self.error_causes.get(cause, 0) + 1
+
+    def _expire(self, now):
+        for key, (req_auth, start) in self.pending.items():
+            if start + self.timeout <= now:
+                del self.pending[key]
+                self.free_ids[key[0]].append(key[1])
+                self.results['timeout'] += 1
+
+    def run(self, requests):
+        """Send a Disconnect/CoA-Request for each attribute dictionary in
+        requests and wait for all responses or timeouts"""
+        poll = select.poll()
+        socks = {}
+        self.free_ids = {}
+        for i in range(self.num_socks):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setblocking(0)
+            socks[sock.fileno()] = sock
+            self.free_ids[sock.fileno()] = range(256)
+            poll.register(sock.fileno(), select.POLLIN)
+        fds = socks.keys()
+
+        interval = 1.0 / self.rate
+        start = time.time()
+        next_send = start
+        pos = 0
+        while pos < len(requests) or self.pending:
+            now = time.time()
+            blocked = False
+            while pos < len(requests) and next_send <= now:
+                fd = fds[pos % len(fds)]
+                if not self.free_ids[fd]:
+                    fd = None
+                    for f in fds:
+                        if self.free_ids[f]:
+                            fd = f
+                            break
+                    if fd is None:
+                        blocked = True
+                        break
+                self._send(socks[fd], self.free_ids[fd].pop(), requests[pos])
+                pos += 1
+                next_send += interval
+            if blocked:
+                # All Identifiers are in use; wait for a response or for
+                # the oldest pending request to time out
+                oldest = min([ t for (req_auth, t) in self.pending.values() ])
+                wait = max(0, oldest + self.timeout - time.time())
+            elif pos < len(requests):
+                wait = max(0, next_send - time.time())
+            else:
+                wait = self.timeout
+            for (fd, event) in poll.poll(wait * 1000):
+                self._receive(socks[fd])
+            self._expire(time.time())
+        self.elapsed = time.time() - start
+        for fd, sock in socks.items():
+            poll.unregister(fd)
+            sock.close()
+        return self.report()
+
+    def report(self):
+        res = dict(self.results)
+        res['sent'] = self.sent
+        res['elapsed'] = self.elapsed
+        if self.elapsed > 0:
+            res['sent_per_sec'] = self.sent / self.elapsed
+            res['ack_per_sec'] = self.results['ack'] / self.elapsed
+            res['nak_per_sec'] = self.results['nak'] / self.elapsed
+        res['error_causes'] = dict(self.error_causes)
+        res['latency'] = latency_stats(self.latency)
+        return res
+
+def log_report(res):
+    logger.info("DAS burst: %d requests in %.2f s (%.1f requests/s): ack=%d nak=%d timeout=%d invalid=%d error_causes=%s" % (res['sent'], res['elapsed'], res.get('sent_per_sec', 0), res['ack'], res['nak'], res['timeout'], res['invalid'], str(res['error_causes'])))
+    logger.info("DAS response latency: " + format_latency_stats(res['latency']))
+
+def station_requests(count, user_name=None):
+    """Disconnect/CoA-Request attributes for count locally administered
+    station addresses that are not expected to be associated"""
+    reqs = []
+    for i in range(count):
+        attrs = { 'Calling_Station_Id': "06-00-%02X-%02X-%02X-%02X" %
+                  ((i >> 24) & 0xff, (i >> 16) & 0xff, (i >> 8) & 0xff,
+                   i & 0xff) }
+        if user_name:
+            attrs['User_Name'] = user_name
+        reqs.append(attrs)
+    return reqs
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='RADIUS DAS Disconnect/CoA burst generator')
+    parser.add_argument('--server', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=3799)
+    parser.add_argument('--secret', default='secret')
+    parser.add_argument('--coa', action='store_true',
+                        help='send CoA-Request instead of Disconnect-Request')
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--rate', type=float, default=1000,
+                        help='requests per second')
+    parser.add_argument('--socks', type=int, default=4,
+                        help='number of source sockets')
+    args = parser.parse_args()
+
+    logger.setLevel(logging.INFO)
+    logger.addHandler(logging.StreamHandler())
+    burst = DasBurst(server=args.server, port=args.port, secret=args.secret,
+                     coa=args.coa, socks=args.socks, rate=args.rate)
+    log_report(burst.run(station_requests(args.count)))
@@ -0,0 +1,361 @@
+# RADIUS authentication load generator
+#
+# This software may be distributed under the terms of the BSD license.
+# See README for more details.
+
+import hashlib
+import hmac
+import collections
+import logging
+import os
+import select
+import socket
+import struct
+import time
+
+import pyrad.dictionary
+
+from utils import latency_stats, format_latency_stats
+
+logger = logging.getLogger()
+
+RADIUS_CODE_ACCESS_REQUEST = 1
+RADIUS_CODE_ACCESS_ACCEPT = 2
+RADIUS_CODE_ACCESS_REJECT = 3
+RADIUS_CODE_ACCESS_CHALLENGE = 11
+
+EAP_CODE_REQUEST = 1
+EAP_CODE_RESPONSE = 2
+EAP_CODE_SUCCESS = 3
+EAP_CODE_FAILURE = 4
+
+EAP_TYPE_IDENTITY = 1
+EAP_TYPE_NAK = 3
+EAP_TYPE_MD5 = 4
+
+RADIUS_HDR = struct.Struct(">BBH16s")
+RADIUS_ATTR_HDR = struct.Struct(">BB")
+EAP_HDR = struct.Struct(">BBHB")
+
+# Identifiers per socket; a new source port is used for every
+# MAX_PENDING_PER_SOCK concurrent exchanges.
+MAX_PENDING_PER_SOCK = 256
+
+class RadiusLoadSession(object):
+    __slots__ = [ 'addr', 'state', 'eap_id', 'start', 'req_start', 'sock',
+                  'rad_id', 'req_auth', 'deadline', 'rounds' ]
+
+    def __init__(self, addr):
+        self.addr = addr
+        self.state = None
+        self.eap_id = 0
+        self.start = None
+        self.req_start = None
+        self.sock = None
+        self.rad_id = None
+        self.req_auth = None
+        self.deadline = None
+        self.rounds = 0
+
+class RadiusAuthLoad(object):
+    """Generate EAP-MD5 authentications towards a RADIUS server
+
+    Each simulated supplicant uses its own Calling-Station-Id. New
+    exchanges are started at the configured rate (exchanges per second) and
+    each exchange consists of Access-Request/EAP-Response/Identity,
+    Access-Challenge/EAP-Request/MD5, Access-Request/EAP-Response/MD5 and
+    the final Access-Accept/Reject. Message-Authenticator is added to all
+    requests and validated in all responses."""
+
+    def __init__(self, server="127.0.0.1", port=1812, secret="radius",
+                 identity="md5 user", password="password", stations=100,
+                 rate=10, timeout=5, dict_file="dictionary.radius"):
+        d = pyrad.dictionary.Dictionary(dict_file)
+        self.attr_user_name = d.attributes["User-Name"].code
+        self.attr_state = d.attributes["State"].code
+        self.attr_calling_station_id = d.attributes["Calling-Station-Id"].code
+        self.attr_eap_message = d.attributes["EAP-Message"].code
+        self.attr_msg_auth = d.attributes["Message-Authenticator"].code
+
+        self.server = (server, port)
+        self.secret = secret
+        self.identity = identity
+        self.password = password
+        self.rate = rate
+        self.timeout = timeout
+        self.idle = collections.deque(
+            [ RadiusLoadSession("02-00-%02X-%02X-%02X-%02X" %
+                                ((i >> 24) & 0xff, (i >> 16) & 0xff,
+                                 (i >> 8) & 0xff, i & 0xff))
+              for i in range(stations) ])
+        self.socks = {}
+        self.free_ids = {}
+        self.pending = {}
+        self.req_latency = []
+        self.exchange_latency = []
+        self.requests = 0
+        self.accepts = 0
+        self.rejects = 0
+        self.timeouts = 0
+        self.invalid = 0
+        self.elapsed = 0
+
+    def _get_sock(self):
+        for fd, sock in self.socks.items():
+            if self.free_ids[fd]:
+                return sock
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setblocking(0)
+        self.socks[sock.fileno()] = sock
+        self.free_ids[sock.fileno()] = range(MAX_PENDING_PER_SOCK)
+        self._poll.register(sock.fileno(), select.POLLIN)
+        return sock
+
+    def _attr(self, atype, val):
+        return RADIUS_ATTR_HDR.pack(atype, 2 + len(val)) + val
+
+    def _eap_attrs(self, eap):
+        return ''.join([ self._attr(self.attr_eap_message, eap[i:i + 253])
+                         for i in range(0, len(eap), 253) ])
+
+    def _send(self, sess, eap):
+        sock = self._get_sock()
+        rad_id = self.free_ids[sock.fileno()].pop()
+        req_auth = os.urandom(16)
+        attrs = self._attr(self.attr_user_name, self.identity)
+        attrs += self._attr(self.attr_calling_station_id, sess.addr)
+        if sess.state is not None:
+            attrs += self._attr(self.attr_state, sess.state)
+        attrs += self._eap_attrs(eap)
+        length = 20 + len(attrs) + 18
+        hdr = RADIUS_HDR.pack(RADIUS_CODE_ACCESS_REQUEST, rad_id, length,
+                              req_auth)
+        mac = hmac.new(self.secret, hdr + attrs +
+                       self._attr(self.attr_msg_auth, 16 * '\x00')).digest()
+        msg = hdr + attrs + self._attr(self.attr_msg_auth, mac)
+
+        sess.sock = sock
+        sess.rad_id = rad_id
+        sess.req_auth = req_auth
+        sess.req_start = time.time()
+        sess.deadline = sess.req_start + self.timeout
+        self.pending[(sock.fileno(), rad_id)] = sess
+        self.requests += 1
+        sock.sendto(msg, self.server)
+
+    def _release(self, sess):
+        del self.pending[(sess.sock.fileno(), sess.rad_id)]
+        self.free_ids[sess.sock.fileno()].append(sess.rad_id)
+
+    def _finish(self, sess, now):
+        self.exchange_latency.append(now - sess.start)
+        sess.state = None
+        self.idle.append(sess)
+
+    def _start(self, now):
+        sess = self.idle.popleft()
+        sess.start = now
+        sess.state = None
+        sess.rounds = 0
+        sess.eap_id = 0
+        eap = EAP_HDR.pack(EAP_CODE_RESPONSE, sess.eap_id,
+                           EAP_HDR.size + len(self.identity),
+                           EAP_TYPE_IDENTITY) + self.identity
+        self._send(sess, eap)
+
+    def _parse(self, msg, sess):
+        if len(msg) < 20:
+            return None
+        code, rad_id, length, resp_auth = RADIUS_HDR.unpack_from(msg)
+        if length > len(msg):
+            return None
+        msg = msg[0:length]
+        expected = hashlib.md5(msg[0:4] + sess.req_auth + msg[20:] +
+                               self.secret).digest()
+        if expected != resp_auth:
+            logger.debug("Invalid Response Authenticator")
+            return None
+        attrs = {}
+        pos = 20
+        msg_auth_pos = None
+        while pos + 2 <= length:
+            atype, alen = RADIUS_ATTR_HDR.unpack_from(msg, pos)
+            if alen < 2 or pos + alen > length:
+                return None
+            if atype == self.attr_msg_auth:
+                msg_auth_pos = pos + 2
+            attrs.setdefault(atype, []).append(msg[pos + 2:pos + alen])
+            pos += alen
+        if msg_auth_pos is None:
+            logger.debug("No Message-Authenticator in response")
+            return None
+        zeroed = msg[0:4] + sess.req_auth + msg[20:msg_auth_pos] + \
+                 16 * '\x00' + msg[msg_auth_pos + 16:]
+        if hmac.new(self.secret, zeroed).digest() != \
+           msg[msg_auth_pos:msg_auth_pos + 16]:
+            logger.debug("Invalid Message-Authenticator in response")
+            return None
+        return code, attrs
+
+    def _process(self, sess, code, attrs, now):
+        if code == RADIUS_CODE_ACCESS_ACCEPT:
+            self.accepts += 1
+            self._finish(sess, now)
+            return
+        if code != RADIUS_CODE_ACCESS_CHALLENGE:
+            self.rejects += 1
+            self._finish(sess, now)
+            return
+        if self.attr_state in attrs:
+            sess.state = attrs[self.attr_state][0]
+        eap = ''.join(attrs.get(self.attr_eap_message, []))
+        if len(eap) < EAP_HDR.size:
+            self.invalid += 1
+            self._finish(sess, now)
+            return
+        ecode, eid, elen, etype = EAP_HDR.unpack_from(eap)
+        sess.eap_id = eid
+        sess.rounds += 1
+        if etype == EAP_TYPE_MD5 and elen > 5 and sess.rounds < 10:
+            clen = ord(eap[5])
+            challenge = eap[6:6 + clen]
+            value = hashlib.md5(chr(eid) + self.password + challenge).digest()
+            payload = chr(len(value)) + value
+            etype = EAP_TYPE_MD5
+        elif sess.rounds < 10:
+            payload = chr(EAP_TYPE_MD5)
+            etype = EAP_TYPE_NAK
+        else:
+            self.invalid += 1
+            self._finish(sess, now)
+            return
+        resp = EAP_HDR.pack(EAP_CODE_RESPONSE, eid,
+                            EAP_HDR.size + len(payload), etype) + payload
+        self._send(sess, resp)
+
+    def _receive(self, sock):
+        while True:
+            try:
+                msg = sock.recv(4096)
+            except socket.error:
+                return
+            now = time.time()
+            if len(msg) < 2:
+                continue
+            sess = self.pending.get((sock.fileno(), ord(msg[1])))
+            if sess is None:
+                self.invalid += 1
+                continue
+            res = self._parse(msg, sess)
+            if res is None:
+                self.invalid += 1
+                continue
+            self._release(sess)
+            self.req_latency.append(now - sess.req_start)
+            self._process(sess, res[0], res[1], now)
+
+    def _expire(self, now):
+        for key, sess in self.pending.items():
+            if sess.deadline <= now:
+                self._release(sess)
+                self.timeouts += 1
+                sess.state = None
+                self.idle.append(sess)
+
+    def run(self, duration=None, exchanges=None):
+        """Run the load for duration seconds or until the given number of
+        exchanges have been started and then wait for the pending ones"""
+        self._poll = select.poll()
+        interval = 1.0 / self.rate
+        start = time.time()
+        next_start = start
+        started = 0
+        while True:
+            now = time.time()
+            running = True
+            if duration is not None and now - start >= duration:
+                running = False
+            if exchanges is not None and started >= exchanges:
+                running = False
+            if not running and not self.pending:
+                break
+            while running and next_start <= now and self.idle:
+                self._start(now)
+                started += 1
+                next_start += interval
+                if exchanges is not None and started >= exchanges:
+                    break
+            if running and not self.idle and next_start < now:
+                # All simulated supplicants busy; do not build a backlog
+                next_start = now + interval
+            wait = self.timeout
+            if running:
+                wait = min(wait, max(0, next_start - now))
+            for (fd, event) in self._poll.poll(wait * 1000):
+                self._receive(self.socks[fd])
+            self._expire(time.time())
+        self.elapsed = time.time() - start
+        for fd, sock in self.socks.items():
+            self._poll.unregister(fd)
+            sock.close()
+        self.socks = {}
+        self.free_ids = {}
+        return self.report()
+
+    def report(self):
+        res = {}
+        res['elapsed'] = self.elapsed
+        res['requests'] = self.requests
+        res['accepts'] = self.accepts
+        res['rejects'] = self.rejects
+        res['timeouts'] = self.timeouts
+        res['invalid'] = self.invalid
+        if self.elapsed > 0:
+            res['requests_per_sec'] = self.requests / self.elapsed
+            res['accepts_per_sec'] = self.accepts / self.elapsed
+        res['request_latency'] = latency_stats(self.req_latency)
+        res['exchange_latency'] = latency_stats(self.exchange_latency)
+        return res
+
+def mib_delta(start, end, prefix="radiusAuthServ"):
+    delta = {}
+    for name, val in end.items():
+        if not name.startswith(prefix) or name not in start:
+            continue
+        try:
+            delta[name] = int(val) - int(start[name])
+        except ValueError:
+            pass
+    return delta
+
+def log_report(res):
+    logger.info("RADIUS load: %d requests in %.2f s (%.1f requests/s): accepts=%d rejects=%d timeouts=%d invalid=%d" % (res['requests'], res['elapsed'], res.get('requests_per_sec', 0), res['accepts'], res['rejects'], res['timeouts'], res['invalid']))
+    logger.info("Request latency: " +
+                format_latency_stats(res['request_latency']))
+    logger.info("Exchange latency: " +
+                format_latency_stats(res['exchange_latency']))
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='RADIUS authentication load generator')
+    parser.add_argument('--server', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=1812)
+    parser.add_argument('--secret', default='radius')
+    parser.add_argument('--identity', default='md5 user')
+    parser.add_argument('--password', default='password')
+    parser.add_argument('--stations', type=int, default=100,
+                        help='number of simulated supplicants')
+    parser.add_argument('--rate', type=float, default=10,
+                        help='new EAP exchanges per second')
+    parser.add_argument('--duration', type=float, default=10,
+                        help='load duration in seconds')
+    args = parser.parse_args()
+
+    logger.setLevel(logging.INFO)
+    logger.addHandler(logging.StreamHandler())
+    load = RadiusAuthLoad(server=args.server, port=args.port,
+                          secret=args.secret, identity=args.identity,
+                          password=args.password, stations=args.stations,
+                          rate=args.rate)
+    log_report(load.run(duration=args.duration))
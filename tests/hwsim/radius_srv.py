@@ -0,0 +1,175 @@
+# RADIUS test server
+#
+# This software may be distributed under the terms of the BSD license.
+# See README for more details.
+
+import hmac
+import logging
+import os
+import select
+import socket
+import struct
+import threading
+import time
+
+import pyrad.packet
+import pyrad.dictionary
+
+from utils import latency_stats
+
+logger = logging.getLogger()
+
+RADIUS_ATTR_CALLING_STATION_ID = 31
+RADIUS_ATTR_EAP_MESSAGE = 79
+RADIUS_ATTR_MESSAGE_AUTHENTICATOR = 80
+
+RADIUS_MAX_ATTR_LEN = 253
+
+def eap_message_reassemble(pkt):
+    """Return the EAP packet carried in (possibly multiple) EAP-Message
+    attributes of a RADIUS message or None if there is no EAP payload"""
+    if RADIUS_ATTR_EAP_MESSAGE not in pkt:
+        return None
+    frags = pkt[RADIUS_ATTR_EAP_MESSAGE]
+    if len(frags) > 1:
+        logger.debug("Reassemble EAP-Message from %d attributes" % len(frags))
+    return ''.join(frags)
+
+def eap_message_fragment(eap):
+    return [eap[i:i + RADIUS_MAX_ATTR_LEN]
+            for i in range(0, len(eap), RADIUS_MAX_ATTR_LEN)]
+
+def add_message_authenticator(reply, req_authenticator, secret=None,
+                              duplicate=False):
+    if secret is None:
+        secret = reply.secret
+    hmac_obj = hmac.new(secret)
+
+    reply.AddAttribute("Message-Authenticator", 16 * "\x00")
+    attrs = reply._PktEncodeAttributes()
+    hmac_obj.update(struct.pack(">BBH", reply.code, reply.id, 20 + len(attrs)))
+    hmac_obj.update(req_authenticator)
+    hmac_obj.update(attrs)
+    if not duplicate:
+        del reply[RADIUS_ATTR_MESSAGE_AUTHENTICATOR]
+    reply.AddAttribute("Message-Authenticator", hmac_obj.digest())
+
+def eap_challenge(srv, pkt, eap_req):
+    reply = srv.create_reply(pkt, pyrad.packet.AccessChallenge)
+    if eap_req:
+        for frag in eap_message_fragment(eap_req):
+            reply.AddAttribute("EAP-Message", frag)
+    else:
+        logger.info("No EAP request available")
+    add_message_authenticator(reply, pkt.authenticator)
+    return reply
+
+class RadiusServer(object):
+    """RADIUS server for test cases
+
+    Authentication, accounting and Dynamic Authorization (RFC 5176)
+    requests are processed in a background thread. Each handler is called
+    as handler(srv, pkt) and returns the reply packet (see create_reply())
+    or None to drop the request. Access-Requests can alternatively be
+    handled by an engine (e.g., eap_scenario.EapScenarioEngine) that
+    provides auth_handler."""
+
+    def __init__(self, auth_handler=None, acct_handler=None,
+                 das_handler=None, authport=18138, acctport=18139,
+                 dasport=None, secret="radius", addr="",
+                 dict_file="dictionary.radius", engine=None):
+        self.dict = pyrad.dictionary.Dictionary(dict_file)
+        self.secret = secret
+        self.engine = engine
+        if auth_handler is None and engine is not None:
+            auth_handler = engine.auth_handler
+        self.latency = { 'auth': [], 'acct': [], 'das': [] }
+        self.dropped = 0
+        self._socks = {}
+        self._thread = None
+        for kind, port, handler in [ ('auth', authport, auth_handler),
+                                     ('acct', acctport, acct_handler),
+                                     ('das', dasport, das_handler) ]:
+            if handler is None or port is None:
+                continue
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind((addr, port))
+            self._socks[sock.fileno()] = (kind, sock, handler)
+
+    def start(self):
+        self._stop_r, self._stop_w = os.pipe()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread:
+            os.write(self._stop_w, "x")
+            self._thread.join()
+            self._thread = None
+            os.close(self._stop_r)
+            os.close(self._stop_w)
+        for fd, (kind, sock, handler) in self._socks.items():
+            sock.close()
+        self._socks = {}
+
+    def create_reply(self, pkt, code, **attributes):
+        reply = pkt.CreateReply(**attributes)
+        reply.code = code
+        return reply
+
+    def stats(self):
+        res = {}
+        for kind, samples in self.latency.items():
+            res[kind] = latency_stats(samples)
+        return res
+
+    def _parse(self, kind, data):
+        if kind == 'auth':
+            pkt = pyrad.packet.AuthPacket(packet=data, secret=self.secret,
+                                          dict=self.dict)
+            if pkt.code != pyrad.packet.AccessRequest:
+                raise pyrad.packet.PacketError("Unexpected code %d on authentication port" % pkt.code)
+            return pkt
+        # Accounting-Request, Disconnect-Request and CoA-Request use the
+        # same Request Authenticator construction.
+        pkt = pyrad.packet.AcctPacket(packet=data, secret=self.secret,
+                                      dict=self.dict)
+        if not pkt.VerifyAcctRequest():
+            raise pyrad.packet.PacketError("Invalid Request Authenticator")
+        return pkt
+
+    def _process(self, kind, sock, handler):
+        data, addr = sock.recvfrom(4096)
+        start = time.time()
+        try:
+            pkt = self._parse(kind, data)
+        except pyrad.packet.PacketError as err:
+            logger.info("RADIUS server received invalid packet: " + str(err))
+            self.dropped += 1
+            return
+        pkt.source = addr
+        reply = handler(self, pkt)
+        if reply is None:
+            self.dropped += 1
+            return
+        sock.sendto(reply.ReplyPacket(), addr)
+        self.latency[kind].append(time.time() - start)
+
+    def _run(self):
+        poll = select.poll()
+        poll.register(self._stop_r, select.POLLIN)
+        for fd in self._socks:
+            poll.register(fd, select.POLLIN)
+        while True:
+            for (fd, event) in poll.poll():
+                if fd == self._stop_r:
+                    return
+                if event != select.POLLIN:
+                    logger.error("Unexpected event in RADIUS server main loop")
+                    continue
+                kind, sock, handler = self._socks[fd]
+                try:
+                    self._process(kind, sock, handler)
+                except Exception, e:
+                    logger.info("RADIUS server failed to process %s request: %s" % (kind, str(e)))
@@ -6,10 +6,13 @@
 
 import logging
 logger = logging.getLogger()
+import os
+import json
 import subprocess
 import time
 
 import hostapd
+import acs_replay
 
 def wait_acs(hapd):
     ev = hapd.wait_event(["ACS-STARTED", "ACS-COMPLETED", "ACS-FAILED",
@@ -187,3 +190,71 @@ def test_ap_acs_vht(dev, apdev):
 
     finally:
         subprocess.call(['sudo', 'iw', 'reg', 'set', '00'])
+
+def acs_replay_run(apdev, fname, num_scans):
+    """Run ACS with survey data replayed from fname and return the selected
+    frequency and the time it took"""
+    params = { "ssid": "test-acs-replay", "channel": "0",
+               "acs_num_scans": str(num_scans),
+               "acs_survey_replay": fname }
+    hapd = hostapd.add_ap(apdev['ifname'], params, no_enable=True)
+    start = time.time()
+    hapd.enable()
+    ev = hapd.wait_event(["ACS-COMPLETED", "ACS-FAILED", "AP-DISABLED"],
+                         timeout=10 + 2 * num_scans)
+    if ev is None:
+        raise Exception("ACS timed out")
+    if "ACS-COMPLETED" not in ev:
+        raise Exception("Unexpected ACS event: " + ev)
+    elapsed = time.time() - start
+    freq = int(ev.split("freq=")[1].split(' ')[0])
+    ev = hapd.wait_event(["AP-ENABLED", "AP-DISABLED"], timeout=5)
+    if ev is None or "AP-ENABLED" not in ev:
+        raise Exception("AP setup failed after ACS")
+    hapd.disable()
+    return freq, elapsed
+
+def acs_replay_benchmark(apdev, logdir, seed, num_traces, num_scans_list):
+    traces = acs_replay.random_traces(seed, num_traces,
+                                      max(num_scans_list))
+    results = {}
+    for num_scans in num_scans_list:
+        durations = []
+        for i in range(0, len(traces)):
+            fname = os.path.join(logdir, "acs-trace-%d.txt" % i)
+            acs_replay.write_trace(fname, traces[i])
+            freq, elapsed = acs_replay_run(apdev[0], fname, num_scans)
+            expected = acs_replay.acs_choose(traces[i], num_scans)[0]
+            if freq != expected:
+                raise Exception("ACS selected %d MHz for trace %d with acs_num_scans=%d, model selected %d MHz" % (freq, i, num_scans, expected))
+            durations.append(elapsed)
+        results[num_scans] = { 'durations': durations,
+                               'mean': sum(durations) / len(durations) }
+        logger.info("acs_num_scans=%d: mean ACS duration %.3f s over %d traces" % (num_scans, results[num_scans]['mean'], len(traces)))
+
+    choices = acs_replay.evaluate(traces, num_scans_list)
+    summary = { 'seed': seed, 'traces': num_traces,
+                'acs': results, 'choices': choices }
+    with open(os.path.join(logdir, "acs-replay.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+def test_ap_acs_survey_replay(dev, apdev, params):
+    """ACS with replayed survey data compared to the offline model"""
+    acs_replay_benchmark(apdev, params['logdir'], 1, 5, [ 1, 3 ])
+
+def test_ap_acs_survey_replay_long(dev, apdev, params):
+    """ACS duration and channel choice over many replayed traces [long]"""
+    if not params['long']:
+        logger.info("Skip test case with long duration due to --long not specified")
+        return "skip"
+    acs_replay_benchmark(apdev, params['logdir'], 2, 30, [ 1, 2, 5, 10 ])
+
+def test_ap_acs_offline_eval(dev, apdev, params):
+    """Offline ACS channel choice evaluation over a large trace set"""
+    traces = acs_replay.random_traces(3, 1000, 20)
+    res = acs_replay.evaluate(traces, [ 1, 2, 5, 10 ])
+    if res[10]['same'] < res[1]['same']:
+        raise Exception("More scans did not make the channel choice more stable")
+    with open(os.path.join(params['logdir'], "acs-offline.json"), "w") as f:
+        json.dump(res, f, indent=2)
@@ -0,0 +1,68 @@
+# AP capacity tests with a large number of stations
+#
+# This software may be distributed under the terms of the BSD license.
+# See README for more details.
+
+import os
+import json
+import logging
+logger = logging.getLogger()
+
+import hostapd
+from fleet import StationFleet
+
+def fleet_capacity(apdev, logdir, name, params, num_stas, radios=False,
+                   **kwargs):
+    hapd = hostapd.add_ap(apdev[0]['ifname'], params)
+    fleet = StationFleet(num_stas, radios=radios)
+    try:
+        res = {}
+        res['connect'] = fleet.connect_all(params['ssid'], scan_freq="2412",
+                                           timeout=10 + num_stas / 4,
+                                           **kwargs)
+        status, res['states'] = fleet.states()
+        logger.info("Station states: " + str(res['states']))
+        res['ap_stations'] = int(hapd.get_status_field("num_sta[0]"))
+        res['disconnect'] = fleet.disconnect_all()
+        fleet.remove_networks()
+        with open(os.path.join(logdir, name + ".json"), "w") as f:
+            json.dump(res, f, indent=2)
+    finally:
+        fleet.close()
+    if res['connect']['connected'] != num_stas:
+        raise Exception("Not all stations connected: " +
+                        str(res['connect']['not_connected']))
+    if res['states']['states'].get('COMPLETED') != num_stas:
+        raise Exception("Unexpected station states: " +
+                        str(res['states']['states']))
+    if res['ap_stations'] != num_stas:
+        raise Exception("Unexpected number of stations in AP: %d" %
+                        res['ap_stations'])
+    if any([ s.get('bssid') != apdev[0]['bssid'] for s in status ]):
+        raise Exception("Station connected to unexpected BSS")
+    return res
+
+def test_ap_capacity_open(dev, apdev, params):
+    """AP capacity with a fleet of open stations"""
+    fleet_capacity(apdev, params['logdir'], "capacity-open",
+                   { "ssid": "capacity" }, 32, key_mgmt="NONE")
+
+def test_ap_capacity_wpa2_psk(dev, apdev, params):
+    """AP capacity with a fleet of WPA2-PSK stations"""
+    ap_params = hostapd.wpa2_params(ssid="capacity", passphrase="12345678")
+    fleet_capacity(apdev, params['logdir'], "capacity-wpa2-psk", ap_params,
+                   32, psk="12345678")
+
+def test_ap_capacity_radios(dev, apdev, params):
+    """AP capacity with stations on separate radios"""
+    fleet_capacity(apdev, params['logdir'], "capacity-radios",
+                   { "ssid": "capacity" }, 8, radios=True, key_mgmt="NONE")
+
+def test_ap_capacity_wpa2_psk_long(dev, apdev, params):
+    """AP capacity with hundreds of WPA2-PSK stations [long]"""
+    if not params['long']:
+        logger.info("Skip test case with long duration due to --long not specified")
+        return "skip"
+    ap_params = hostapd.wpa2_params(ssid="capacity", passphrase="12345678")
+    fleet_capacity(apdev, params['logdir'], "capacity-wpa2-psk-long",
+                   ap_params, 256, psk="12345678")
@@ -4,13 +4,19 @@
 # This software may be distributed under the terms of the BSD license.
 # See README for more details.
 
+import os
+import json
+import re
 import time
 import subprocess
 import logging
 logger = logging.getLogger()
 
+import capture
 import hwsim_utils
 import hostapd
+from hwsim import HWSimController, radio_ifname, radio_phy
+from utils import get_pid, process_memory, latency_stats, format_latency_stats
 
 def test_ap_change_ssid(dev, apdev):
     """Dynamic SSID change with hostapd and WPA2-PSK"""
@@ -327,3 +333,136 @@ def test_ap_double_disable(dev, apdev):
     hapd.disable()
     if "FAIL" not in hapd.request("DISABLE"):
         raise Exception("Second DISABLE accepted unexpectedly")
+
+def max_ap_interfaces(phy):
+    """Maximum number of AP interfaces in the interface combinations the
+    driver advertises; an exception is raised if there are none"""
+    out = subprocess.check_output([ 'iw', 'phy', phy, 'info' ])
+    res = 0
+    for m in re.finditer(r'#\{ ([^}]*) \} <= (\d+)', out):
+        if "AP" in [ t.strip() for t in m.group(1).split(',') ]:
+            res = max(res, int(m.group(2)))
+    if res == 0:
+        raise Exception("No interface combination with AP interfaces found for " + phy)
+    m = re.search(r'total <= (\d+)', out)
+    if m:
+        res = min(res, int(m.group(1)))
+    return res
+
+def multi_bss_bringup(logdir, radio, num_bss, mode):
+    """Start num_bss BSSes on the radio either one by one with add_bss()
+    (mode "seq") or from a single configuration file (mode "conf") and
+    measure the time until all of them are beaconing"""
+    phy = radio_phy(radio)
+    base = radio_ifname(radio)
+    ifnames = [ base ] + [ "%s-%d" % (base, i) for i in range(1, num_bss) ]
+    bssids = [ "02:00:00:00:%02x:%02x" % (radio, i)
+               for i in range(0, num_bss) ]
+    params = lambda i: { "ssid": "multi-bss-%d" % i }
+    hapd_global = hostapd.HostapdGlobal()
+    pid = get_pid("/var/run/hostapd-global")
+    mem_start = process_memory(pid) if pid else None
+    res = {}
+
+    start = time.time()
+    if mode == "seq":
+        add = []
+        for i in range(0, num_bss):
+            fname = os.path.join(logdir, "multi-bss-%d.conf" % i)
+            hostapd.write_bss_conf(fname, ifnames[i], bssids[i], params(i))
+            t = time.time()
+            hapd_global.add_bss(phy, fname)
+            add.append(time.time() - t)
+        res['add'] = latency_stats(add)
+    else:
+        fname = os.path.join(logdir, "multi-bss.conf")
+        hostapd.write_multi_bss_conf(fname, ifnames, bssids, params)
+        hapd_global.add_iface(base, fname)
+    res['add_total'] = time.time() - start
+
+    hapds = []
+    ctrl_open = []
+    ping = []
+    try:
+        for ifname in ifnames:
+            t = time.time()
+            hapd = hostapd.Hostapd(ifname)
+            ctrl_open.append(time.time() - t)
+            hapds.append(hapd)
+        for hapd in hapds:
+            while hapd.get_status_field("state") != "ENABLED":
+                if time.time() > start + 30:
+                    raise Exception("BSS not enabled: " + hapd.ifname)
+                time.sleep(0.01)
+        res['enabled'] = time.time() - start
+        for hapd in hapds:
+            t = time.time()
+            if "PONG" not in hapd.request("PING"):
+                raise Exception("No PING response from " + hapd.ifname)
+            ping.append(time.time() - t)
+        res['ctrl_open'] = latency_stats(ctrl_open)
+        res['ping'] = latency_stats(ping)
+        if mem_start:
+            mem = process_memory(pid)
+            res['memory_per_bss'] = dict([ (name, float(mem[name] -
+                                                        mem_start[name]) /
+                                            num_bss)
+                                           for name in mem ])
+        # Allow a few beacon intervals for the last BSS
+        time.sleep(0.5)
+        fname = capture.snapshot(logdir, "multi-bss-%s-%d" % (mode, num_bss))
+        frames = capture.read_pcapng(fname, start)
+        first = {}
+        for f in frames:
+            if f.is_mgmt([ 8 ]) and f.addr2 in bssids and \
+               f.addr2 not in first:
+                first[f.addr2] = f.ts - start
+        if len(first) != num_bss:
+            raise Exception("Beacons seen only from %d/%d BSSes" %
+                            (len(first), num_bss))
+        res['beaconing'] = max(first.values())
+    finally:
+        for hapd in hapds:
+            hapd.mon.close()
+            hapd.ctrl.close()
+        for ifname in reversed(ifnames):
+            hapd_global.remove(ifname)
+    logger.info("%d BSSes (%s): added in %.3f s, all enabled in %.3f s, all beaconing in %.3f s, memory/BSS %s kB" % (num_bss, mode, res['add_total'], res['enabled'], res['beaconing'], str(res.get('memory_per_bss'))))
+    logger.info("%d BSSes (%s): ctrl_iface PING %s" % (num_bss, mode, format_latency_stats(res['ping'])))
+    return res
+
+def multi_bss_benchmark(params, limit):
+    hwsim = HWSimController()
+    radio = hwsim.create_radio()
+    try:
+        max_bss = min(max_ap_interfaces(radio_phy(radio)), limit)
+        logger.info("Driver supports up to %d AP interfaces" % max_bss)
+        sizes = []
+        n = 1
+        while n < max_bss:
+            sizes.append(n)
+            n *= 2
+        sizes.append(max_bss)
+        results = {}
+        for mode in [ "seq", "conf" ]:
+            results[mode] = {}
+            for num_bss in sizes:
+                results[mode][num_bss] = multi_bss_bringup(params['logdir'],
+                                                           radio, num_bss,
+                                                           mode)
+    finally:
+        hwsim.destroy_radio(radio)
+    with open(os.path.join(params['logdir'], "multi-bss.json"), "w") as f:
+        json.dump(results, f, indent=2)
+    return results
+
+def test_ap_multi_bss_bringup(dev, apdev, params):
+    """Bring-up time of up to 16 BSSes with add_bss() and a single config"""
+    multi_bss_benchmark(params, 16)
+
+def test_ap_multi_bss_bringup_long(dev, apdev, params):
+    """Bring-up time of BSSes up to the driver maximum [long]"""
+    if not params['long']:
+        logger.info("Skip test case with long duration due to --long not specified")
+        return "skip"
+    multi_bss_benchmark(params, 128)
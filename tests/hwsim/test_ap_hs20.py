@@ -11,8 +11,10 @@ logger = logging.getLogger()
 import os
 import os.path
 import subprocess
+import json
 
 import hostapd
+from hwsim import ifname_phy
 from wlantest import Wlantest
 from wpasupplicant import WpaSupplicant
 
@@ -2054,3 +2056,154 @@ def test_ap_hs20_external_selection(dev, apdev):
                    scan_freq="2412", update_identifier="54321")
     if dev[0].get_status_field("hs20") != "2":
         raise Exception("Unexpected hs20 indication")
+
+def start_hs20_bsses(logdir, apdev, num_bss, num_realms, num_ois):
+    """Start num_bss Hotspot 2.0 BSSes on each AP radio with large NAI Realm
+    and Roaming Consortium lists; only the last BSS advertises the
+    example.com realm used by the test credential"""
+    bsses = []
+    for ap in apdev:
+        radio = ap['ifname'][4:]
+        phy = ifname_phy(ap['ifname'])
+        for i in range(0, num_bss):
+            ifname = ap['ifname'] if i == 0 else "%s-%d" % (ap['ifname'], i + 1)
+            bssid = "02:00:00:00:%02x:%02x" % (int(radio), i)
+            params = hs20_ap_params(ssid="hs20-scale-%s-%d" % (radio, i))
+            params['hessid'] = bssid
+            params['nai_realm'] = [ "0,venue%s-%d-realm%d.example.net,13[5:6],21[2:4][5:7]" % (radio, i, j) for j in range(0, num_realms) ]
+            params['roaming_consortium'] = [ "%02x%04x" % (0x20 + i, j)
+                                             for j in range(0, num_ois) ]
+            bsses.append((phy, ifname, bssid, params))
+    bsses[-1][3]['nai_realm'].append("0,example.com,13[5:6],21[2:4][5:7]")
+
+    started = []
+    try:
+        for phy, ifname, bssid, params in bsses:
+            confname = os.path.join(logdir, ifname + "-scale.conf")
+            hostapd.write_bss_conf(confname, ifname, bssid, params)
+            hostapd.add_bss(phy, ifname, confname)
+            started.append(ifname)
+    except:
+        stop_hs20_bsses(started)
+        raise
+    return [ b[1] for b in bsses ], bsses[-1][2]
+
+def stop_hs20_bsses(ifnames):
+    for ifname in reversed(ifnames):
+        hostapd.remove_bss(ifname)
+
+def add_scale_creds(dev, count):
+    """Add count non-matching credentials (a mix of realm and roaming
+    consortium based ones) followed by the matching one"""
+    dev.request("REMOVE_CRED all")
+    for i in range(0, count - 1):
+        if i % 2:
+            dev.add_cred_values({ 'roaming_consortium': "%06x" % (0xa00000 + i),
+                                  'username': "user%d" % i,
+                                  'password': "password",
+                                  'domain': "rc%d.example.org" % i,
+                                  'eap': "TTLS" })
+        else:
+            dev.add_cred_values({ 'realm': "realm%d.example.org" % i,
+                                  'username': "user%d" % i,
+                                  'password': "password",
+                                  'domain': "realm%d.example.org" % i })
+    dev.add_cred_values({ 'realm': "example.com",
+                          'username': "hs20-test",
+                          'password': "password",
+                          'ca_cert': "auth_serv/ca.pem",
+                          'domain': "example.com" })
+
+def timed_interworking_select(dev, auto=False):
+    """Run INTERWORKING_SELECT and return the time (seconds from the
+    command) of the scan, the last ANQP response, and the selection
+    result, the matching BSSIDs, and whether a match was found"""
+    dev.dump_monitor()
+    start = time.time()
+    cmd = "INTERWORKING_SELECT auto freq=2412" if auto else "INTERWORKING_SELECT freq=2412"
+    if "OK" not in dev.request(cmd):
+        raise Exception("INTERWORKING_SELECT failed")
+    res = { 'anqp': None, 'aps': [] }
+    while True:
+        ev = dev.wait_event(["CTRL-EVENT-SCAN-RESULTS", "GAS-QUERY-DONE",
+                             "INTERWORKING-AP", "INTERWORKING-NO-MATCH"],
+                            timeout=30)
+        if ev is None:
+            raise Exception("Network selection timed out")
+        now = time.time() - start
+        if "CTRL-EVENT-SCAN-RESULTS" in ev:
+            res['scan'] = now
+        elif "GAS-QUERY-DONE" in ev:
+            res['anqp'] = now
+        else:
+            res['select'] = now
+            res['match'] = "INTERWORKING-AP" in ev
+            break
+    if res['match']:
+        res['aps'].append(ev.split(' ')[1])
+        while True:
+            ev = dev.wait_event(["INTERWORKING-AP"], timeout=0.2)
+            if ev is None:
+                break
+            res['aps'].append(ev.split(' ')[1])
+    if auto and res['match']:
+        ev = dev.wait_event(["CTRL-EVENT-CONNECTED"], timeout=15)
+        if ev is None:
+            raise Exception("Connection timed out")
+        res['connected'] = time.time() - start
+        dev.request("REMOVE_NETWORK all")
+        dev.wait_disconnected()
+    return res
+
+def interworking_select_scaling(dev, apdev, params, num_bss, num_realms,
+                                num_ois, cred_counts, rounds):
+    ifnames, match_bssid = start_hs20_bsses(params['logdir'], apdev[0:2],
+                                            num_bss, num_realms, num_ois)
+    try:
+        dev[0].hs20_enable()
+        results = []
+        for count in cred_counts:
+            add_scale_creds(dev[0], count)
+            for r in range(0, rounds):
+                res = timed_interworking_select(dev[0])
+                if not res['match'] or match_bssid not in res['aps']:
+                    raise Exception("Matching BSS not selected")
+                if len(res['aps']) != 1:
+                    raise Exception("Unexpected matching BSSes: " + str(res['aps']))
+                results.append((count, res))
+        auto = timed_interworking_select(dev[0], auto=True)
+        logger.info("Auto-select with %d creds: selection %.3f s, connected %.3f s" % (cred_counts[-1], auto['select'], auto['connected']))
+
+        logger.info("Interworking selection with %d BSSes (%d NAI Realms and %d Roaming Consortium OIs each):" % (len(ifnames), num_realms, num_ois))
+        select = []
+        for count, res in results:
+            anqp = res['anqp'] or res['scan']
+            logger.info("creds=%d scan=%.3f s anqp=%.3f s select=%.3f s matching=%.3f s" % (count, res['scan'], anqp, res['select'], res['select'] - anqp))
+            select.append({ 'creds': count, 'scan': res['scan'],
+                            'anqp': anqp, 'select': res['select'],
+                            'matching': res['select'] - anqp })
+    finally:
+        dev[0].request("REMOVE_CRED all")
+        stop_hs20_bsses(ifnames)
+
+    summary = { 'bss': len(ifnames), 'nai_realms': num_realms,
+                'roaming_consortium_ois': num_ois, 'select': select,
+                'auto': { 'creds': cred_counts[-1], 'select': auto['select'],
+                          'connected': auto['connected'] } }
+    with open(os.path.join(params['logdir'], "hs20-select-scaling.json"),
+              "w") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+def test_ap_hs20_select_scaling(dev, apdev, params):
+    """Hotspot 2.0 network selection with many credentials and BSSes"""
+    interworking_select_scaling(dev, apdev, params, 3, 20, 20,
+                                [ 1, 50, 200 ], 2)
+
+def test_ap_hs20_select_scaling_long(dev, apdev, params):
+    """Hotspot 2.0 network selection with hundreds of credentials [long]"""
+    if not params['long']:
+        logger.info("Skip test case with long duration due to --long not specified")
+        return "skip"
+    interworking_select_scaling(dev, apdev, params, 8, 50, 100,
+                                [ 1, 100, 250, 500, 1000 ], 3)
@@ -4,6 +4,8 @@
 # This software may be distributed under the terms of the BSD license.
 # See README for more details.
 
+import os
+import json
 import time
 import logging
 logger = logging.getLogger()
@@ -11,6 +13,8 @@ import struct
 import subprocess
 
 import hostapd
+from hwsim import HWSimController, radio_ifname, radio_phy
+from bss_inject import BSSInjector, BSSSpec, dense_specs
 
 def clear_scan_cache(ifname):
     subprocess.call(['sudo', 'ifconfig', ifname, 'up'])
@@ -442,6 +446,64 @@ def test_olbc(dev, apdev):
     if not cleared:
         raise Exception("OLBC state did nto time out")
 
+def wait_olbc(hapd, timeout):
+    start = time.time()
+    while time.time() - start < timeout:
+        status = hapd.get_status()
+        if status['olbc'] == '1' and status['olbc_ht'] == '1':
+            return time.time() - start
+        time.sleep(0.01)
+    return None
+
+def olbc_injected(apdev, count):
+    params = { "ssid": "test-olbc",
+               "channel": "6",
+               "ht_capab": "[HT40-]",
+               "ap_table_expiration_time": "2" }
+    hapd = hostapd.add_ap(apdev[0]['ifname'], params)
+    inj = BSSInjector(6)
+    try:
+        inj.add(dense_specs(count, channel=6, prefix="olbc-ht", ht="20",
+                            rsn=[ True, False ]))
+        inj.start(interval=0.1024)
+        if wait_olbc(hapd, 2) is not None:
+            raise Exception("Unexpected OLBC with only HT neighbors")
+        status = hapd.get_status()
+        if status['olbc'] != '0' or status['olbc_ht'] != '0':
+            raise Exception("Unexpected OLBC information")
+        inj.stop()
+
+        inj.add([ BSSSpec("02:be:ff:00:00:01", "olbc-ap", 6, rates='b') ])
+        inj.start(interval=0.1024)
+        detect = wait_olbc(hapd, 10)
+        inj.stop()
+        if detect is None:
+            raise Exception("Missing OLBC information")
+        stats = inj.stats()
+    finally:
+        inj.close()
+    logger.info("OLBC detected in %.3f s among %d injected HT BSSes (%d frames, %.0f frames/s)" % (detect, count, stats['sent'], stats.get('frames_per_sec', 0)))
+
+    logger.info("Waiting for OLBC state to time out")
+    for i in range(0, 15):
+        time.sleep(1)
+        status = hapd.get_status()
+        if status['olbc'] == '0' and status['olbc_ht'] == '0':
+            break
+    else:
+        raise Exception("OLBC state did not time out")
+
+def test_olbc_injected(dev, apdev):
+    """OLBC detection with an 802.11b BSS among 200 injected HT BSSes"""
+    olbc_injected(apdev, 200)
+
+def test_olbc_injected_long(dev, apdev, params):
+    """OLBC detection with an 802.11b BSS among 2000 injected HT BSSes [long]"""
+    if not params['long']:
+        logger.info("Skip test case with long duration due to --long not specified")
+        return "skip"
+    olbc_injected(apdev, 2000)
+
 def test_olbc_5ghz(dev, apdev):
     """OLBC detection on 5 GHz"""
     try:
@@ -593,3 +655,122 @@ def test_ap_ht_40mhz_intolerant_ap(dev, apdev):
             ok = True
     if not ok:
         raise Exception("AP did not move to 40 MHz channel")
+
+def neighbor_conf(channel, mode):
+    params = { "channel": str(channel) }
+    if mode == "legacy":
+        params["ieee80211n"] = "0"
+    else:
+        # keep the advertised 40 MHz operation independent of the other
+        # neighbors
+        params["ht_capab"] = "[" + mode + "]"
+        params["force_ht40"] = "1"
+    return params
+
+def start_neighbors(logdir, groups, bss_per_radio):
+    """Start bss_per_radio neighbor BSSes for each (channel, mode) group on
+    a dynamically created radio; mode is HT40+, HT40-, or legacy. No
+    country code is set, so the channels need to be usable under the world
+    regulatory domain (channels 1-11)."""
+    hwsim = HWSimController()
+    radios = []
+    ifnames = []
+    try:
+        for channel, mode in groups:
+            radio = hwsim.create_radio()
+            radios.append(radio)
+            phy = radio_phy(radio)
+            base = radio_ifname(radio)
+            for i in range(0, bss_per_radio):
+                ifname = base if i == 0 else "%s-%d" % (base, i)
+                bssid = "02:00:00:00:%02x:%02x" % (radio, i)
+                params = neighbor_conf(channel, mode)
+                params["ssid"] = "neighbor-%d-%s-%d" % (channel, mode, i)
+                confname = os.path.join(logdir, ifname + "-neighbor.conf")
+                hostapd.write_bss_conf(confname, ifname, bssid, params)
+                hostapd.add_bss(phy, ifname, confname)
+                ifnames.append(ifname)
+    except:
+        stop_neighbors(radios, ifnames)
+        raise
+    return radios, ifnames
+
+def stop_neighbors(radios, ifnames):
+    for ifname in reversed(ifnames):
+        hostapd.remove_bss(ifname)
+    hwsim = HWSimController()
+    for radio in radios:
+        hwsim.destroy_radio(radio)
+
+def timed_ht40_start(apdev, channel, ht_capab, force_ht40):
+    """Time hostapd from ENABLE through HT_SCAN to AP-ENABLED"""
+    clear_scan_cache(apdev['ifname'])
+    params = { "ssid": "test-ht40-coex", "channel": str(channel),
+               "ht_capab": ht_capab, "force_ht40": str(force_ht40) }
+    hapd = hostapd.add_ap(apdev['ifname'], params, no_enable=True)
+    res = { 'channel': channel, 'ht_capab': ht_capab,
+            'force_ht40': force_ht40 }
+    start = time.time()
+    hapd.enable()
+    while True:
+        state = hapd.get_status_field("state")
+        if state == "HT_SCAN":
+            res['ht_scan_seen'] = time.time() - start
+            break
+        if state == "ENABLED" or time.time() - start > 1:
+            break
+        time.sleep(0.005)
+    ev = hapd.wait_event(["AP-ENABLED", "AP-DISABLED"], timeout=30)
+    if ev is None or "AP-ENABLED" not in ev:
+        raise Exception("AP startup failed")
+    res['enabled'] = time.time() - start
+    status = hapd.get_status()
+    res['pri'] = int(status['channel'])
+    res['sec'] = int(status['secondary_channel'])
+    hapd.disable()
+    return res
+
+def ht40_coex_benchmark(apdev, params, groups, bss_per_radio, rounds):
+    radios, ifnames = start_neighbors(params['logdir'], groups,
+                                      bss_per_radio)
+    results = []
+    try:
+        for channel, ht_capab in [ (1, "[HT40+]"), (6, "[HT40+]"),
+                                   (6, "[HT40-]"), (11, "[HT40-]") ]:
+            for force_ht40 in [ 0, 1 ]:
+                for r in range(0, rounds):
+                    res = timed_ht40_start(apdev[0], channel, ht_capab,
+                                           force_ht40)
+                    results.append(res)
+                    sec = 1 if "+" in ht_capab else -1
+                    if force_ht40 and res['sec'] != sec:
+                        raise Exception("force_ht40 did not keep the secondary channel: " + str(res))
+    finally:
+        stop_neighbors(radios, ifnames)
+
+    summary = { 'neighbors': len(ifnames),
+                'groups': [ list(g) for g in groups ],
+                'results': results }
+    fname = os.path.join(params['logdir'], "ht40-coex-%d.json" % len(ifnames))
+    with open(fname, "w") as f:
+        json.dump(summary, f, indent=2)
+    logger.info("HT40 co-ex with %d neighbor BSSes (results in %s):" % (len(ifnames), fname))
+    for res in results:
+        logger.info("channel=%d %s force_ht40=%d: HT_SCAN seen at %s s, AP-ENABLED at %.3f s, secondary_channel=%d" % (res['channel'], res['ht_capab'], res['force_ht40'], str(res.get('ht_scan_seen')), res['enabled'], res['sec']))
+    return summary
+
+def test_ap_ht40_coex_many_neighbors(dev, apdev, params):
+    """HT40 co-ex decision and start-up time with many neighbor BSSes"""
+    groups = [ (1, "legacy"), (3, "HT40+"), (6, "legacy"),
+               (9, "HT40-"), (11, "legacy"), (11, "HT40-") ]
+    ht40_coex_benchmark(apdev, params, groups, 10, 1)
+
+def test_ap_ht40_coex_many_neighbors_long(dev, apdev, params):
+    """HT40 co-ex decision with hundreds of neighbor BSSes [long]"""
+    if not params['long']:
+        logger.info("Skip test case with long duration due to --long not specified")
+        return "skip"
+    groups = [ (1, "legacy"), (1, "HT40+"), (3, "HT40+"), (5, "HT40-"),
+               (6, "legacy"), (7, "HT40+"), (9, "HT40-"), (11, "legacy"),
+               (11, "HT40-") ]
+    ht40_coex_benchmark(apdev, params, groups, 40, 3)
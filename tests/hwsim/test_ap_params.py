@@ -6,10 +6,16 @@
 
 import logging
 logger = logging.getLogger()
+import os
+import json
+import random
 import subprocess
+import time
 
 import hwsim_utils
 import hostapd
+from utils import get_pid, latency_stats, format_latency_stats
+from utils import timed_reconnect
 
 def test_ap_fragmentation_rts_set_high(dev, apdev):
     """WPA2-PSK AP with fragmentation and RTS thresholds larger than frame length"""
@@ -244,3 +250,102 @@ def test_ap_tx_queue_params(dev, apdev):
     hostapd.add_ap(apdev[0]['ifname'], params)
     dev[0].connect(ssid, key_mgmt="NONE", scan_freq="2412")
     hwsim_utils.test_connectivity(dev[0].ifname, apdev[0]['ifname'])
+
+def acl_addr(i):
+    return "02:02:%02x:%02x:%02x:%02x" % ((i >> 24) & 0xff, (i >> 16) & 0xff,
+                                          (i >> 8) & 0xff, i & 0xff)
+
+def write_large_acl_file(fname, count, addrs):
+    """Write an ACL file with count generated entries in random order and
+    addrs"""
+    entries = [ acl_addr(i) for i in range(0, count) ] + addrs
+    random.Random(count).shuffle(entries)
+    with open(fname, "w") as f:
+        for addr in entries:
+            f.write(addr + "\n")
+
+def acl_benchmark(dev, apdev, logdir, sizes, reconnects, updates):
+    """Compare adding and removing updates ACL entries by re-reading
+    accept_mac_file (SET accept_mac_file) with ACCEPT_ACL ADD_MAC/DEL_MAC"""
+    ssid = "acl-scale"
+    ifname = apdev[0]['ifname']
+    aclfile = os.path.join(logdir, "acl-scale.accept")
+    updfile = os.path.join(logdir, "acl-scale-update.accept")
+    confname = os.path.join(logdir, "acl-scale.conf")
+    params = { "ssid": ssid, "macaddr_acl": "1", "accept_mac_file": aclfile }
+    hostapd.write_bss_conf(confname, ifname, apdev[0]['bssid'], params)
+    pid = get_pid("/var/run/hostapd-global")
+    hapd_global = hostapd.HostapdGlobal()
+    results = {}
+    try:
+        for size in sizes:
+            write_large_acl_file(aclfile, size, [ dev[0].p2p_dev_addr() ])
+            res = {}
+            t = time.time()
+            hapd_global.add_iface(ifname, confname)
+            hapd = hostapd.Hostapd(ifname)
+            res['load'] = time.time() - t
+            dev[0].connect(ssid, key_mgmt="NONE", scan_freq="2412")
+            res['connect'], res['hostapd_cpu'] = \
+                timed_reconnect(dev[0], pid, reconnects)
+
+            # SET accept_mac_file parses the file, merges it into the
+            # current list, and sorts the full list again
+            new = [ acl_addr(i) for i in range(size, size + updates) ]
+            with open(updfile, "w") as f:
+                for addr in new:
+                    f.write(addr + "\n")
+            t = time.time()
+            if "OK" not in hapd.request("SET accept_mac_file " + updfile):
+                raise Exception("SET accept_mac_file failed")
+            res['file_add'] = time.time() - t
+            with open(updfile, "w") as f:
+                for addr in new:
+                    f.write("-" + addr + "\n")
+            t = time.time()
+            if "OK" not in hapd.request("SET accept_mac_file " + updfile):
+                raise Exception("SET accept_mac_file failed")
+            res['file_del'] = time.time() - t
+
+            add = []
+            delete = []
+            for i in range(size, size + updates):
+                t = time.time()
+                if "OK" not in hapd.request("ACCEPT_ACL ADD_MAC " + acl_addr(i)):
+                    raise Exception("ACCEPT_ACL ADD_MAC failed")
+                add.append(time.time() - t)
+            for i in range(size, size + updates):
+                t = time.time()
+                if "OK" not in hapd.request("ACCEPT_ACL DEL_MAC " + acl_addr(i)):
+                    raise Exception("ACCEPT_ACL DEL_MAC failed")
+                delete.append(time.time() - t)
+            res['add_mac'] = latency_stats(add)
+            res['del_mac'] = latency_stats(delete)
+            hwsim_utils.test_connectivity(dev[0].ifname, ifname)
+            dev[0].request("REMOVE_NETWORK all")
+            hapd_global.remove(ifname)
+            logger.info("ACL with %d entries: load %.3f s, SET accept_mac_file to add %d entries %.3f s and to remove them %.3f s" % (size, res['load'], updates, res['file_add'], res['file_del']))
+            logger.info("Reconnection: " + format_latency_stats(res['connect']))
+            logger.info("ACCEPT_ACL ADD_MAC: " + format_latency_stats(res['add_mac']))
+            logger.info("ACCEPT_ACL DEL_MAC: " + format_latency_stats(res['del_mac']))
+            results[size] = res
+    finally:
+        hapd_global.remove(ifname)
+        os.remove(aclfile)
+        if os.path.exists(updfile):
+            os.remove(updfile)
+    with open(os.path.join(logdir, "acl-scale.json"), "w") as f:
+        json.dump(results, f, indent=2)
+    return results
+
+def test_ap_acl_scale(dev, apdev, params):
+    """MAC ACL load, lookup, and file vs. single entry updates with 100k entries"""
+    acl_benchmark(dev, apdev, params['logdir'], [ 100, 10000, 100000 ], 5, 20)
+
+def test_ap_acl_scale_long(dev, apdev, params):
+    """MAC ACL with up to 1M entries [long]"""
+    if not params['long']:
+        logger.info("Skip test case with long duration due to --long not specified")
+        return "skip"
+    acl_benchmark(dev, apdev, params['logdir'],
+                  [ 100, 10000, 100000, 1000000 ], 20, 200)
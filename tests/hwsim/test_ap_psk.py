@@ -7,9 +7,13 @@
 import logging
 logger = logging.getLogger()
 import os
+import json
+import time
 
 import hostapd
 import hwsim_utils
+from utils import get_pid, format_latency_stats
+from utils import timed_reconnect, wait_reconnect
 
 def check_mib(dev, vals):
     mib = dev.get_mib()
@@ -290,3 +294,82 @@ def test_ap_wpa2_strict_rekey(dev, apdev):
     if ev is None:
         raise Exception("GTK rekey timed out")
     hwsim_utils.test_connectivity(dev[0].ifname, apdev[0]['ifname'])
+
+def write_large_psk_file(fname, count, stas, wildcard):
+    """Write a wpa_psk_file with count per-station entries using hex PSKs
+    (passphrases would make hostapd run PBKDF2 for each entry); the
+    entries for stas ((addr, psk) pairs) and the wildcard passphrase are
+    written first, i.e., they end up last in hostapd's list"""
+    with open(fname, "w") as f:
+        f.write("00:00:00:00:00:00 %s\n" % wildcard)
+        for (addr, psk) in stas:
+            f.write("%s %s\n" % (addr, psk))
+        for i in range(0, count):
+            f.write("02:01:%02x:%02x:%02x:%02x %064x\n" %
+                    ((i >> 24) & 0xff, (i >> 16) & 0xff, (i >> 8) & 0xff,
+                     i & 0xff, i))
+
+def psk_file_benchmark(dev, apdev, logdir, sizes, reconnects):
+    ssid = "test-psk-file-scale"
+    ifname = apdev[0]['ifname']
+    pskfile = os.path.join(logdir, "psk-file-scale.psk_file")
+    confname = os.path.join(logdir, "psk-file-scale.conf")
+    sta_psk = "%064x" % 0x5a5a
+    wildcard = "wildcard passphrase"
+    stas = [ (dev[0].p2p_dev_addr(), sta_psk) ]
+    params = { "ssid": ssid, "wpa": "2", "wpa_key_mgmt": "WPA-PSK",
+               "rsn_pairwise": "CCMP", "wpa_psk_file": pskfile }
+    hostapd.write_bss_conf(confname, ifname, apdev[0]['bssid'], params)
+    pid = get_pid("/var/run/hostapd-global")
+    hapd_global = hostapd.HostapdGlobal()
+    results = {}
+    try:
+        for size in sizes:
+            write_large_psk_file(pskfile, size, stas, wildcard)
+            res = {}
+            t = time.time()
+            hapd_global.add_iface(ifname, confname)
+            hapd = hostapd.Hostapd(ifname)
+            res['load'] = time.time() - t
+            dev[0].connect(ssid, raw_psk=sta_psk, scan_freq="2412")
+            dev[1].connect(ssid, psk=wildcard, scan_freq="2412")
+            res['connect'], res['hostapd_cpu'] = \
+                timed_reconnect(dev[0], pid, reconnects)
+            res['connect_wildcard'], res['hostapd_cpu_wildcard'] = \
+                timed_reconnect(dev[1], pid, reconnects)
+            dev[0].dump_monitor()
+            dev[1].dump_monitor()
+            t = time.time()
+            if "OK" not in hapd.request("RELOAD"):
+                raise Exception("RELOAD failed")
+            res['reload'] = time.time() - t
+            # RELOAD deauthenticates the stations; the reload cost seen by
+            # the clients is the time until they are connected again
+            res['reload_reconnect'] = wait_reconnect(dev[0:2], t)
+            hwsim_utils.test_connectivity(dev[0].ifname, ifname)
+            dev[0].request("REMOVE_NETWORK all")
+            dev[1].request("REMOVE_NETWORK all")
+            hapd_global.remove(ifname)
+            logger.info("wpa_psk_file with %d entries: load %.3f s, RELOAD %.3f s, stations reconnected %.3f s after RELOAD" % (size, res['load'], res['reload'], max(res['reload_reconnect'])))
+            logger.info("Reconnection: " + format_latency_stats(res['connect']))
+            logger.info("hostapd CPU per reconnection: " + format_latency_stats(res['hostapd_cpu']))
+            logger.info("Reconnection with wildcard PSK: " + format_latency_stats(res['connect_wildcard']))
+            results[size] = res
+    finally:
+        hapd_global.remove(ifname)
+        os.remove(pskfile)
+    with open(os.path.join(logdir, "psk-file-scale.json"), "w") as f:
+        json.dump(results, f, indent=2)
+    return results
+
+def test_ap_wpa2_psk_file_scale(dev, apdev, params):
+    """WPA2-PSK AP with a large wpa_psk_file"""
+    psk_file_benchmark(dev, apdev, params['logdir'], [ 10, 1000, 10000 ], 5)
+
+def test_ap_wpa2_psk_file_scale_long(dev, apdev, params):
+    """WPA2-PSK AP with up to 100000 wpa_psk_file entries [long]"""
+    if not params['long']:
+        logger.info("Skip test case with long duration due to --long not specified")
+        return "skip"
+    psk_file_benchmark(dev, apdev, params['logdir'],
+                       [ 10, 1000, 10000, 30000, 100000 ], 20)
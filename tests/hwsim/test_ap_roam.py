@@ -4,6 +4,9 @@
 # This software may be distributed under the terms of the BSD license.
 # See README for more details.
 
+import os
+import json
+import select
 import time
 import subprocess
 import logging
@@ -11,6 +14,10 @@ logger = logging.getLogger()
 
 import hwsim_utils
 import hostapd
+import capture
+from test_ap_ft import ft_params1, ft_params2
+from fleet import StationFleet
+from utils import latency_stats, format_latency_stats
 
 def test_ap_roam_open(dev, apdev):
     """Roam between two open APs"""
@@ -53,3 +60,341 @@ def test_ap_reassociation_to_same_bss(dev, apdev):
     if ev is None:
         raise Exception("Reassociation (reattach) with the AP timed out")
     hwsim_utils.test_connectivity(dev[0].ifname, apdev[0]['ifname'])
+
+ROAM_METHODS = [ "psk", "eap", "pmksa", "okc", "ft", "ft_over_ds" ]
+ROAM_PHASES = [ "auth", "assoc", "keys", "connected", "keys_done" ]
+
+def roam_ap_params(method, ssid, passphrase):
+    """Configuration parameters for the two APs for the roaming method"""
+    if method == "psk":
+        params = hostapd.wpa2_params(ssid=ssid, passphrase=passphrase)
+        return params, params
+    if method in [ "ft", "ft_over_ds" ]:
+        return (ft_params1(ssid=ssid, passphrase=passphrase),
+                ft_params2(ssid=ssid, passphrase=passphrase))
+    params = hostapd.wpa2_eap_params(ssid=ssid)
+    if method == "eap":
+        params['disable_pmksa_caching'] = "1"
+    elif method == "okc":
+        params['okc'] = "1"
+    return params, params
+
+def roam_connect(dev, method, ssid, passphrase, wait_connect=True):
+    if method == "psk":
+        dev.connect(ssid, psk=passphrase, scan_freq="2412",
+                    wait_connect=wait_connect)
+    elif method in [ "ft", "ft_over_ds" ]:
+        dev.connect(ssid, psk=passphrase, key_mgmt="FT-PSK", proto="WPA2",
+                    scan_freq="2412", wait_connect=wait_connect)
+    else:
+        dev.connect(ssid, key_mgmt="WPA-EAP", eap="GPSK",
+                    identity="gpsk user",
+                    password="abcdefghijklmnop0123456789abcdef",
+                    okc=method == "okc", scan_freq="2412",
+                    wait_connect=wait_connect)
+
+def roam_bench_setup(dev, apdev, method):
+    """Start two APs for the roaming method and connect to the first one"""
+    ssid = "test-roam-bench"
+    passphrase = "12345678"
+    params1, params2 = roam_ap_params(method, ssid, passphrase)
+    hostapd.add_ap(apdev[0]['ifname'], params1)
+    hostapd.add_ap(apdev[1]['ifname'], params2)
+
+    roam_connect(dev, method, ssid, passphrase)
+    if dev.get_status_field('bssid') != apdev[0]['bssid']:
+        dev.roam(apdev[0]['bssid'])
+    dev.scan_for_bss(apdev[1]['bssid'], freq="2412")
+
+def first_frame(frames, cond, after=0):
+    for f in frames:
+        if f.ts >= after and cond(f):
+            return f
+    return None
+
+def roam_phases(frames, sta, cur, target, over_ds, t_start):
+    """Per-phase latency (seconds) of a roam from cur to target based on the
+    captured frames; phases that did not take place are 0. keys_done is the
+    time from the start of the roam to the last EAPOL frame (or to the
+    (Re)Association Response if no EAPOL frames were exchanged)."""
+    res = {}
+    if over_ds:
+        req = first_frame(frames, lambda f: f.is_mgmt([ 13 ]) and
+                          f.category == capture.WLAN_ACTION_FT and
+                          f.addr2 == sta and f.addr1 == cur)
+        resp = req and first_frame(frames, lambda f: f.is_mgmt([ 13 ]) and
+                                   f.category == capture.WLAN_ACTION_FT and
+                                   f.addr1 == sta and f.addr2 == cur,
+                                   req.ts)
+    else:
+        req = first_frame(frames, lambda f: f.is_mgmt([ 11 ]) and
+                          f.addr2 == sta and f.addr1 == target)
+        resp = req and first_frame(frames, lambda f: f.is_mgmt([ 11 ]) and
+                                   f.addr1 == sta and f.addr2 == target,
+                                   req.ts)
+    if req is None or resp is None:
+        raise Exception("Authentication frames not found in capture")
+    res['auth'] = resp.ts - req.ts
+    req = first_frame(frames, lambda f: f.is_mgmt([ 0, 2 ]) and
+                      f.addr2 == sta and f.addr1 == target, resp.ts)
+    resp = req and first_frame(frames, lambda f: f.is_mgmt([ 1, 3 ]) and
+                               f.addr1 == sta and f.addr2 == target, req.ts)
+    if req is None or resp is None:
+        raise Exception("(Re)Association frames not found in capture")
+    res['assoc'] = resp.ts - req.ts
+    link = lambda f: (f.addr1 == sta and f.addr2 == target) or \
+        (f.addr2 == sta and f.addr1 == target)
+    eapol = [ f for f in frames if f.ts >= resp.ts and f.is_data() and
+              f.eapol and link(f) ]
+    keys_end = eapol[-1].ts if eapol else resp.ts
+    res['keys'] = keys_end - resp.ts
+    res['keys_done'] = keys_end - t_start
+    return res
+
+def roam_benchmark(dev, apdev, logdir, method, roams):
+    roam_bench_setup(dev, apdev, method)
+    over_ds = method == "ft_over_ds"
+    aps = [ apdev[0], apdev[1] ]
+    timing = []
+    cur = aps[0]
+    # Warm up so that both APs have been visited (PMKSA cache, OKC)
+    for i in range(0, 2 * roams + 2):
+        target = aps[(i + 1) % 2]
+        t_start = time.time()
+        if over_ds:
+            dev.roam_over_ds(target['bssid'])
+        else:
+            dev.roam(target['bssid'])
+        t_conn = time.time()
+        if dev.get_status_field('bssid') != target['bssid']:
+            raise Exception("Did not connect to correct AP")
+        hwsim_utils.test_connectivity(dev.ifname, target['ifname'])
+        if i >= 2:
+            timing.append((cur['bssid'], target['bssid'], t_start,
+                           t_conn - t_start, time.time()))
+        cur = target
+
+    fname = capture.snapshot(logdir, "roam-" + method)
+    frames = capture.read_pcapng(fname, timing[0][2])
+    sta = dev.get_status_field("address")
+    phases = dict([ (p, []) for p in ROAM_PHASES ])
+    for (cur, target, t_start, connected, t_end) in timing:
+        res = roam_phases([ f for f in frames if f.ts <= t_end ], sta, cur,
+                          target, over_ds, t_start)
+        res['connected'] = connected
+        for p in ROAM_PHASES:
+            phases[p].append(res[p])
+        frames = [ f for f in frames if f.ts > t_end ]
+
+    stats = dict([ (p, latency_stats(phases[p])) for p in ROAM_PHASES ])
+    for p in ROAM_PHASES:
+        logger.info("%s roam %s: %s" % (method, p,
+                                        format_latency_stats(stats[p])))
+    return stats
+
+def roam_benchmark_all(dev, apdev, params, roams):
+    results = {}
+    for method in ROAM_METHODS:
+        results[method] = roam_benchmark(dev[0], apdev, params['logdir'],
+                                         method, roams)
+        dev[0].request("REMOVE_NETWORK all")
+        dev[0].wait_event(["CTRL-EVENT-DISCONNECTED"], timeout=5)
+        hapd_global = hostapd.HostapdGlobal()
+        hapd_global.remove(apdev[0]['ifname'])
+        hapd_global.remove(apdev[1]['ifname'])
+        dev[0].request("BSS_FLUSH 0")
+    with open(os.path.join(params['logdir'], "roam-latency.json"), "w") as f:
+        json.dump(results, f, indent=2)
+    return results
+
+def test_ap_roam_latency(dev, apdev, params):
+    """Roaming latency per phase with PSK, EAP, PMKSA caching, OKC, and FT"""
+    roam_benchmark_all(dev, apdev, params, 5)
+
+def test_ap_roam_latency_long(dev, apdev, params):
+    """Roaming latency percentiles over many roams [long]"""
+    if not params['long']:
+        logger.info("Skip test case with long duration due to --long not specified")
+        return "skip"
+    roam_benchmark_all(dev, apdev, params, 100)
+
+STORM_METHODS = [ "psk", "eap", "pmksa", "ft" ]
+STORM_FAILURES = [ "CTRL-EVENT-ASSOC-REJECT", "CTRL-EVENT-AUTH-REJECT",
+                   "CTRL-EVENT-EAP-FAILURE", "WPA: 4-Way Handshake failed" ]
+
+def storm_sample(hapd, t, radius):
+    """Count the stations in each state in the AP STA table"""
+    res = { 't': t, 'auth': 0, 'assoc': 0, 'authorized': 0 }
+    sta = hapd.get_sta(None)
+    while 'flags' in sta:
+        flags = sta['flags']
+        if "[AUTHORIZED]" in flags:
+            res['authorized'] += 1
+        elif "[ASSOC]" in flags:
+            res['assoc'] += 1
+        elif "[AUTH]" in flags:
+            res['auth'] += 1
+        sta = hapd.get_sta(sta['addr'], next=True)
+    if radius:
+        mib = hapd.get_mib()
+        res['radius_pending'] = int(mib.get('radiusAuthClientPendingRequests',
+                                            0))
+    return res
+
+def radius_counters(hapd):
+    mib = hapd.get_mib()
+    res = {}
+    for name in [ "AccessRequests", "AccessRetransmissions", "Timeouts",
+                  "AccessAccepts", "AccessRejects", "RoundTripTime" ]:
+        res[name] = int(mib.get('radiusAuthClient' + name, 0))
+    return res
+
+def run_roam_storm(stas, hapd_a, hapd_b, bssid_b, method, timeout,
+                   sample_interval=0.2):
+    """Make all stations leave AP A at the same time and wait until they
+    are connected to AP B
+
+    With FT, ROAM is requested on all stations while AP A is still up since
+    an abrupt loss of the current AP results in an FT initial mobility
+    domain association, i.e., a full authentication."""
+    radius = method in [ "eap", "pmksa" ]
+    for sta in stas:
+        sta.dump_monitor()
+    hapd_b.dump_monitor()
+    radius_start = radius_counters(hapd_b) if radius else None
+    by_sock = dict([ (sta.mon.s, sta) for sta in stas ])
+    socks = by_sock.keys() + [ hapd_b.mon.s ]
+    connected = {}
+    failures = {}
+    ap_connected = []
+    samples = []
+
+    t0 = time.time()
+    if method == "ft":
+        for sta in stas:
+            if "OK" not in sta.request("ROAM " + bssid_b):
+                raise Exception("ROAM failed")
+    else:
+        hapd_a.disable()
+    deadline = t0 + timeout
+    next_sample = t0
+    while len(connected) < len(stas) and time.time() < deadline:
+        if time.time() >= next_sample:
+            samples.append(storm_sample(hapd_b, time.time() - t0, radius))
+            next_sample = time.time() + sample_interval
+        [r, w, e] = select.select(socks, [], [],
+                                  max(0, min(next_sample, deadline) -
+                                      time.time()))
+        now = time.time()
+        for sock in r:
+            if sock == hapd_b.mon.s:
+                while hapd_b.mon.pending():
+                    if "AP-STA-CONNECTED" in hapd_b.mon.recv():
+                        ap_connected.append(now - t0)
+                continue
+            mon = by_sock[sock].mon
+            while mon.pending():
+                ev = mon.recv()
+                if "CTRL-EVENT-CONNECTED" in ev:
+                    if bssid_b not in ev:
+                        failures['wrong-bssid'] = \
+                            failures.get('wrong-bssid', 0) + 1
+                    elif sock not in connected:
+                        connected[sock] = now - t0
+                    continue
+                for f in STORM_FAILURES:
+                    if f in ev:
+                        failures[f] = failures.get(f, 0) + 1
+    samples.append(storm_sample(hapd_b, time.time() - t0, radius))
+    while hapd_b.mon.pending(timeout=0.5):
+        if "AP-STA-CONNECTED" in hapd_b.mon.recv():
+            ap_connected.append(time.time() - t0)
+
+    res = {}
+    res['stations'] = len(stas)
+    res['reconnected'] = len(connected)
+    res['failures'] = failures
+    res['all_reconnected'] = max(connected.values()) \
+        if len(connected) == len(stas) else None
+    res['latency'] = latency_stats(connected.values())
+    per_sec = {}
+    for t in ap_connected:
+        per_sec[int(t)] = per_sec.get(int(t), 0) + 1
+    res['ap_sta_connected'] = len(ap_connected)
+    res['ap_sta_connected_per_sec'] = len(ap_connected) / max(ap_connected) \
+        if ap_connected else 0
+    res['ap_sta_connected_peak_per_sec'] = max(per_sec.values()) \
+        if per_sec else 0
+    res['queue_peak'] = { 'auth': max([ s['auth'] for s in samples ]),
+                          'assoc': max([ s['assoc'] for s in samples ]) }
+    res['samples'] = samples
+    if radius:
+        radius_end = radius_counters(hapd_b)
+        res['radius'] = dict([ (name, radius_end[name] - radius_start[name])
+                               for name in radius_end
+                               if name != "RoundTripTime" ])
+        res['radius']['RoundTripTime'] = radius_end['RoundTripTime']
+        res['radius']['peak_pending'] = max([ s['radius_pending']
+                                              for s in samples ])
+    logger.info("%s roaming storm: %d/%d stations reconnected in %s s, %.1f AP-STA-CONNECTED/s (peak %d/s), peak auth/assoc queue %d/%d, failures=%s radius=%s" % (method, len(connected), len(stas), str(res['all_reconnected']), res['ap_sta_connected_per_sec'], res['ap_sta_connected_peak_per_sec'], res['queue_peak']['auth'], res['queue_peak']['assoc'], str(failures), str(res.get('radius'))))
+    logger.info("%s roaming storm reconnection latency: %s" % (method, format_latency_stats(res['latency'])))
+    return res
+
+def roam_storm(apdev, method, num_stas, timeout):
+    ssid = "test-roam-storm"
+    passphrase = "12345678"
+    params_a, params_b = roam_ap_params(method, ssid, passphrase)
+    bssid_a = apdev[0]['bssid']
+    bssid_b = apdev[1]['bssid']
+    stas = StationFleet(num_stas)
+    try:
+        if method == "pmksa":
+            # Connect to B first so that each station has a PMKSA cache
+            # entry for it
+            hapd_b = hostapd.add_ap(apdev[1]['ifname'], params_b)
+            for sta in stas:
+                roam_connect(sta, method, ssid, passphrase)
+            hapd_a = hostapd.add_ap(apdev[0]['ifname'], params_a)
+            for sta in stas:
+                sta.scan_for_bss(bssid_a, freq="2412")
+                sta.roam(bssid_a)
+        else:
+            hapd_a = hostapd.add_ap(apdev[0]['ifname'], params_a)
+            for sta in stas:
+                roam_connect(sta, method, ssid, passphrase)
+            hapd_b = hostapd.add_ap(apdev[1]['ifname'], params_b)
+            for sta in stas:
+                sta.scan_for_bss(bssid_b, freq="2412")
+        for sta in stas:
+            if sta.get_status_field('bssid') != bssid_a:
+                raise Exception("Station not connected to the first AP")
+        return run_roam_storm(stas, hapd_a, hapd_b, bssid_b, method, timeout)
+    finally:
+        stas.remove_networks()
+        stas.close()
+        hapd_global = hostapd.HostapdGlobal()
+        hapd_global.remove(apdev[0]['ifname'])
+        hapd_global.remove(apdev[1]['ifname'])
+
+def roam_storm_all(apdev, params, num_stas, timeout):
+    results = {}
+    for method in STORM_METHODS:
+        results[method] = roam_storm(apdev, method, num_stas, timeout)
+    fname = "roam-storm-%d.json" % num_stas
+    with open(os.path.join(params['logdir'], fname), "w") as f:
+        json.dump(results, f, indent=2)
+    for method in STORM_METHODS:
+        if results[method]['reconnected'] != num_stas:
+            raise Exception("Not all stations reconnected after %s roaming storm" % method)
+    return results
+
+def test_ap_roam_storm(dev, apdev, params):
+    """Roaming storm from a disabled AP with multiple stations"""
+    roam_storm_all(apdev, params, 16, 30)
+
+def test_ap_roam_storm_long(dev, apdev, params):
+    """Roaming storm from a disabled AP with a large number of stations [long]"""
+    if not params['long']:
+        logger.info("Skip test case with long duration due to --long not specified")
+        return "skip"
+    roam_storm_all(apdev, params, 128, 120)
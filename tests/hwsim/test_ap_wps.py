@@ -19,6 +19,9 @@ import StringIO
 
 import hwsim_utils
 import hostapd
+import upnp_load
+from upnp_aps import UPnPAPs, ap_uuid
+from utils import get_pid, process_memory, latency_stats, format_latency_stats
 
 def test_ap_wps_init(dev, apdev):
     """Initial AP configuration with first WPS Enrollee"""
@@ -1918,6 +1921,62 @@ def test_ap_wps_upnp(dev, apdev):
     if resp.status != 401:
         raise Exception("Unexpected HTTP response: %s" % resp.status)
 
+def test_ap_wps_ssdp_load(dev, apdev):
+    """WPS AP and SSDP M-SEARCH load from many source ports"""
+    ap_uuid = "27ea801a-9e5c-4e73-bd82-f89cbcd10d7e"
+    add_ssdp_ap(apdev[0]['ifname'], ap_uuid)
+
+    res = upnp_load.ssdp_load("uuid:" + ap_uuid, rate=10, count=30, mx=0)
+    if res['answered'] < 27:
+        raise Exception("Too few SSDP responses at low rate")
+    for rate in [ 50, 200 ]:
+        upnp_load.ssdp_load(upnp_load.WFA_DEVICE, rate=rate, count=2 * rate)
+    # wait for the outstanding M-SEARCH replies to be completed
+    time.sleep(2)
+    ssdp_get_location(ap_uuid)
+
+def upnp_soap_load(apdev, concurrency, count=None, duration=None):
+    ap_uuid = "27ea801a-9e5c-4e73-bd82-f89cbcd10d7e"
+    add_ssdp_ap(apdev[0]['ifname'], ap_uuid)
+    location = ssdp_get_location(ap_uuid)
+    urls = upnp_get_urls(location)
+    actions = [ ("GetDeviceInfo", None),
+                ("PutMessage", upnp_load.put_message_args()) ]
+    results = []
+    for c in concurrency:
+        load = upnp_load.SoapLoad(urls['control_url'], actions, c)
+        res = load.run(count=count, duration=duration)
+        results.append((c, res))
+    logger.info("SOAP load summary:")
+    for c, res in results:
+        info = res['actions']['GetDeviceInfo']
+        logger.info("connections=%d requests/s=%.1f GetDeviceInfo ok=%d/%d reused=%d p50=%.3f ms" % (c, res['per_sec'], info['status'].get(200, 0), info['requests'], info['reused'], (info['latency'].get('p50') or 0) * 1000))
+    return results
+
+def test_ap_wps_upnp_soap_load(dev, apdev):
+    """WPS AP and concurrent UPnP SOAP calls"""
+    results = upnp_soap_load(apdev, [ 1, 4, 8 ], count=200)
+    for c, res in results:
+        info = res['actions']['GetDeviceInfo']
+        if info['status'].get(200, 0) < 0.9 * info['requests']:
+            raise Exception("Too many failed GetDeviceInfo calls with %d connections" % c)
+        put = res['actions']['PutMessage']
+        if put['status'].get("error", 0) > 0.1 * put['requests']:
+            raise Exception("Too many failed PutMessage calls with %d connections" % c)
+
+def test_ap_wps_upnp_load_long(dev, apdev, params):
+    """WPS AP and SSDP/UPnP load with high rates and many connections [long]"""
+    if not params['long']:
+        logger.info("Skip test case with long duration due to --long not specified")
+        return "skip"
+    ap_uuid = "27ea801a-9e5c-4e73-bd82-f89cbcd10d7e"
+    add_ssdp_ap(apdev[0]['ifname'], ap_uuid)
+    for rate in [ 10, 50, 100, 500, 1000 ]:
+        upnp_load.ssdp_load(upnp_load.WFA_DEVICE, rate=rate, count=10 * rate)
+        time.sleep(2)
+    upnp_soap_load(apdev, [ 1, 4, 8, 16, 32 ], duration=30)
+    ssdp_get_location(ap_uuid)
+
 def test_ap_wps_upnp_subscribe(dev, apdev):
     """WPS AP and UPnP event subscription"""
     ap_uuid = "27ea801a-9e5c-4e73-bd82-f89cbcd10d7e"
@@ -2125,3 +2184,88 @@ def test_ap_wps_mixed_cred(dev, apdev):
     pairwise = dev[0].get_network(id, "pairwise")
     if pairwise != "CCMP TKIP":
         raise Exception("Unexpected merged pairwise field value: " + pairwise)
+
+def wait_er_events(dev, event, keys, timeout, start, counts, field=1):
+    """Wait for event with each of keys (token field of the event) and
+    return the time from start to the first such event for each key; all
+    events are counted in counts"""
+    found = {}
+    end = start + timeout
+    while not keys or len(found) < len(keys):
+        remaining = end - time.time()
+        if remaining <= 0:
+            break
+        ev = dev.wait_event([""], timeout=remaining)
+        if ev is None:
+            break
+        counts['events'] += 1
+        counts['bytes'] += len(ev)
+        if event not in ev:
+            continue
+        key = ev.split(' ')[field]
+        if key in keys and key not in found:
+            found[key] = time.time() - start
+    return found
+
+def wps_er_scale(dev, params, num_aps, num_sessions=2):
+    pid = get_pid("/tmp/wpas-" + dev[0].ifname + " ")
+    mem = [ ("start", process_memory(pid)) ]
+    aps = UPnPAPs(params['logdir'], num_aps)
+    try:
+        aps.start()
+        counts = { 'events': 0, 'bytes': 0 }
+        dev[0].dump_monitor()
+        start = time.time()
+        if "OK" not in dev[0].request("WPS_ER_START ifname=lo"):
+            raise Exception("WPS_ER_START failed")
+        uuids = [ ap_uuid(i) for i in range(0, num_aps) ]
+        found = wait_er_events(dev[0], "WPS-ER-AP-ADD", uuids, 60, start,
+                               counts)
+        ap_add = latency_stats(found.values())
+        ap_counts = dict(counts)
+        mem.append(("aps", process_memory(pid)))
+        if len(found) < num_aps:
+            raise Exception("ER discovered only %d/%d APs" % (len(found),
+                                                              num_aps))
+
+        enrollees = dev[1:1 + num_sessions]
+        addrs = [ e.p2p_interface_addr() for e in enrollees ]
+        counts = { 'events': 0, 'bytes': 0 }
+        start = time.time()
+        for i in range(0, len(enrollees)):
+            if i % 2:
+                enrollees[i].request("WPS_PIN any " + enrollees[i].wps_read_pin())
+            else:
+                enrollees[i].request("WPS_PBC")
+        found = wait_er_events(dev[0], "WPS-ER-ENROLLEE-ADD", addrs, 30,
+                               start, counts, field=2)
+        for e in enrollees:
+            e.request("WPS_CANCEL")
+        enrollee_add = latency_stats(found.values())
+        # count the remaining per-AP Enrollee reports
+        wait_er_events(dev[0], "WPS-ER-ENROLLEE-ADD", [], 2, time.time(),
+                       counts)
+        mem.append(("enrollees", process_memory(pid)))
+        if len(found) < len(addrs):
+            raise Exception("ER did not report all Enrollees")
+    finally:
+        dev[0].request("WPS_ER_STOP")
+        aps.close()
+    mem.append(("stop", process_memory(pid)))
+
+    logger.info("WPS ER with %d APs: %d events (%d bytes) during AP discovery" % (num_aps, ap_counts['events'], ap_counts['bytes']))
+    logger.info("WPS-ER-AP-ADD: " + format_latency_stats(ap_add))
+    logger.info("WPS-ER-ENROLLEE-ADD with %d concurrent sessions: %d events (%d bytes): %s" % (num_sessions, counts['events'], counts['bytes'], format_latency_stats(enrollee_add)))
+    for name, vals in mem:
+        logger.info("wpa_supplicant memory (%s): VmRSS=%d kB VmData=%d kB" % (name, vals['VmRSS'], vals['VmData']))
+
+def test_ap_wps_er_scale(dev, apdev, params):
+    """WPS ER managing many APs"""
+    wps_er_scale(dev, params, 8)
+
+def test_ap_wps_er_scale_long(dev, apdev, params):
+    """WPS ER managing dozens of APs [long]"""
+    if not params['long']:
+        logger.info("Skip test case with long duration due to --long not specified")
+        return "skip"
+    wps_er_scale(dev, params, 40)
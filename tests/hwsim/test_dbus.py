@@ -0,0 +1,355 @@
+# wpa_supplicant D-Bus signal tests
+#
+# This software may be distributed under the terms of the BSD license.
+# See README for more details.
+
+import os
+import sys
+import time
+import logging
+logger = logging.getLogger()
+import subprocess
+
+try:
+    import dbus
+    import dbus.bus
+    import gobject
+    from dbus.mainloop.glib import DBusGMainLoop
+    sys.path.append("../../wpa_supplicant/examples")
+    import wpas_dbus_client
+except ImportError:
+    dbus = None
+
+import hostapd
+from hwsim import HWSimController, radio_ifname, ifname_phy
+from wpasupplicant import WpaSupplicant, ctrl_group
+from p2p_devices import P2PDevices
+from utils import get_pid, process_cpu_time, latency_stats, format_latency_stats
+
+WPAS = "../../wpa_supplicant/wpa_supplicant"
+DBUS_SOCKET = "/tmp/wpas-dbus-bus"
+DBUS_GLOBAL_IFACE = "/tmp/wpas-dbus"
+
+DBUS_CONF = """<!DOCTYPE busconfig PUBLIC "-//freedesktop//DTD D-Bus Bus Configuration 1.0//EN"
+ "http://www.freedesktop.org/standards/dbus/1.0/busconfig.dtd">
+<busconfig>
+  <type>session</type>
+  <listen>unix:path=%s</listen>
+  <auth>EXTERNAL</auth>
+  <policy context="default">
+    <allow user="*"/>
+    <allow own="*"/>
+    <allow send_destination="*" eavesdrop="true"/>
+    <allow receive_sender="*"/>
+  </policy>
+</busconfig>
+"""
+
+def dbus_supported():
+    if dbus is None:
+        logger.info("python-dbus not available")
+        return False
+    try:
+        subprocess.check_output(["dbus-daemon", "--version"])
+    except Exception:
+        logger.info("dbus-daemon not available")
+        return False
+    res = subprocess.Popen([WPAS, "-h"], stdout=subprocess.PIPE).communicate()[0]
+    if "-u = enable DBus" not in res:
+        logger.info("wpa_supplicant built without D-Bus support")
+        return False
+    return True
+
+class PrivateBus(object):
+    """Private dbus-daemon and a wpa_supplicant process that uses it as its
+    system bus
+
+    wpa_supplicant runs on a dynamically created mac80211_hwsim radio and
+    is controlled both through D-Bus (self.client) and the control
+    interface (self.wpas)."""
+
+    def __init__(self, logdir):
+        self.proc = None
+        self.radio = None
+        self.hwsim = HWSimController()
+        conf = os.path.join(logdir, "dbus-private.conf")
+        with open(conf, "w") as f:
+            f.write(DBUS_CONF % DBUS_SOCKET)
+        self.address = "unix:path=" + DBUS_SOCKET
+        self.daemon = subprocess.Popen([ "dbus-daemon", "--nofork",
+                                         "--print-pid",
+                                         "--config-file=" + conf ],
+                                       stdout=subprocess.PIPE)
+        self.daemon_pid = int(self.daemon.stdout.readline())
+        try:
+            self._start_wpas(logdir)
+        except:
+            self.close()
+            raise
+
+    def _start_wpas(self, logdir):
+        self.radio = self.hwsim.create_radio()
+        self.ifname = radio_ifname(self.radio)
+        group = ctrl_group()
+        conf = os.path.join(logdir, "dbus-wpas.conf")
+        with open(conf, "w") as f:
+            f.write("ctrl_interface=DIR=/var/run/wpa_supplicant GROUP=%s\n" % group)
+            f.write("device_name=D-Bus device\n")
+            f.write("p2p_no_group_iface=1\n")
+        cmd = [ 'sudo', 'env', 'DBUS_SYSTEM_BUS_ADDRESS=' + self.address,
+                WPAS, '-u', '-g', DBUS_GLOBAL_IFACE, '-G' + group,
+                '-Dnl80211', '-i' + self.ifname, '-c', conf, '-ddKt',
+                '-f', os.path.join(logdir, "log-dbus") ]
+        self.proc = subprocess.Popen(cmd)
+        for i in range(0, 50):
+            if os.path.exists(os.path.join("/var/run/wpa_supplicant",
+                                           self.ifname)):
+                break
+            time.sleep(0.1)
+        self.wpas = WpaSupplicant(self.ifname, DBUS_GLOBAL_IFACE)
+        self.wpas_pid = get_pid(DBUS_GLOBAL_IFACE + " ")
+
+        DBusGMainLoop(set_as_default=True)
+        self.bus = dbus.bus.BusConnection(self.address)
+        for i in range(0, 50):
+            if self.bus.name_has_owner(wpas_dbus_client.WPAS_DBUS_SERVICE):
+                break
+            time.sleep(0.1)
+        else:
+            raise Exception("wpa_supplicant did not register on D-Bus")
+        self.client = wpas_dbus_client.WpasClient(self.bus)
+        self.path = self.client.get_interface(self.ifname)
+
+    def cpu_time(self):
+        return process_cpu_time(self.daemon_pid), \
+            process_cpu_time(self.wpas_pid)
+
+    def close(self):
+        if self.proc:
+            try:
+                self.wpas.global_request("TERMINATE")
+            except Exception:
+                subprocess.call([ 'sudo', 'kill', str(self.proc.pid) ])
+            self.proc.wait()
+        if self.radio is not None:
+            self.hwsim.destroy_radio(self.radio)
+        self.daemon.terminate()
+        self.daemon.wait()
+        if os.path.exists(DBUS_SOCKET):
+            os.unlink(DBUS_SOCKET)
+
+def compact_mac(path):
+    addr = path.split('/')[-1]
+    return ':'.join([ addr[i:i + 2] for i in range(0, 12, 2) ])
+
+class SignalRecorder(object):
+    """Count wpa_supplicant D-Bus signals and match BSSAdded/DeviceFound
+    signals to the corresponding control interface events"""
+
+    def __init__(self, pbus):
+        self.counts = {}
+        self.signaled = {}
+        self.dbus_times = {}
+        self.ctrl_times = {}
+        self.latency = {}
+        pbus.bus.add_signal_receiver(self._signal,
+                                     bus_name=wpas_dbus_client.WPAS_DBUS_SERVICE,
+                                     member_keyword='member',
+                                     interface_keyword='interface')
+        for mon in [ pbus.wpas.mon, pbus.wpas.global_mon ]:
+            gobject.io_add_watch(mon.s.fileno(), gobject.IO_IN,
+                                 self._ctrl_event, mon)
+
+    def reset(self):
+        self.counts = {}
+        self.signaled = {}
+        self.dbus_times = {}
+        self.ctrl_times = {}
+        self.latency = {}
+        self.start = time.time()
+
+    def _match(self, kind, key, now):
+        if key in self.dbus_times.get(kind, {}) and \
+           key in self.ctrl_times.get(kind, {}):
+            self.latency.setdefault(kind, []).append(self.dbus_times[kind].pop(key) - self.ctrl_times[kind].pop(key))
+
+    def _record(self, times, kind, key, now):
+        d = times.setdefault(kind, {})
+        if key not in d:
+            d[key] = now
+            self._match(kind, key, now)
+
+    def _signal(self, *args, **kwargs):
+        now = time.time()
+        name = kwargs['member']
+        if name == "PropertiesChanged" and \
+           kwargs['interface'] != dbus.PROPERTIES_IFACE:
+            name = "PropertiesChanged(legacy)"
+        self.counts[name] = self.counts.get(name, 0) + 1
+        if kwargs['member'] == "BSSAdded":
+            key = wpas_dbus_client.mac_to_string(args[1]['BSSID'])
+            self.signaled.setdefault("bss", set()).add(key)
+            self._record(self.dbus_times, "bss", key, now)
+        elif kwargs['member'] == "DeviceFound":
+            key = compact_mac(args[0])
+            self.signaled.setdefault("peer", set()).add(key)
+            self._record(self.dbus_times, "peer", key, now)
+
+    def _ctrl_event(self, fd, condition, mon):
+        now = time.time()
+        while mon.pending():
+            ev = mon.recv()
+            if "CTRL-EVENT-BSS-ADDED " in ev:
+                self._record(self.ctrl_times, "bss", ev.split(' ')[2], now)
+            elif "P2P-DEVICE-FOUND " in ev:
+                self._record(self.ctrl_times, "peer", ev.split(' ')[1], now)
+        return True
+
+    def report(self, name, cpu_start, cpu_end):
+        elapsed = time.time() - self.start
+        total = sum(self.counts.values())
+        logger.info("%s: %d signals in %.2f s (%.1f signals/s) dbus-daemon CPU %.2f s wpa_supplicant CPU %.2f s" % (name, total, elapsed, total / elapsed, cpu_end[0] - cpu_start[0], cpu_end[1] - cpu_start[1]))
+        for member in sorted(self.counts):
+            logger.info("  %s: %d (%.1f/s)" % (member, self.counts[member],
+                                               self.counts[member] / elapsed))
+        res = {}
+        for kind in self.latency:
+            res[kind] = latency_stats(self.latency[kind])
+            logger.info("  %s signal latency after control interface event: %s" % (kind, format_latency_stats(res[kind])))
+        return res
+
+def run_main_loop(timeout, done=None):
+    """Run the GLib main loop until done() returns True or timeout"""
+    loop = gobject.MainLoop()
+    end = time.time() + timeout
+    def check():
+        if (done and done()) or time.time() > end:
+            loop.quit()
+            return False
+        return True
+    gobject.timeout_add(50, check)
+    loop.run()
+
+def start_bsses(logdir, apdev, num_bss):
+    ifnames = []
+    try:
+        for ap in apdev:
+            phy = ifname_phy(ap['ifname'])
+            for i in range(0, num_bss):
+                ifname = ap['ifname'] if i == 0 else "%s-%d" % (ap['ifname'], i + 1)
+                bssid = "02:00:00:00:%02x:%02x" % (int(ap['ifname'][4:]), i)
+                confname = os.path.join(logdir, ifname + "-dbus.conf")
+                hostapd.write_bss_conf(confname, ifname, bssid,
+                                       { "ssid": "dbus-%s" % ifname })
+                hostapd.add_bss(phy, ifname, confname)
+                ifnames.append(ifname)
+    except:
+        stop_bsses(ifnames)
+        raise
+    return ifnames
+
+def stop_bsses(ifnames):
+    for ifname in reversed(ifnames):
+        hostapd.remove_bss(ifname)
+
+def dbus_scan_storm(pbus, rec, rounds, num_bss):
+    """Run back-to-back scans through D-Bus with the BSS table flushed
+    before each scan so that every round reports all BSSes again"""
+    client = pbus.client
+    state = { 'rounds': 0, 'error': None }
+    scan_args = dbus.Dictionary({ 'Type': 'active',
+                                  'Channels': dbus.Array([ (dbus.UInt32(2412),
+                                                            dbus.UInt32(20)) ],
+                                                         signature='(uu)') },
+                                signature='sv')
+    def scan(check=False):
+        pbus.wpas.request("BSS_FLUSH 0")
+        if check:
+            # Report an invalid Scan call directly instead of waiting for
+            # ScanDone signals that will never arrive
+            try:
+                client.scan(pbus.path, scan_args)
+            except dbus.exceptions.DBusException, e:
+                raise Exception("D-Bus Scan failed: " + str(e))
+            return
+        client.scan(pbus.path, scan_args, reply_handler=lambda: None,
+                    error_handler=error)
+    def error(err):
+        state['error'] = str(err)
+    def scan_done(path, success):
+        state['rounds'] += 1
+        if state['rounds'] < rounds:
+            scan()
+    client.connect_signal("ScanDone", scan_done)
+    rec.reset()
+    cpu_start = pbus.cpu_time()
+    scan(check=True)
+    run_main_loop(rounds * 10, lambda: state['rounds'] >= rounds or
+                  state['error'])
+    if state['error']:
+        raise Exception("D-Bus Scan failed: " + state['error'])
+    if state['rounds'] < rounds:
+        raise Exception("Scan storm did not complete")
+    # wait for the last signals to be delivered
+    run_main_loop(0.5)
+    res = rec.report("Scan storm (%d rounds, %d BSSes)" % (rounds, num_bss),
+                     cpu_start, pbus.cpu_time())
+    bsses = client.bsses(pbus.path)
+    if len(bsses) < num_bss:
+        raise Exception("Only %d/%d BSSes in the D-Bus client cache" % (len(bsses), num_bss))
+    return res
+
+def dbus_p2p_find(pbus, rec, peers, timeout=20):
+    client = pbus.client
+    addrs = [ p.p2p_dev_addr() for p in peers ]
+    for p in peers:
+        p.p2p_listen()
+    rec.reset()
+    cpu_start = pbus.cpu_time()
+    client.p2p_find(pbus.path, {})
+    missing = lambda: [ a for a in addrs
+                        if a not in rec.signaled.get("peer", set()) ]
+    run_main_loop(timeout, lambda: not missing())
+    client.p2p_stop_find(pbus.path)
+    for p in peers:
+        p.p2p_stop_find()
+    run_main_loop(0.5)
+    if missing():
+        raise Exception("No DeviceFound signal for peers " + str(missing()))
+    return rec.report("P2P find (%d peers)" % len(peers), cpu_start,
+                      pbus.cpu_time())
+
+def dbus_signal_benchmark(dev, apdev, params, num_bss, rounds, extra_peers):
+    if not dbus_supported():
+        return "skip"
+    ifnames = start_bsses(params['logdir'], apdev[0:2], num_bss)
+    pbus = None
+    devices = None
+    try:
+        pbus = PrivateBus(params['logdir'])
+        rec = SignalRecorder(pbus)
+        dbus_scan_storm(pbus, rec, rounds, len(ifnames))
+        peers = dev[0:3]
+        if extra_peers:
+            devices = P2PDevices(params['logdir'], extra_peers)
+            peers = peers + devices.start()
+        res = dbus_p2p_find(pbus, rec, peers)
+        if res.get("peer", { 'count': 0 })['count'] < len(peers):
+            logger.info("Not all peers were matched to P2P-DEVICE-FOUND events")
+    finally:
+        if devices:
+            devices.close()
+        if pbus:
+            pbus.close()
+        stop_bsses(ifnames)
+
+def test_dbus_signal_benchmark(dev, apdev, params):
+    """D-Bus signal rate and latency during scan storm and P2P find"""
+    return dbus_signal_benchmark(dev, apdev, params, 4, 10, 0)
+
+def test_dbus_signal_benchmark_long(dev, apdev, params):
+    """D-Bus signal rate and latency with many BSSes and peers [long]"""
+    if not params['long']:
+        logger.info("Skip test case with long duration due to --long not specified")
+        return "skip"
+    return dbus_signal_benchmark(dev, apdev, params, 16, 50, 8)
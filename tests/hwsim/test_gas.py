@@ -10,10 +10,19 @@ import binascii
 import logging
 logger = logging.getLogger()
 import re
+import select
 import struct
 
 import hostapd
 from wpasupplicant import WpaSupplicant
+from fleet import StationFleet
+from frames import ACTION_CATEG_PUBLIC, GAS_INITIAL_REQUEST, GAS_INITIAL_RESPONSE
+from frames import GAS_COMEBACK_REQUEST, GAS_COMEBACK_RESPONSE
+from frames import anqp_adv_proto, anqp_initial_resp, anqp_comeback_resp
+from frames import parse_gas, is_gas_frame, action_response
+from gas_responder import GasResponder, default_anqp_table
+from utils import latency_stats, format_latency_stats
+from utils import get_pid, process_cpu_time
 
 def hs20_ap_params():
     params = hostapd.wpa2_params(ssid="test-gas")
@@ -298,33 +307,6 @@ def test_gas_timeout(dev, apdev):
 
     expect_gas_result(dev[0], "TIMEOUT")
 
-MGMT_SUBTYPE_ACTION = 13
-ACTION_CATEG_PUBLIC = 4
-
-GAS_INITIAL_REQUEST = 10
-GAS_INITIAL_RESPONSE = 11
-GAS_COMEBACK_REQUEST = 12
-GAS_COMEBACK_RESPONSE = 13
-GAS_ACTIONS = [ GAS_INITIAL_REQUEST, GAS_INITIAL_RESPONSE,
-                GAS_COMEBACK_REQUEST, GAS_COMEBACK_RESPONSE ]
-
-def anqp_adv_proto():
-    return struct.pack('BBBB', 108, 2, 127, 0)
-
-def anqp_initial_resp(dialog_token, status_code, comeback_delay=0):
-    return struct.pack('<BBBHH', ACTION_CATEG_PUBLIC, GAS_INITIAL_RESPONSE,
-                       dialog_token, status_code, comeback_delay) + anqp_adv_proto()
-
-def anqp_comeback_resp(dialog_token, status_code=0, id=0, more=False, comeback_delay=0, bogus_adv_proto=False):
-    if more:
-        id |= 0x80
-    if bogus_adv_proto:
-        adv = struct.pack('BBBB', 108, 2, 127, 1)
-    else:
-        adv = anqp_adv_proto()
-    return struct.pack('<BBBHBH', ACTION_CATEG_PUBLIC, GAS_COMEBACK_RESPONSE,
-                       dialog_token, status_code, id, comeback_delay) + adv
-
 def gas_rx(hapd):
     count = 0
     while count < 30:
@@ -332,58 +314,10 @@ def gas_rx(hapd):
         query = hapd.mgmt_rx()
         if query is None:
             raise Exception("Action frame not received")
-        if query['subtype'] != MGMT_SUBTYPE_ACTION:
-            continue
-        payload = query['payload']
-        if len(payload) < 2:
-            continue
-        (category, action) = struct.unpack('BB', payload[0:2])
-        if category != ACTION_CATEG_PUBLIC or action not in GAS_ACTIONS:
-            continue
-        return query
+        if is_gas_frame(query):
+            return query
     raise Exception("No Action frame received")
 
-def parse_gas(payload):
-    pos = payload
-    (category, action, dialog_token) = struct.unpack('BBB', pos[0:3])
-    if category != ACTION_CATEG_PUBLIC:
-        return None
-    if action not in GAS_ACTIONS:
-        return None
-    gas = {}
-    gas['action'] = action
-    pos = pos[3:]
-
-    if len(pos) < 1 and action != GAS_COMEBACK_REQUEST:
-        return None
-
-    gas['dialog_token'] = dialog_token
-
-    if action == GAS_INITIAL_RESPONSE:
-        if len(pos) < 4:
-            return None
-        (status_code, comeback_delay) = struct.unpack('<HH', pos[0:4])
-        gas['status_code'] = status_code
-        gas['comeback_delay'] = comeback_delay
-
-    if action == GAS_COMEBACK_RESPONSE:
-        if len(pos) < 5:
-            return None
-        (status_code, frag, comeback_delay) = struct.unpack('<HBH', pos[0:5])
-        gas['status_code'] = status_code
-        gas['frag'] = frag
-        gas['comeback_delay'] = comeback_delay
-
-    return gas
-
-def action_response(req):
-    resp = {}
-    resp['fc'] = req['fc']
-    resp['da'] = req['sa']
-    resp['sa'] = req['da']
-    resp['bssid'] = req['bssid']
-    return resp
-
 def send_gas_resp(hapd, resp):
     hapd.mgmt_tx(resp)
     ev = hapd.wait_event(["MGMT-TX-STATUS"], timeout=5)
@@ -755,3 +689,194 @@ def test_gas_missing_payload(dev, apdev):
         raise Exception("Timeout on MGMT-TX-STATUS")
     if "result=SUCCESS" not in ev:
         raise Exception("AP did not ack Action frame")
+
+def test_gas_responder_concurrent(dev, apdev):
+    """GAS/ANQP with concurrent fragmented queries from multiple stations"""
+    hapd = start_ap(apdev[0])
+    bssid = apdev[0]['bssid']
+
+    wpas = WpaSupplicant(global_iface='/tmp/wpas-wlan5')
+    wpas.interface_add("wlan5")
+    stas = dev + [ wpas ]
+    for sta in stas:
+        sta.scan_for_bss(bssid, freq="2412", force_scan=True)
+
+    resp = GasResponder(hapd, table=default_anqp_table(domains=30),
+                        frag_limit=100, comeback_delay=50, seed=1)
+    resp.start()
+    try:
+        for i in range(0, 3):
+            for sta in stas:
+                if "OK" not in sta.request("ANQP_GET " + bssid + " 258,263,268,hs20:3,hs20:4"):
+                    raise Exception("ANQP_GET command failed")
+            for sta in stas:
+                expect_gas_result(sta, "SUCCESS")
+    finally:
+        resp.stop()
+
+    res = resp.report()
+    logger.info("GAS responder: " + str(res))
+    if res['initial_req'] != 3 * len(stas):
+        raise Exception("Unexpected number of GAS Initial Requests")
+    if res['comeback_resp'] == 0:
+        raise Exception("Fragmented response not used")
+    if res['max_pending'] < 2:
+        raise Exception("No concurrent GAS dialogs")
+
+def test_gas_responder_faults(dev, apdev):
+    """GAS/ANQP client behavior with delayed, failed, and dropped responses"""
+    hapd = start_ap(apdev[0])
+    bssid = apdev[0]['bssid']
+
+    dev[0].scan_for_bss(bssid, freq="2412", force_scan=True)
+
+    resp = GasResponder(hapd, table=default_anqp_table(domains=30),
+                        frag_limit=100, seed=1)
+    resp.start()
+    try:
+        logger.debug("Delayed responses")
+        resp.delay = (0.2, 0.5)
+        anqp_get(dev[0], bssid, 268)
+        expect_gas_result(dev[0], "SUCCESS")
+        resp.delay = 0
+
+        logger.debug("Failure status code")
+        resp.error_rate = 1.0
+        anqp_get(dev[0], bssid, 268)
+        expect_gas_result(dev[0], "FAILURE", status=61)
+        resp.error_rate = 0
+
+        logger.debug("Unexpected fragment id")
+        resp.bad_frag_rate = 1.0
+        anqp_get(dev[0], bssid, 268)
+        expect_gas_result(dev[0], "PEER_ERROR")
+        resp.bad_frag_rate = 0
+
+        logger.debug("No response")
+        resp.drop_rate = 1.0
+        anqp_get(dev[0], bssid, 268)
+        expect_gas_result(dev[0], "TIMEOUT")
+        resp.drop_rate = 0
+
+        anqp_get(dev[0], bssid, 268)
+        expect_gas_result(dev[0], "SUCCESS")
+    finally:
+        resp.stop()
+    logger.info("GAS responder: " + str(resp.report()))
+
+def anqp_resp_len(dev, bssid, info_ids):
+    """Length of the ANQP response to a query for info_ids"""
+    query = struct.pack('<HH%dH' % len(info_ids), 256, 2 * len(info_ids),
+                        *info_ids)
+    dev.dump_monitor()
+    if "FAIL" in dev.request("GAS_REQUEST " + bssid + " 00 " + binascii.hexlify(query)):
+        raise Exception("GAS query request rejected")
+    ev = dev.wait_event(["GAS-RESPONSE-INFO"], timeout=10)
+    if ev is None:
+        raise Exception("GAS query timed out")
+    return int(ev.split("resp_len=")[1].split(' ')[0])
+
+def run_anqp_storm(stas, bssid, cmd, rounds=1, timeout=30):
+    """Issue cmd (e.g., ANQP_GET <bssid> <info ids>) on all stations at
+    the same time for the given number of rounds and collect the GAS query
+    results"""
+    hapd_pid = get_pid("/var/run/hostapd-global")
+    cpu_start = process_cpu_time(hapd_pid) if hapd_pid else None
+    by_sock = dict([ (sta.mon.s, sta) for sta in stas ])
+    results = {}
+    latency = []
+    start = time.time()
+    for i in range(0, rounds):
+        sent = {}
+        for sta in stas:
+            sta.dump_monitor()
+            sent[sta.mon.s] = time.time()
+            if "OK" not in sta.request(cmd):
+                raise Exception("Failed to start ANQP query: " + cmd)
+        deadline = time.time() + timeout
+        while sent and time.time() < deadline:
+            [r, w, e] = select.select(sent.keys(), [], [],
+                                      deadline - time.time())
+            now = time.time()
+            for sock in r:
+                mon = by_sock[sock].mon
+                while sock in sent and mon.pending():
+                    ev = mon.recv()
+                    if "GAS-QUERY-DONE" not in ev:
+                        continue
+                    res = ev.split("result=")[1].split(' ')[0]
+                    results[res] = results.get(res, 0) + 1
+                    latency.append(now - sent.pop(sock))
+        if sent:
+            results['NO-RESULT'] = results.get('NO-RESULT', 0) + len(sent)
+    elapsed = time.time() - start
+    res = {}
+    res['queries'] = rounds * len(stas)
+    res['results'] = results
+    res['elapsed'] = elapsed
+    res['per_sec'] = results.get('SUCCESS', 0) / elapsed
+    res['latency'] = latency_stats(latency)
+    if cpu_start is not None:
+        res['hostapd_cpu'] = process_cpu_time(hapd_pid) - cpu_start
+    logger.info("ANQP storm (%s): %d queries from %d stations in %.2f s: %.1f responses/s results=%s hostapd_cpu=%s" % (cmd, res['queries'], len(stas), elapsed, res['per_sec'], str(results), str(res.get('hostapd_cpu'))))
+    logger.info("ANQP query latency: " + format_latency_stats(res['latency']))
+    return res
+
+def check_anqp_storm(res):
+    if 'NO-RESULT' in res['results']:
+        raise Exception("GAS query did not complete")
+    if res['results'].get('SUCCESS', 0) < 0.9 * res['queries']:
+        raise Exception("Too many failed GAS queries")
+
+def anqp_storm(apdev, num_stas, frag_limits, comeback_delays, rounds):
+    hapd = start_ap(apdev[0])
+    bssid = apdev[0]['bssid']
+    stas = StationFleet(num_stas)
+    try:
+        for sta in stas:
+            sta.scan_for_bss(bssid, freq="2412")
+        ids = [ 258, 261, 263, 264, 268 ]
+        anqp = "ANQP_GET %s %s" % (bssid, ','.join([ str(i) for i in ids ]))
+        hs20 = "HS20_ANQP_GET %s 2,3,4,5" % bssid
+        for delay in comeback_delays:
+            hapd.set("gas_comeback_delay", str(delay))
+            for limit in frag_limits:
+                hapd.set("gas_frag_limit", str(limit))
+                resp_len = anqp_resp_len(stas[0], bssid, ids)
+                frags = (resp_len + limit - 1) / limit
+                logger.info("gas_frag_limit=%d gas_comeback_delay=%d: ANQP response %d octets, %d comeback fragment(s) per query" % (limit, delay, resp_len, frags if frags > 1 or delay else 0))
+                check_anqp_storm(run_anqp_storm(stas, bssid, anqp, rounds))
+                check_anqp_storm(run_anqp_storm(stas, bssid, hs20, rounds))
+    finally:
+        stas.close()
+
+def test_gas_anqp_storm(dev, apdev):
+    """ANQP query storm from multiple stations"""
+    anqp_storm(apdev, 16, [ 1400, 200, 50 ], [ 0 ], 2)
+
+def test_gas_anqp_storm_long(dev, apdev, params):
+    """ANQP query storm from a large number of stations [long]"""
+    if not params['long']:
+        logger.info("Skip test case with long duration due to --long not specified")
+        return "skip"
+    anqp_storm(apdev, 64, [ 1400, 500, 200, 50 ], [ 0, 10 ], 5)
+
+def test_gas_anqp_storm_sta_limit(dev, apdev):
+    """ANQP query storm exceeding the AP STA table for GAS dialogs"""
+    bssid = apdev[0]['bssid']
+    params = hs20_ap_params()
+    params['hessid'] = bssid
+    params['max_num_sta'] = "4"
+    hapd = hostapd.add_ap(apdev[0]['ifname'], params)
+    hapd.set("gas_frag_limit", "50")
+    stas = StationFleet(8)
+    try:
+        for sta in stas:
+            sta.scan_for_bss(bssid, freq="2412")
+        res = run_anqp_storm(stas, bssid, "ANQP_GET " + bssid + " 258,268")
+    finally:
+        stas.close()
+    if res['results'].get('SUCCESS', 0) != 4:
+        raise Exception("Unexpected number of successful GAS queries")
+    if res['results'].get('FAILURE', 0) != 4:
+        raise Exception("GAS dialog allocation failures not reported")
@@ -261,6 +261,72 @@ def test_hapd_ctrl_set_accept_mac_file(dev, apdev):
     if ev is not None:
         raise Exception("Unexpected disconnection")
 
+def test_hapd_ctrl_deny_acl(dev, apdev):
+    """hostapd and DENY_ACL ctrl_iface command"""
+    ssid = "hapd-ctrl"
+    params = { "ssid": ssid, "deny_mac_file": "hostapd.macaddr" }
+    hapd = hostapd.add_ap(apdev[0]['ifname'], params)
+    addr1 = dev[1].p2p_dev_addr()
+    dev[1].connect(ssid, key_mgmt="NONE", scan_freq="2412")
+    if "OK" not in hapd.request("DENY_ACL ADD_MAC " + addr1):
+        raise Exception("DENY_ACL ADD_MAC failed")
+    ev = dev[1].wait_event(["CTRL-EVENT-DISCONNECTED"], 15)
+    if ev is None:
+        raise Exception("Disconnection timeout")
+    dev[1].request("REMOVE_NETWORK all")
+    if "OK" not in hapd.request("DENY_ACL DEL_MAC " + addr1):
+        raise Exception("DENY_ACL DEL_MAC failed")
+    if "FAIL" not in hapd.request("DENY_ACL DEL_MAC " + addr1):
+        raise Exception("DENY_ACL DEL_MAC accepted for unknown address")
+    dev[1].connect(ssid, key_mgmt="NONE", scan_freq="2412")
+
+    # The entry from the file is still in effect
+    dev[0].connect(ssid, key_mgmt="NONE", scan_freq="2412",
+                   wait_connect=False)
+    ev = dev[0].wait_event(["CTRL-EVENT-CONNECTED"], timeout=1)
+    if ev is not None:
+        raise Exception("Unexpected association")
+    dev[0].request("REMOVE_NETWORK all")
+
+    for cmd in [ "DENY_ACL FOO", "DENY_ACL ADD_MAC 00:11:22:33:44",
+                 "DENY_ACL DEL_MAC foo" ]:
+        if "FAIL" not in hapd.request(cmd):
+            raise Exception("Invalid command accepted: " + cmd)
+
+def test_hapd_ctrl_accept_acl(dev, apdev):
+    """hostapd and ACCEPT_ACL ctrl_iface command"""
+    ssid = "hapd-ctrl"
+    params = { "ssid": ssid, "macaddr_acl": "1" }
+    hapd = hostapd.add_ap(apdev[0]['ifname'], params)
+    addr0 = dev[0].p2p_dev_addr()
+    addr1 = dev[1].p2p_dev_addr()
+    # Insert in the middle of the sorted list
+    for addr in [ "ff:00:00:00:00:00", addr1, "00:00:00:00:00:01", addr0 ]:
+        if "OK" not in hapd.request("ACCEPT_ACL ADD_MAC " + addr):
+            raise Exception("ACCEPT_ACL ADD_MAC failed")
+    dev[0].connect(ssid, key_mgmt="NONE", scan_freq="2412")
+    dev[1].connect(ssid, key_mgmt="NONE", scan_freq="2412")
+    if "OK" not in hapd.request("ACCEPT_ACL DEL_MAC " + addr1):
+        raise Exception("ACCEPT_ACL DEL_MAC failed")
+    ev = dev[1].wait_event(["CTRL-EVENT-DISCONNECTED"], 15)
+    if ev is None:
+        raise Exception("Disconnection timeout")
+    ev = dev[0].wait_event(["CTRL-EVENT-DISCONNECTED"], 1)
+    if ev is not None:
+        raise Exception("Unexpected disconnection")
+    dev[1].request("REMOVE_NETWORK all")
+
+    for vlan in [ "", "foo", "-1", "4095", "1x" ]:
+        if "FAIL" not in hapd.request("ACCEPT_ACL ADD_MAC " + addr0 + " VLAN_ID=" + vlan):
+            raise Exception("Invalid VLAN_ID accepted: " + vlan)
+    # Moving the station to another VLAN disconnects it
+    if "OK" not in hapd.request("ACCEPT_ACL ADD_MAC " + addr0 + " VLAN_ID=1"):
+        raise Exception("ACCEPT_ACL ADD_MAC with VLAN_ID failed")
+    ev = dev[0].wait_event(["CTRL-EVENT-DISCONNECTED"], 15)
+    if ev is None:
+        raise Exception("Disconnection timeout on VLAN change")
+    dev[0].request("REMOVE_NETWORK all")
+
 def test_hapd_ctrl_set_error_cases(dev, apdev):
     """hostapd and SET error cases"""
     ssid = "hapd-ctrl"
@@ -0,0 +1,94 @@
+# Management frame fuzzing tests
+#
+# This software may be distributed under the terms of the BSD license.
+# See README for more details.
+
+import os
+import logging
+logger = logging.getLogger()
+
+import hostapd
+import mgmt_fuzz
+from test_p2p_messages import start_p2p
+
+def fuzz_ap_params(ssid):
+    params = hostapd.wpa2_params(ssid=ssid, passphrase="12345678")
+    params['eap_server'] = "1"
+    params['wps_state'] = "2"
+    params['interworking'] = "1"
+    params['access_network_type'] = "14"
+    params['internet'] = "1"
+    params['venue_group'] = "7"
+    params['venue_type'] = "1"
+    params['venue_name'] = [ "eng:Example venue", "fin:Esimerkkipaikka" ]
+    params['roaming_consortium'] = [ "112233", "1020304050" ]
+    params['domain_name'] = "example.com,another.example.com"
+    params['nai_realm'] = [ "0,example.com,13[5:6],21[2:4][5:7]",
+                            "0,another.example.com" ]
+    params['anqp_3gpp_cell_net'] = "244,91"
+    params['hs20'] = "1"
+    params['hs20_wan_metrics'] = "01:8000:1000:80:240:3000"
+    params['hs20_conn_capab'] = [ "1:0:2", "6:22:1", "17:5060:0" ]
+    params['hs20_operating_class'] = "5173"
+    return params
+
+def start_fuzz_ap(apdev):
+    ssid = "fuzz"
+    bssid = apdev[0]['bssid']
+    target = hostapd.add_ap(apdev[0]['ifname'], fuzz_ap_params(ssid))
+    injector = hostapd.add_ap(apdev[1]['ifname'], { "ssid": "fuzz-injector" })
+    injector.set("ext_mgmt_frame_handling", "1")
+    src = apdev[1]['bssid']
+    return injector, target, mgmt_fuzz.ap_templates(bssid, src, ssid), \
+        bssid, src
+
+def check_fuzz_result(res):
+    mgmt_fuzz.log_report(res)
+    if res['crashes'] or res['replay_failed']:
+        raise Exception("Fuzzing target stopped responding")
+    if res['tx_fail'] > res['sent'] / 10:
+        raise Exception("Too many frame injection failures")
+
+def test_mgmt_fuzz_ap(dev, apdev):
+    """Management frame fuzzing against hostapd (GAS/ANQP, WPS, RSN)"""
+    injector, target, templates, bssid, src = start_fuzz_ap(apdev)
+    fuzzer = mgmt_fuzz.MgmtFuzzer(injector, target, templates, bssid, src,
+                                  seed=1)
+    check_fuzz_result(fuzzer.run(count=1000))
+
+def test_mgmt_fuzz_p2p(dev, apdev):
+    """Management frame fuzzing against a P2P Device"""
+    dst, src, hapd, channel = start_p2p(dev, apdev)
+    fuzzer = mgmt_fuzz.MgmtFuzzer(hapd, dev[0],
+                                  mgmt_fuzz.p2p_templates(dst, src), dst, src,
+                                  seed=1)
+    check_fuzz_result(fuzzer.run(count=1000))
+    if not dev[1].ping():
+        raise Exception("Other wpa_supplicant process stopped responding")
+
+def fuzz_corpus_dir():
+    """Corpus directory shared by all test runs; HWSIM_FUZZ_CORPUS can be
+    used to select another location"""
+    default = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           "fuzz-corpus")
+    return os.environ.get("HWSIM_FUZZ_CORPUS", default)
+
+def test_mgmt_fuzz_long(dev, apdev, params):
+    """Management frame fuzzing with random seeds and a corpus [long]"""
+    if not params['long']:
+        logger.info("Skip test case with long duration due to --long not specified")
+        return "skip"
+    # The corpus is kept between runs: earlier findings are replayed first
+    # and used as mutation seeds
+    corpus = fuzz_corpus_dir()
+    logger.info("Management frame fuzzing corpus: " + corpus)
+    injector, target, templates, bssid, src = start_fuzz_ap(apdev)
+    fuzzer = mgmt_fuzz.MgmtFuzzer(injector, target, templates, bssid, src,
+                                  corpus_dir=os.path.join(corpus, "ap"))
+    check_fuzz_result(fuzzer.run(duration=120))
+
+    dst, src, hapd, channel = start_p2p(dev, apdev)
+    fuzzer = mgmt_fuzz.MgmtFuzzer(hapd, dev[0],
+                                  mgmt_fuzz.p2p_templates(dst, src), dst, src,
+                                  corpus_dir=os.path.join(corpus, "p2p"))
+    check_fuzz_result(fuzzer.run(duration=120))
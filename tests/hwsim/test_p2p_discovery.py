@@ -10,6 +10,8 @@ import time
 
 import hwsim_utils
 from wpasupplicant import WpaSupplicant
+from p2p_devices import P2PDevices
+from utils import latency_stats, format_latency_stats
 
 def test_discovery(dev):
     """P2P device discovery and provision discovery"""
@@ -271,3 +273,92 @@ def test_discovery_and_interface_disabled(dev):
             raise Exception("Peer not found")
     finally:
         dev[0].request("DRIVER_EVENT INTERFACE_ENABLED")
+
+def timed_discovery(seeker, peers, find_type, timeout):
+    """Run P2P_FIND on seeker while the peers are in Listen state and
+    return the time from the command to P2P-DEVICE-FOUND for each peer"""
+    expected = [ p.p2p_dev_addr() for p in peers ]
+    seeker.global_request("P2P_FLUSH")
+    for p in peers:
+        if "OK" not in p.p2p_listen():
+            raise Exception("P2P_LISTEN failed")
+    seeker.dump_monitor()
+    start = time.time()
+    if "OK" not in seeker.p2p_find(social=find_type == "social",
+                                   progressive=find_type == "progressive"):
+        raise Exception("P2P_FIND failed")
+    found = {}
+    while len(found) < len(expected):
+        remaining = start + timeout - time.time()
+        if remaining <= 0:
+            break
+        ev = seeker.wait_global_event(["P2P-DEVICE-FOUND"], timeout=remaining)
+        if ev is None:
+            break
+        addr = ev.split(' ')[1]
+        if addr in expected and addr not in found:
+            found[addr] = time.time() - start
+    seeker.p2p_stop_find()
+    for p in peers:
+        p.p2p_stop_find()
+    return found, [ a for a in expected if a not in found ]
+
+def peer_table_walk(dev):
+    """Iterate over the P2P_PEER table and return the number of entries and
+    the time used"""
+    start = time.time()
+    count = 0
+    res = dev.global_request("P2P_PEER FIRST")
+    while "FAIL" not in res and res.strip():
+        count += 1
+        addr = res.splitlines()[0]
+        res = dev.global_request("P2P_PEER NEXT-" + addr)
+    return count, time.time() - start
+
+def discovery_scale(params, num_devs, find_types, listen_layouts, rounds,
+                    timeout=30):
+    devices = P2PDevices(params['logdir'], num_devs)
+    results = []
+    try:
+        for layout in listen_layouts:
+            devs = devices.start(listen_channels=listen_layouts[layout])
+            seeker = devs[0]
+            peers = devs[1:]
+            for find_type in find_types:
+                samples = []
+                missing = []
+                for r in range(0, rounds):
+                    found, lost = timed_discovery(seeker, peers, find_type,
+                                                  timeout)
+                    samples += found.values()
+                    missing += lost
+                count, walk = peer_table_walk(seeker)
+                if count < len(peers) - len(lost):
+                    raise Exception("Discovered peers missing from P2P_PEER table")
+                results.append((layout, find_type, latency_stats(samples),
+                                len(missing), count, walk))
+    finally:
+        devices.close()
+
+    logger.info("P2P discovery with %d peers (%d rounds):" % (num_devs - 1,
+                                                             rounds))
+    for layout, find_type, stats, missing, count, walk in results:
+        logger.info("listen=%s find=%s missing=%d peers=%d table_walk=%.3f ms: %s" % (layout, find_type, missing, count, walk * 1000, format_latency_stats(stats)))
+    for layout, find_type, stats, missing, count, walk in results:
+        if missing and find_type == "social":
+            raise Exception("%d peers not discovered (listen=%s find=%s)" % (missing, layout, find_type))
+    return results
+
+def test_discovery_scale(dev, apdev, params):
+    """P2P device discovery with many peers"""
+    discovery_scale(params, 8, [ "social", "progressive" ],
+                    { "ch1": [ 1 ], "social": [ 1, 6, 11 ] }, 2)
+
+def test_discovery_scale_long(dev, apdev, params):
+    """P2P device discovery with dozens of peers [long]"""
+    if not params['long']:
+        logger.info("Skip test case with long duration due to --long not specified")
+        return "skip"
+    discovery_scale(params, 32, [ "social", "progressive", "full" ],
+                    { "ch1": [ 1 ], "social": [ 1, 6, 11 ], "random": None },
+                    3, timeout=60)
@@ -11,170 +11,38 @@ import logging
 logger = logging.getLogger()
 
 import hostapd
+from frames import P2P_ATTR_CAPABILITY, P2P_ATTR_CHANNEL_LIST
+from frames import P2P_ATTR_CONFIGURATION_TIMEOUT, P2P_ATTR_DEVICE_ID
+from frames import P2P_ATTR_DEVICE_INFO, P2P_ATTR_EXT_LISTEN_TIMING
+from frames import P2P_ATTR_GROUP_BSSID, P2P_ATTR_GROUP_ID
+from frames import P2P_ATTR_GROUP_OWNER_INTENT
+from frames import P2P_ATTR_INTENDED_INTERFACE_ADDR, P2P_ATTR_INVITATION_FLAGS
+from frames import P2P_ATTR_LISTEN_CHANNEL, P2P_ATTR_MANAGEABILITY
+from frames import P2P_ATTR_MINOR_REASON_CODE, P2P_ATTR_NOTICE_OF_ABSENCE
+from frames import P2P_ATTR_OOB_GO_NEG_CHANNEL, P2P_ATTR_OPERATING_CHANNEL
+from frames import P2P_ATTR_STATUS
+from frames import P2P_SC_FAIL_INCOMPATIBLE_PARAMS
+from frames import P2P_SC_FAIL_INCOMPATIBLE_PROV_METHOD
+from frames import P2P_SC_FAIL_INFO_CURRENTLY_UNAVAILABLE
+from frames import P2P_SC_FAIL_INVALID_PARAMS, P2P_SC_FAIL_NO_COMMON_CHANNELS
+from frames import P2P_SC_FAIL_REJECTED_BY_USER
+from frames import MGMT_SUBTYPE_PROBE_REQ, P2P_GO_NEG_CONF, P2P_GO_NEG_REQ
+from frames import P2P_GO_NEG_RESP, P2P_INVITATION_REQ, P2P_INVITATION_RESP
+from frames import P2P_PROV_DISC_REQ, P2P_PROV_DISC_RESP
+from frames import p2p_attr_capability, p2p_attr_channel_list
+from frames import p2p_attr_config_timeout, p2p_attr_device_info
+from frames import p2p_attr_ext_listen_timing, p2p_attr_go_intent
+from frames import p2p_attr_group_bssid, p2p_attr_group_id
+from frames import p2p_attr_intended_interface_addr, p2p_attr_invitation_flags
+from frames import p2p_attr_listen_channel, p2p_attr_manageability
+from frames import p2p_attr_minor_reason_code, p2p_attr_operating_channel
+from frames import p2p_attr_status
+from frames import ie_p2p, ie_ssid, ie_supp_rates, ie_wsc, p2p_hdr
+from frames import p2p_hdr_resp, parse_p2p_public_action
+from frames import wsc_attr_config_methods
 from test_p2p_persistent import form
 from test_p2p_persistent import invite
 
-MGMT_SUBTYPE_PROBE_REQ = 4
-MGMT_SUBTYPE_ACTION = 13
-ACTION_CATEG_PUBLIC = 4
-
-P2P_GO_NEG_REQ = 0
-P2P_GO_NEG_RESP = 1
-P2P_GO_NEG_CONF = 2
-P2P_INVITATION_REQ = 3
-P2P_INVITATION_RESP = 4
-P2P_DEV_DISC_REQ = 5
-P2P_DEV_DISC_RESP = 6
-P2P_PROV_DISC_REQ = 7
-P2P_PROV_DISC_RESP = 8
-
-P2P_ATTR_STATUS = 0
-P2P_ATTR_MINOR_REASON_CODE = 1
-P2P_ATTR_CAPABILITY = 2
-P2P_ATTR_DEVICE_ID = 3
-P2P_ATTR_GROUP_OWNER_INTENT = 4
-P2P_ATTR_CONFIGURATION_TIMEOUT = 5
-P2P_ATTR_LISTEN_CHANNEL = 6
-P2P_ATTR_GROUP_BSSID = 7
-P2P_ATTR_EXT_LISTEN_TIMING = 8
-P2P_ATTR_INTENDED_INTERFACE_ADDR = 9
-P2P_ATTR_MANAGEABILITY = 10
-P2P_ATTR_CHANNEL_LIST = 11
-P2P_ATTR_NOTICE_OF_ABSENCE = 12
-P2P_ATTR_DEVICE_INFO = 13
-P2P_ATTR_GROUP_INFO = 14
-P2P_ATTR_GROUP_ID = 15
-P2P_ATTR_INTERFACE = 16
-P2P_ATTR_OPERATING_CHANNEL = 17
-P2P_ATTR_INVITATION_FLAGS = 18
-P2P_ATTR_OOB_GO_NEG_CHANNEL = 19
-P2P_ATTR_VENDOR_SPECIFIC = 221
-
-P2P_SC_SUCCESS = 0
-P2P_SC_FAIL_INFO_CURRENTLY_UNAVAILABLE = 1
-P2P_SC_FAIL_INCOMPATIBLE_PARAMS = 2
-P2P_SC_FAIL_LIMIT_REACHED = 3
-P2P_SC_FAIL_INVALID_PARAMS = 4
-P2P_SC_FAIL_UNABLE_TO_ACCOMMODATE = 5
-P2P_SC_FAIL_PREV_PROTOCOL_ERROR = 6
-P2P_SC_FAIL_NO_COMMON_CHANNELS = 7
-P2P_SC_FAIL_UNKNOWN_GROUP = 8
-P2P_SC_FAIL_BOTH_GO_INTENT_15 = 9
-P2P_SC_FAIL_INCOMPATIBLE_PROV_METHOD = 10
-P2P_SC_FAIL_REJECTED_BY_USER = 11
-
-WSC_ATTR_CONFIG_METHODS = 0x1008
-
-WLAN_EID_SSID = 0
-WLAN_EID_SUPP_RATES = 1
-WLAN_EID_VENDOR_SPECIFIC = 221
-
-def ie_ssid(ssid):
-    return struct.pack("<BB", WLAN_EID_SSID, len(ssid)) + ssid
-
-def ie_supp_rates():
-    return struct.pack("<BBBBBBBBBB", WLAN_EID_SUPP_RATES, 8,
-                       2*6, 2*9, 2*12, 2*18, 2*24, 2*36, 2*48, 2*54)
-
-def ie_p2p(attrs):
-    return struct.pack("<BBBBBB", WLAN_EID_VENDOR_SPECIFIC, 4 + len(attrs),
-                       0x50, 0x6f, 0x9a, 9) + attrs
-
-def ie_wsc(attrs):
-    return struct.pack("<BBBBBB", WLAN_EID_VENDOR_SPECIFIC, 4 + len(attrs),
-                       0x00, 0x50, 0xf2, 4) + attrs
-
-def wsc_attr_config_methods(methods=0):
-    return struct.pack(">HHH", WSC_ATTR_CONFIG_METHODS, 2, methods)
-
-def p2p_attr_status(status=P2P_SC_SUCCESS):
-    return struct.pack("<BHB", P2P_ATTR_STATUS, 1, status)
-
-def p2p_attr_minor_reason_code(code=0):
-    return struct.pack("<BHB", P2P_ATTR_MINOR_REASON_CODE, 1, code)
-
-def p2p_attr_capability(dev_capab=0, group_capab=0):
-    return struct.pack("<BHBB", P2P_ATTR_CAPABILITY, 2, dev_capab, group_capab)
-
-def p2p_attr_device_id(addr):
-    val = struct.unpack('6B', binascii.unhexlify(addr.replace(':','')))
-    t = (P2P_ATTR_DEVICE_ID, 6) + val
-    return struct.pack('<BH6B', *t)
-
-def p2p_attr_go_intent(go_intent=0, tie_breaker=0):
-    return struct.pack("<BHB", P2P_ATTR_GROUP_OWNER_INTENT, 1,
-                       (go_intent << 1) | (tie_breaker & 0x01))
-
-def p2p_attr_config_timeout(go_config_timeout=0, client_config_timeout=0):
-    return struct.pack("<BHBB", P2P_ATTR_CONFIGURATION_TIMEOUT, 2,
-                       go_config_timeout, client_config_timeout)
-
-def p2p_attr_listen_channel(op_class=81, chan=1):
-    return struct.pack("<BHBBBBB", P2P_ATTR_LISTEN_CHANNEL, 5,
-                       0x58, 0x58, 0x04, op_class, chan)
-
-def p2p_attr_group_bssid(addr):
-    val = struct.unpack('6B', binascii.unhexlify(addr.replace(':','')))
-    t = (P2P_ATTR_GROUP_BSSID, 6) + val
-    return struct.pack('<BH6B', *t)
-
-def p2p_attr_ext_listen_timing(period=0, interval=0):
-    return struct.pack("<BHHH", P2P_ATTR_EXT_LISTEN_TIMING, 4, period, interval)
-
-def p2p_attr_intended_interface_addr(addr):
-    val = struct.unpack('6B', binascii.unhexlify(addr.replace(':','')))
-    t = (P2P_ATTR_INTENDED_INTERFACE_ADDR, 6) + val
-    return struct.pack('<BH6B', *t)
-
-def p2p_attr_manageability(bitmap=0):
-    return struct.pack("<BHB", P2P_ATTR_MANAGEABILITY, 1, bitmap)
-
-def p2p_attr_channel_list():
-    return struct.pack("<BH3BBB11B", P2P_ATTR_CHANNEL_LIST, 16,
-                       0x58, 0x58, 0x04,
-                       81, 11, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11)
-
-def p2p_attr_device_info(addr, name="Test", config_methods=0, dev_type="00010050F2040001"):
-    val = struct.unpack('6B', binascii.unhexlify(addr.replace(':','')))
-    val2 = struct.unpack('8B', binascii.unhexlify(dev_type))
-    t = (P2P_ATTR_DEVICE_INFO, 6 + 2 + 8 + 1 + 4 + len(name)) + val + (config_methods,) + val2 + (0,)
-    return struct.pack("<BH6BH8BB", *t) + struct.pack('>HH', 0x1011, len(name)) +name
-
-def p2p_attr_group_id(addr, ssid):
-    val = struct.unpack('6B', binascii.unhexlify(addr.replace(':','')))
-    t = (P2P_ATTR_GROUP_ID, 6 + len(ssid)) + val
-    return struct.pack('<BH6B', *t) + ssid
-
-def p2p_attr_operating_channel(op_class=81, chan=1):
-    return struct.pack("<BHBBBBB", P2P_ATTR_OPERATING_CHANNEL, 5,
-                       0x58, 0x58, 0x04, op_class, chan)
-
-def p2p_attr_invitation_flags(bitmap=0):
-    return struct.pack("<BHB", P2P_ATTR_INVITATION_FLAGS, 1, bitmap)
-
-def p2p_hdr_helper(dst, src, type=None, dialog_token=1, req=True):
-    msg = {}
-    msg['fc'] = MGMT_SUBTYPE_ACTION << 4
-    msg['da'] = dst
-    msg['sa'] = src
-    if req:
-        msg['bssid'] = dst
-    else:
-        msg['bssid'] = src
-    msg['payload'] = struct.pack("<BBBBBB",
-                                 ACTION_CATEG_PUBLIC, 9, 0x50, 0x6f, 0x9a, 9)
-    if type is not None:
-        msg['payload'] += struct.pack("<B", type)
-        if dialog_token:
-            msg['payload'] += struct.pack("<B", dialog_token)
-    return msg
-
-def p2p_hdr(dst, src, type=None, dialog_token=1):
-    return p2p_hdr_helper(dst, src, type, dialog_token, True)
-
-def p2p_hdr_resp(dst, src, type=None, dialog_token=1):
-    return p2p_hdr_helper(dst, src, type, dialog_token, False)
-
 def start_p2p(dev, apdev):
     addr0 = dev[0].p2p_dev_addr()
     dev[0].p2p_listen()
@@ -207,72 +75,6 @@ def p2p_probe(hapd, src, chan=1):
     msg['payload'] = ie_ssid("DIRECT-") + ie_supp_rates() + ie_p2p(attrs)
     hapd.mgmt_tx(msg)
 
-def parse_p2p_public_action(payload):
-    pos = payload
-    (category, action) = struct.unpack('BB', pos[0:2])
-    if category != ACTION_CATEG_PUBLIC:
-        return None
-    if action != 9:
-        return None
-    pos = pos[2:]
-    (oui1,oui2,oui3,subtype) = struct.unpack('BBBB', pos[0:4])
-    if oui1 != 0x50 or oui2 != 0x6f or oui3 != 0x9a or subtype != 9:
-        return None
-    pos = pos[4:]
-    (subtype,dialog_token) = struct.unpack('BB', pos[0:2])
-    p2p = {}
-    p2p['subtype'] = subtype
-    p2p['dialog_token'] = dialog_token
-    pos = pos[2:]
-    p2p['elements'] = pos
-    while len(pos) > 2:
-        (id,elen) = struct.unpack('BB', pos[0:2])
-        pos = pos[2:]
-        if elen > len(pos):
-            raise Exception("Truncated IE in P2P Public Action frame (elen=%d left=%d)" % (elen, len(pos)))
-        if id == WLAN_EID_VENDOR_SPECIFIC:
-            if elen < 4:
-                raise Exception("Too short vendor specific IE in P2P Public Action frame (elen=%d)" % elen)
-            (oui1,oui2,oui3,subtype) = struct.unpack('BBBB', pos[0:4])
-            if oui1 == 0x50 and oui2 == 0x6f and oui3 == 0x9a and subtype == 9:
-                if 'p2p' in p2p:
-                    p2p['p2p'] += pos[4:elen]
-                else:
-                    p2p['p2p'] = pos[4:elen]
-            if oui1 == 0x00 and oui2 == 0x50 and oui3 == 0xf2 and subtype == 4:
-                p2p['wsc'] = pos[4:elen]
-        pos = pos[elen:]
-    if len(pos) > 0:
-        raise Exception("Invalid element in P2P Public Action frame")
-
-    if 'p2p' in p2p:
-        p2p['p2p_attrs'] = {}
-        pos = p2p['p2p']
-        while len(pos) >= 3:
-            (id,alen) = struct.unpack('<BH', pos[0:3])
-            pos = pos[3:]
-            if alen > len(pos):
-                logger.info("P2P payload: " + binascii.hexlify(p2p['p2p']))
-                raise Exception("Truncated P2P attribute in P2P Public Action frame (alen=%d left=%d p2p-payload=%d)" % (alen, len(pos), len(p2p['p2p'])))
-            p2p['p2p_attrs'][id] = pos[0:alen]
-            pos = pos[alen:]
-        if P2P_ATTR_STATUS in p2p['p2p_attrs']:
-            p2p['p2p_status'] = struct.unpack('B', p2p['p2p_attrs'][P2P_ATTR_STATUS])[0]
-
-    if 'wsc' in p2p:
-        p2p['wsc_attrs'] = {}
-        pos = p2p['wsc']
-        while len(pos) >= 4:
-            (id,alen) = struct.unpack('>HH', pos[0:4])
-            pos = pos[4:]
-            if alen > len(pos):
-                logger.info("WSC payload: " + binascii.hexlify(p2p['wsc']))
-                raise Exception("Truncated WSC attribute in P2P Public Action frame (alen=%d left=%d wsc-payload=%d)" % (alen, len(pos), len(p2p['wsc'])))
-            p2p['wsc_attrs'][id] = pos[0:alen]
-            pos = pos[alen:]
-
-    return p2p
-
 def test_p2p_msg_empty(dev, apdev):
     """P2P protocol test: empty P2P Public Action frame"""
     dst, src, hapd, channel = start_p2p(dev, apdev)
@@ -6,9 +6,14 @@
 
 import logging
 logger = logging.getLogger()
+import select
+import struct
+import time
 import uuid
 
 import hwsim_utils
+from p2p_devices import P2PDevices
+from utils import latency_stats, format_latency_stats, process_memory
 
 def add_bonjour_services(dev):
     dev.request("P2P_SERVICE_ADD bonjour 0b5f6166706f766572746370c00c000c01 074578616d706c65c027")
@@ -200,3 +205,119 @@ def test_p2p_service_discovery_req_cancel(dev):
     query = dev[0].request("P2P_SERV_DISC_REQ 00:00:00:00:00:00 02000001")
     if "OK" not in dev[0].request("P2P_SERV_DISC_CANCEL_REQ " + query):
         raise Exception("Unexpected SD(broadcast) cancel failure")
+
+def bulk_service(i):
+    """Return the P2P_SERVICE_ADD parameters and a matching specific query
+    for synthetic service i (alternating Bonjour and UPnP)"""
+    if i % 2:
+        label = "printer%05d" % i
+        query = "%02x" % len(label) + label.encode("hex") + "045f697070c00c001001"
+        tlv = struct.pack('<HBB', 2 + len(query) / 2, 1, 1).encode("hex")
+        return "bonjour " + query + " 09747874766572733d31", tlv + query
+    srv = "uuid:%s" % uuid.UUID(int=i)
+    return "upnp 10 " + srv + "::urn:schemas-upnp-org:service:Print:1", \
+        "upnp 10 " + srv
+
+def add_bulk_services(dev, start, end):
+    for i in range(start, end):
+        if "OK" not in dev.request("P2P_SERVICE_ADD " + bulk_service(i)[0]):
+            raise Exception("P2P_SERVICE_ADD failed for service %d" % i)
+
+def run_sd_storm(provider, queriers, query, timeout=30):
+    """Send the same service discovery query from all queriers to provider
+    at the same time and wait for the responses"""
+    addr = provider.p2p_dev_addr()
+    provider.p2p_listen()
+    by_sock = dict([ (q.mon.s, q) for q in queriers ])
+    sent = {}
+    for q in queriers:
+        q.request("P2P_FLUSH")
+        q.dump_monitor()
+        sent[q.mon.s] = time.time()
+        if "FAIL" in q.request("P2P_SERV_DISC_REQ " + addr + " " + query):
+            raise Exception("P2P_SERV_DISC_REQ failed")
+        q.p2p_find(social=True)
+    latency = []
+    sizes = []
+    deadline = time.time() + timeout
+    while sent and time.time() < deadline:
+        [r, w, e] = select.select(sent.keys(), [], [], deadline - time.time())
+        now = time.time()
+        for sock in r:
+            mon = by_sock[sock].mon
+            while sock in sent and mon.pending():
+                ev = mon.recv()
+                if "P2P-SERV-DISC-RESP " + addr not in ev:
+                    continue
+                latency.append(now - sent.pop(sock))
+                sizes.append(len(ev.split(' ')[3]) / 2)
+    for q in queriers:
+        q.p2p_stop_find()
+    provider.p2p_stop_find()
+    return latency, sizes, len(sent)
+
+def sd_comebacks(logfile):
+    """Number of GAS Comeback Response frames the device has sent according
+    to its debug log"""
+    with open(logfile, "r") as f:
+        return len([ l for l in f if "Send GAS Comeback Response" in l ])
+
+def p2p_service_discovery_bulk(params, service_counts, num_queriers, rounds):
+    devices = P2PDevices(params['logdir'], num_queriers + 1)
+    results = []
+    try:
+        devs = devices.start()
+        provider = devs[0]
+        queriers = devs[1:]
+        pid = devices.pid(0)
+        mem_start = process_memory(pid)
+        count = 0
+        for target in service_counts:
+            start = time.time()
+            add_bulk_services(provider, count, target)
+            add_time = time.time() - start
+            mem = process_memory(pid)
+            queries = [ ("wildcard", "02000001"),
+                        ("bonjour", bulk_service(target - 1)[1]),
+                        ("upnp", bulk_service(target - 2)[1]) ]
+            for name, query in queries:
+                latency = []
+                sizes = []
+                missing = 0
+                comebacks = sd_comebacks(devices.logfile(0))
+                for r in range(0, rounds):
+                    l, s, m = run_sd_storm(provider, queriers, query)
+                    latency += l
+                    sizes += s
+                    missing += m
+                comebacks = sd_comebacks(devices.logfile(0)) - comebacks
+                results.append((target, name, (target - count) / add_time,
+                                mem, latency_stats(latency), sizes, missing,
+                                comebacks))
+            count = target
+        mem_end = process_memory(pid)
+    finally:
+        devices.close()
+
+    logger.info("P2P service discovery with %d queriers: VmRSS start %d kB end %d kB" % (num_queriers, mem_start['VmRSS'], mem_end['VmRSS']))
+    for target, name, add_rate, mem, stats, sizes, missing, comebacks in results:
+        size = max(sizes) if sizes else 0
+        per_resp = float(comebacks) / len(sizes) if sizes else 0
+        logger.info("services=%d query=%s add_rate=%.0f/s VmRSS=%d kB VmData=%d kB resp_len=%d comebacks/resp=%.1f missing=%d: %s" % (target, name, add_rate, mem['VmRSS'], mem['VmData'], size, per_resp, missing, format_latency_stats(stats)))
+    for target, name, add_rate, mem, stats, sizes, missing, comebacks in results:
+        if missing:
+            raise Exception("%d service discovery responses missing (services=%d query=%s)" % (missing, target, name))
+        if name != "wildcard" and min(sizes) < 10:
+            raise Exception("No response data for a specific query (services=%d query=%s)" % (target, name))
+    return results
+
+def test_p2p_service_discovery_bulk(dev, apdev, params):
+    """P2P service discovery with thousands of services and several peers"""
+    p2p_service_discovery_bulk(params, [ 100, 2000 ], 3, 2)
+
+def test_p2p_service_discovery_bulk_long(dev, apdev, params):
+    """P2P service discovery with a very large service table [long]"""
+    if not params['long']:
+        logger.info("Skip test case with long duration due to --long not specified")
+        return "skip"
+    p2p_service_discovery_bulk(params, [ 100, 1000, 5000, 10000 ], 8, 3)
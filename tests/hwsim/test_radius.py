@@ -4,11 +4,8 @@
 # This software may be distributed under the terms of the BSD license.
 # See README for more details.
 
-import hmac
 import logging
 logger = logging.getLogger()
-import select
-import struct
 import subprocess
 import threading
 import time
@@ -595,84 +592,38 @@ def test_radius_failover(dev, apdev):
     if req_e <= req_s:
         raise Exception("Unexpected RADIUS server acct MIB value")
 
-def run_pyrad_server(srv, t_events):
-    srv.RunWithStop(t_events)
-
 def test_radius_protocol(dev, apdev):
     """RADIUS Authentication protocol tests with a fake server"""
     try:
-        import pyrad.server
         import pyrad.packet
-        import pyrad.dictionary
+        import radius_srv
     except ImportError:
         return "skip"
 
-    class TestServer(pyrad.server.Server):
-        def _HandleAuthPacket(self, pkt):
-            pyrad.server.Server._HandleAuthPacket(self, pkt)
-            logger.info("Received authentication request")
-            reply = self.CreateReplyPacket(pkt)
-            reply.code = pyrad.packet.AccessAccept
-            if self.t_events['msg_auth'].is_set():
-                logger.info("Add Message-Authenticator")
-                if self.t_events['wrong_secret'].is_set():
-                    logger.info("Use incorrect RADIUS shared secret")
-                    pw = "incorrect"
-                else:
-                    pw = reply.secret
-                hmac_obj = hmac.new(pw)
-                hmac_obj.update(struct.pack("B", reply.code))
-                hmac_obj.update(struct.pack("B", reply.id))
-
-                # reply attributes
-                reply.AddAttribute("Message-Authenticator",
-                                   "\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00")
-                attrs = reply._PktEncodeAttributes()
-
-                # Length
-                flen = 4 + 16 + len(attrs)
-                hmac_obj.update(struct.pack(">H", flen))
-                hmac_obj.update(pkt.authenticator)
-                hmac_obj.update(attrs)
-                if self.t_events['double_msg_auth'].is_set():
-                    logger.info("Include two Message-Authenticator attributes")
-                else:
-                    del reply[80]
-                reply.AddAttribute("Message-Authenticator", hmac_obj.digest())
-            self.SendReplyPacket(pkt.fd, reply)
-
-        def RunWithStop(self, t_events):
-            self._poll = select.poll()
-            self._fdmap = {}
-            self._PrepareSockets()
-            self.t_events = t_events
-
-            while not t_events['stop'].is_set():
-                for (fd, event) in self._poll.poll(1000):
-                    if event == select.POLLIN:
-                        try:
-                            fdo = self._fdmap[fd]
-                            self._ProcessInput(fdo)
-                        except ServerPacketError as err:
-                            logger.info("pyrad server dropping packet: " + str(err))
-                        except pyrad.packet.PacketError as err:
-                            logger.info("pyrad server received invalid packet: " + str(err))
-                    else:
-                        logger.error("Unexpected event in pyrad server main loop")
-
-    srv = TestServer(dict=pyrad.dictionary.Dictionary("dictionary.radius"),
-                     authport=18138, acctport=18139)
-    srv.hosts["127.0.0.1"] = pyrad.server.RemoteHost("127.0.0.1",
-                                                     "radius",
-                                                     "localhost")
-    srv.BindToAddress("")
     t_events = {}
-    t_events['stop'] = threading.Event()
     t_events['msg_auth'] = threading.Event()
     t_events['wrong_secret'] = threading.Event()
     t_events['double_msg_auth'] = threading.Event()
-    t = threading.Thread(target=run_pyrad_server, args=(srv, t_events))
-    t.start()
+
+    def auth_handler(srv, pkt):
+        logger.info("Received authentication request")
+        reply = srv.create_reply(pkt, pyrad.packet.AccessAccept)
+        if t_events['msg_auth'].is_set():
+            logger.info("Add Message-Authenticator")
+            if t_events['wrong_secret'].is_set():
+                logger.info("Use incorrect RADIUS shared secret")
+                pw = "incorrect"
+            else:
+                pw = reply.secret
+            if t_events['double_msg_auth'].is_set():
+                logger.info("Include two Message-Authenticator attributes")
+            radius_srv.add_message_authenticator(reply, pkt.authenticator,
+                                                 secret=pw,
+                                                 duplicate=t_events['double_msg_auth'].is_set())
+        return reply
+
+    srv = radius_srv.RadiusServer(auth_handler, authport=18138)
+    srv.start()
 
     try:
         params = hostapd.wpa2_eap_params(ssid="radius-test")
@@ -703,5 +654,120 @@ def test_radius_protocol(dev, apdev):
         connect(dev[0], "radius-test", wait_connect=False)
         time.sleep(1)
     finally:
-        t_events['stop'].set()
-        t.join()
+        srv.stop()
+
+def run_radius_auth_load(stations, rate, duration):
+    try:
+        import radius_load
+    except ImportError:
+        return "skip"
+    as_hapd = hostapd.Hostapd("as")
+    as_mib_start = as_hapd.get_mib(param="radius_server")
+    load = radius_load.RadiusAuthLoad(stations=stations, rate=rate)
+    res = load.run(duration=duration)
+    as_mib_end = as_hapd.get_mib(param="radius_server")
+    radius_load.log_report(res)
+    delta = radius_load.mib_delta(as_mib_start, as_mib_end)
+    logger.info("RADIUS server MIB changes: " + str(delta))
+    if res['accepts'] == 0:
+        raise Exception("No Access-Accept received")
+    if delta['radiusAuthServTotalAccessAccepts'] < res['accepts']:
+        raise Exception("Access-Accept count mismatch with RADIUS server MIB")
+    return res
+
+def test_radius_auth_load(dev, apdev):
+    """RADIUS authentication load against the integrated RADIUS server"""
+    res = run_radius_auth_load(stations=20, rate=10, duration=3)
+    if res == "skip":
+        return res
+    if res['timeouts'] > 0 or res['rejects'] > 0:
+        raise Exception("Unexpected failures at low request rate")
+
+def test_radius_auth_load_high(dev, apdev, params):
+    """RADIUS authentication load at high request rate [long]"""
+    if not params['long']:
+        logger.info("Skip test case with long duration due to --long not specified")
+        return "skip"
+    for rate in [ 10, 50, 100, 200 ]:
+        res = run_radius_auth_load(stations=1000, rate=rate, duration=10)
+        if res == "skip":
+            return res
+        if res['rejects'] > 0 or res['invalid'] > 0:
+            raise Exception("Unexpected Access-Reject or invalid response at rate %d" % rate)
+        if rate > 50:
+            continue
+        if res['timeouts'] > 0:
+            raise Exception("Access-Request timed out at rate %d" % rate)
+        if res['accepts'] < 0.9 * rate * 10:
+            raise Exception("Only %d Access-Accepts at rate %d" % (res['accepts'], rate))
+
+def test_radius_das_burst(dev, apdev):
+    """RADIUS Dynamic Authorization Extensions - Disconnect/CoA burst"""
+    try:
+        import radius_das_burst
+    except ImportError:
+        return "skip"
+
+    params = hostapd.wpa2_eap_params(ssid="radius-das")
+    params['radius_das_port'] = "3799"
+    params['radius_das_client'] = "127.0.0.1 secret"
+    params['radius_das_require_event_timestamp'] = "1"
+    params['own_ip_addr'] = "127.0.0.1"
+    params['nas_identifier'] = "nas.example.com"
+    hostapd.add_ap(apdev[0]['ifname'], params)
+    for i in range(3):
+        connect(dev[i], "radius-das")
+
+    logger.info("Disconnect-Request burst for unknown stations")
+    burst = radius_das_burst.DasBurst(rate=500, socks=4)
+    res = burst.run(radius_das_burst.station_requests(2000))
+    radius_das_burst.log_report(res)
+    if res['nak'] != 2000:
+        raise Exception("Not all Disconnect-Requests were NAK'ed")
+
+    logger.info("CoA-Request burst")
+    burst = radius_das_burst.DasBurst(coa=True, rate=500, socks=4)
+    res = burst.run(radius_das_burst.station_requests(500))
+    radius_das_burst.log_report(res)
+    if res['nak'] != 500:
+        raise Exception("Not all CoA-Requests were NAK'ed")
+
+    logger.info("Disconnect-Request for all associated stations")
+    reqs = [ { 'Calling_Station_Id': dev[i].p2p_interface_addr() }
+             for i in range(3) ]
+    burst = radius_das_burst.DasBurst(rate=100, socks=1)
+    res = burst.run(reqs)
+    radius_das_burst.log_report(res)
+    if res['ack'] != 3:
+        raise Exception("Disconnect-Request not ACK'ed for all stations")
+    for i in range(3):
+        ev = dev[i].wait_event(["CTRL-EVENT-DISCONNECTED"], timeout=10)
+        if ev is None:
+            raise Exception("Station not disconnected")
+
+def test_radius_das_burst_long(dev, apdev, params):
+    """RADIUS DAS Disconnect-Request rate scaling [long]"""
+    if not params['long']:
+        logger.info("Skip test case with long duration due to --long not specified")
+        return "skip"
+    try:
+        import radius_das_burst
+    except ImportError:
+        return "skip"
+
+    ap_params = hostapd.wpa2_eap_params(ssid="radius-das")
+    ap_params['radius_das_port'] = "3799"
+    ap_params['radius_das_client'] = "127.0.0.1 secret"
+    ap_params['radius_das_require_event_timestamp'] = "1"
+    ap_params['own_ip_addr'] = "127.0.0.1"
+    hostapd.add_ap(apdev[0]['ifname'], ap_params)
+    for rate in [ 1000, 5000, 20000 ]:
+        for socks in [ 1, 16 ]:
+            burst = radius_das_burst.DasBurst(rate=rate, socks=socks)
+            res = burst.run(radius_das_burst.station_requests(20000))
+            logger.info("rate=%d socks=%d" % (rate, socks))
+            radius_das_burst.log_report(res)
+            if res['timeout'] > 0:
+                raise Exception("%d DAS requests timed out (rate=%d socks=%d)" % (res['timeout'], rate, socks))
+            if res['ack'] + res['nak'] != 20000:
+                raise Exception("Not all DAS requests were ACK'ed or NAK'ed (rate=%d socks=%d)" % (rate, socks))
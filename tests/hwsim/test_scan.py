@@ -8,9 +8,12 @@ import time
 import logging
 logger = logging.getLogger()
 import os
+import json
 import subprocess
 
 import hostapd
+from bss_inject import BSSInjector, dense_specs
+from utils import get_pid, process_cpu_time, process_memory
 
 def check_scan(dev, params, other_started=False):
     if not other_started:
@@ -322,3 +325,139 @@ def test_scan_hidden(dev, apdev):
     check_scan(dev[0], "scan_id=%d,%d,%d freq=2412 use_id=1" % (id1, id2, id3))
     if "test-scan" not in dev[0].request("SCAN_RESULTS"):
         raise Exception("BSS not found in scan")
+
+def bss_ids(dev):
+    """Return the ids of all BSS table entries (in RANGE chunks since a
+    single BSS command reply is limited by the control interface buffer)"""
+    ids = []
+    first = 0
+    while True:
+        res = dev.request("BSS RANGE=%d- MASK=0x1" % first)
+        chunk = [ int(l.split('=')[1]) for l in res.splitlines()
+                  if l.startswith("id=") ]
+        if not chunk:
+            return ids
+        ids += chunk
+        first = chunk[-1] + 1
+
+def injected_scan(dev, logdir, count, bss_max_count, rounds, name):
+    """Scan repeatedly on a channel with count injected BSSes and record
+    scan time, wpa_supplicant CPU time, BSS table size, and wpa_supplicant
+    memory use"""
+    specs = dense_specs(count, channel=1, rates=[ 'g', 'g', 'b' ],
+                        ht=[ '20', None, '40+', '20' ],
+                        rsn=[ True, False ], interworking=[ False, True ],
+                        hessid="02:be:ff:ff:ff:ff")
+    pid = get_pid("/tmp/wpas-" + dev.ifname + " ")
+    inj = BSSInjector(1)
+    results = []
+    try:
+        inj.add(specs)
+        dev.request("SET bss_max_count %d" % bss_max_count)
+        dev.request("BSS_FLUSH 0")
+        inj.start()
+        for i in range(0, rounds):
+            dev.dump_monitor()
+            start = time.time()
+            cpu = process_cpu_time(pid)
+            if "OK" not in dev.request("SCAN TYPE=ONLY freq=2412 passive=1"):
+                raise Exception("Failed to start scan")
+            ev = dev.wait_event(["CTRL-EVENT-SCAN-RESULTS"], timeout=30)
+            if ev is None:
+                raise Exception("Scan timed out")
+            res = { 'scan_time': time.time() - start,
+                    'cpu': process_cpu_time(pid) - cpu }
+            start = time.time()
+            ids = bss_ids(dev)
+            res['bss_walk_time'] = time.time() - start
+            res['bss'] = len(ids)
+            res['mem'] = process_memory(pid)
+            results.append(res)
+            logger.info("Scan round %d: %.3f s (CPU %.3f s), %d BSS entries (%.3f s to read the table), VmRSS=%d kB" % (i, res['scan_time'], res['cpu'], res['bss'], res['bss_walk_time'], res['mem']['VmRSS']))
+            if res['bss'] > bss_max_count:
+                raise Exception("BSS table exceeds bss_max_count: %d" % res['bss'])
+        inj.stop()
+
+        # Verify that the generated elements were parsed as expected
+        for spec in specs[0:4]:
+            bss = dev.get_bss(spec.bssid)
+            if bss is None:
+                continue
+            if bss['ssid'] != spec.ssid:
+                raise Exception("Unexpected SSID for %s: %s" % (spec.bssid, bss['ssid']))
+            if spec.rsn and "WPA2-PSK-CCMP" not in bss['flags']:
+                raise Exception("RSN element not parsed for " + spec.bssid)
+        inj_stats = inj.stats()
+    finally:
+        inj.close()
+        dev.request("SET bss_max_count 200")
+        dev.request("BSS_FLUSH 0")
+
+    logger.info("Injected %d frames (%.0f frames/s, tx_fail=%d)" % (inj_stats['sent'], inj_stats.get('frames_per_sec', 0), inj_stats['tx_fail']))
+    summary = { 'injected_bss': count, 'bss_max_count': bss_max_count,
+                'injector': inj_stats, 'rounds': results }
+    with open(os.path.join(logdir, name + ".json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    if results[-1]['bss'] == 0:
+        raise Exception("No injected BSSes found in scan results")
+    return summary
+
+def test_scan_injected_dense(dev, apdev, params):
+    """Scan result processing with 500 injected BSSes"""
+    injected_scan(dev[0], params['logdir'], 500, 1000, 5,
+                  "scan-injected-dense")
+
+def test_scan_injected_bss_max_count(dev, apdev, params):
+    """BSS table limit (bss_max_count) with injected BSSes"""
+    res = injected_scan(dev[0], params['logdir'], 300, 50, 3,
+                        "scan-injected-bss-max-count")
+    if res['rounds'][-1]['bss'] != 50:
+        raise Exception("BSS table not filled up to bss_max_count")
+
+def test_scan_injected_dense_long(dev, apdev, params):
+    """Scan result processing with 5000 injected BSSes [long]"""
+    if not params['long']:
+        logger.info("Skip test case with long duration due to --long not specified")
+        return "skip"
+    # Note: cfg80211 may limit the number of BSS entries it keeps
+    # (bss_entries_limit), so the table size shows the smaller of the limits
+    injected_scan(dev[0], params['logdir'], 5000, 10000, 10,
+                  "scan-injected-dense-long")
+
+def injected_scan_scaling(dev, logdir, counts, rounds, name):
+    """Scan result processing time and CPU use as a function of the number
+    of injected BSSes; the BSS table is allowed to hold all of them"""
+    res = []
+    for count in counts:
+        summary = injected_scan(dev, logdir, count, 2 * count, rounds,
+                                "%s-%d" % (name, count))
+        # The first round populates the BSS table; the following rounds
+        # update existing entries
+        updates = summary['rounds'][1:]
+        entry = { 'injected_bss': count,
+                  'bss': summary['rounds'][-1]['bss'],
+                  'add_scan_time': summary['rounds'][0]['scan_time'],
+                  'add_cpu': summary['rounds'][0]['cpu'],
+                  'update_scan_time': sum([ r['scan_time'] for r in updates ]) / len(updates),
+                  'update_cpu': sum([ r['cpu'] for r in updates ]) / len(updates) }
+        if entry['bss']:
+            entry['update_cpu_per_bss'] = entry['update_cpu'] / entry['bss']
+        res.append(entry)
+        logger.info("%d injected BSSes: %d BSS entries, first scan %.3f s (CPU %.3f s), update scans %.3f s (CPU %.3f s)" % (count, entry['bss'], entry['add_scan_time'], entry['add_cpu'], entry['update_scan_time'], entry['update_cpu']))
+    with open(os.path.join(logdir, name + ".json"), "w") as f:
+        json.dump(res, f, indent=2)
+    return res
+
+def test_scan_injected_scaling(dev, apdev, params):
+    """Scan result processing time with a growing number of injected BSSes"""
+    injected_scan_scaling(dev[0], params['logdir'], [ 250, 500, 1000 ], 4,
+                          "scan-bss-table-scale")
+
+def test_scan_injected_scaling_long(dev, apdev, params):
+    """Scan result processing time with up to 8000 injected BSSes [long]"""
+    if not params['long']:
+        logger.info("Skip test case with long duration due to --long not specified")
+        return "skip"
+    injected_scan_scaling(dev[0], params['logdir'],
+                          [ 500, 1000, 2000, 4000, 8000 ], 6,
+                          "scan-bss-table-scale-long")
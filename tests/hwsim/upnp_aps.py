@@ -0,0 +1,121 @@
+# UPnP-enabled WPS APs in separate hostapd processes
+#
+# This software may be distributed under the terms of the BSD license.
+# See README for more details.
+
+import os
+import time
+import logging
+import subprocess
+
+import hostapd
+from hwsim import HWSimController, radio_ifname
+from utils import get_pid
+
+logger = logging.getLogger()
+
+HAPD = "../../hostapd/hostapd"
+
+def ap_uuid(i):
+    return "27ea801a-9e5c-4e73-bd82-%012x" % i
+
+def upnp_ap_params(i, ap_pin="12345670"):
+    return { "ssid": "wps-er-ap-%d" % i, "eap_server": "1", "wps_state": "2",
+             "wpa_passphrase": "12345678", "wpa": "2",
+             "wpa_key_mgmt": "WPA-PSK", "rsn_pairwise": "CCMP",
+             "device_name": "Wireless AP %d" % i, "manufacturer": "Company",
+             "model_name": "WAP", "model_number": "123",
+             "serial_number": "%05d" % i, "device_type": "6-0050F204-1",
+             "os_version": "01020300",
+             "config_methods": "label push_button",
+             "ap_pin": ap_pin, "uuid": ap_uuid(i), "upnp_iface": "lo",
+             "friendly_name": "WPS Access Point %d" % i,
+             "model_description": "Wireless Access Point" }
+
+class UPnPAPs(object):
+    """A set of WPS APs that are visible to an External Registrar as
+    separate UPnP devices
+
+    hostapd shares a single UPnP device between all BSSes of a process, so
+    each AP runs in its own hostapd process on its own mac80211_hwsim
+    radio. The configuration files are written with
+    hostapd.write_bss_conf()."""
+
+    def __init__(self, logdir, count):
+        self.logdir = logdir
+        self.hwsim = HWSimController()
+        self.radios = []
+        self.ifnames = []
+        self.procs = []
+        self.aps = []
+        try:
+            for i in range(0, count):
+                radio = self.hwsim.create_radio()
+                self.radios.append(radio)
+                self.ifnames.append(radio_ifname(radio))
+        except:
+            self.close()
+            raise
+
+    def _confname(self, i):
+        return os.path.join(self.logdir, "upnp-ap%d.conf" % i)
+
+    def start(self, params=None, timeout=10):
+        """Start the APs and return their Hostapd instances
+
+        params is an optional function returning the configuration
+        parameters for AP i (default: upnp_ap_params)."""
+        self.stop()
+        if params is None:
+            params = upnp_ap_params
+        for i in range(0, len(self.ifnames)):
+            bssid = "02:00:00:00:%02x:00" % self.radios[i]
+            hostapd.write_bss_conf(self._confname(i), self.ifnames[i], bssid,
+                                   params(i))
+            cmd = [ 'sudo', HAPD, '-ddKt', '-f',
+                    os.path.join(self.logdir, "hostapd-upnp-ap%d" % i),
+                    self._confname(i) ]
+            self.procs.append(subprocess.Popen(cmd))
+        end = time.time() + timeout
+        for ifname in self.ifnames:
+            path = os.path.join(hostapd.hapd_ctrl, ifname)
+            while not os.path.exists(path) and time.time() < end:
+                time.sleep(0.1)
+            hapd = hostapd.Hostapd(ifname)
+            while hapd.get_status_field("state") != "ENABLED":
+                if time.time() > end:
+                    raise Exception("AP startup timed out on " + ifname)
+                time.sleep(0.1)
+            self.aps.append(hapd)
+        return self.aps
+
+    def pid(self, i):
+        """Return the PID of the hostapd process of AP i"""
+        return get_pid(self._confname(i))
+
+    def stop(self):
+        for ap in self.aps:
+            ap.mon.close()
+            ap.ctrl.close()
+        for proc in self.procs:
+            subprocess.call([ 'sudo', 'kill', str(proc.pid) ])
+        for i in range(0, len(self.procs)):
+            proc = self.procs[i]
+            for j in range(0, 50):
+                if proc.poll() is not None:
+                    break
+                time.sleep(0.1)
+            else:
+                pid = self.pid(i)
+                if pid:
+                    subprocess.call([ 'sudo', 'kill', '-9', str(pid) ])
+                proc.wait()
+        self.aps = []
+        self.procs = []
+
+    def close(self):
+        self.stop()
+        for radio in self.radios:
+            self.hwsim.destroy_radio(radio)
+        self.radios = []
+        self.ifnames = []
@@ -0,0 +1,215 @@
+# SSDP and UPnP SOAP load generator for WPS UPnP
+#
+# This software may be distributed under the terms of the BSD license.
+# See README for more details.
+
+import base64
+import collections
+import httplib
+import logging
+import select
+import socket
+import StringIO
+import struct
+import threading
+import time
+import urlparse
+import xml.etree.ElementTree as ET
+
+from utils import latency_stats, format_latency_stats
+
+logger = logging.getLogger()
+
+SSDP_ADDR = ("239.255.255.250", 1900)
+WFA_DEVICE = "urn:schemas-wifialliance-org:device:WFADevice:1"
+WPS_SERVICE = "urn:schemas-wifialliance-org:service:WFAWLANConfig:1"
+SOAP_NS = "http://schemas.xmlsoap.org/soap/envelope/"
+
+def msearch(st, mx=1):
+    return '\r\n'.join([
+            'M-SEARCH * HTTP/1.1',
+            'HOST: 239.255.255.250:1900',
+            'MAN: "ssdp:discover"',
+            'MX: %d' % mx,
+            'ST: ' + st,
+            '', ''])
+
+def ssdp_socket():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 2)
+    sock.bind(("127.0.0.1", 0))
+    sock.setblocking(0)
+    return sock
+
+def ssdp_load(st, rate, count, mx=1, timeout=3):
+    """Send count M-SEARCH messages at the given rate (messages per second)
+    from new source ports and wait for the first reply to each of them
+
+    A message that gets no reply within mx + timeout seconds is counted as
+    dropped."""
+    msg = msearch(st, mx)
+    poll = select.poll()
+    socks = {}
+    order = collections.deque()
+    latency = []
+    sent = 0
+    send_fail = 0
+    bad = 0
+    dropped = 0
+    interval = 1.0 / rate
+    start = time.time()
+    while sent < count or socks:
+        now = time.time()
+        while sent < count and start + sent * interval <= now:
+            sent += 1
+            sock = ssdp_socket()
+            try:
+                sock.sendto(msg, SSDP_ADDR)
+            except socket.error:
+                send_fail += 1
+                sock.close()
+                continue
+            socks[sock.fileno()] = (sock, now)
+            order.append(sock.fileno())
+            poll.register(sock.fileno(), select.POLLIN)
+        while order and (order[0] not in socks or
+                         now - socks[order[0]][1] > mx + timeout):
+            fd = order.popleft()
+            if fd in socks:
+                dropped += 1
+                poll.unregister(fd)
+                socks.pop(fd)[0].close()
+        wait = 0.1
+        if sent < count:
+            wait = min(wait, start + sent * interval - now)
+        for fd, event in poll.poll(max(0, wait) * 1000):
+            sock, t = socks.pop(fd)
+            poll.unregister(fd)
+            try:
+                data = sock.recv(1000)
+            except socket.error:
+                data = None
+            sock.close()
+            if data and data.startswith("HTTP/1.1 200 OK\r\n"):
+                latency.append(time.time() - t)
+            else:
+                bad += 1
+    res = {}
+    res['sent'] = count
+    res['send_fail'] = send_fail
+    res['answered'] = len(latency)
+    res['bad'] = bad
+    res['dropped'] = dropped
+    res['elapsed'] = time.time() - start
+    res['latency'] = latency_stats(latency)
+    logger.info("SSDP load: rate=%d/s sent=%d answered=%d dropped=%d bad=%d send_fail=%d" % (rate, count, len(latency), dropped, bad, send_fail))
+    logger.info("SSDP M-SEARCH reply latency: " + format_latency_stats(res['latency']))
+    return res
+
+def soap_body(action, args=None):
+    ET.register_namespace('soapenv', SOAP_NS)
+    ET.register_namespace('wfa', WPS_SERVICE)
+    attrib = {}
+    attrib['{%s}encodingStyle' % SOAP_NS] = 'http://schemas.xmlsoap.org/soap/encoding/'
+    root = ET.Element("{%s}Envelope" % SOAP_NS, attrib=attrib)
+    body = ET.SubElement(root, "{%s}Body" % SOAP_NS)
+    act = ET.SubElement(body, "{%s}%s" % (WPS_SERVICE, action))
+    for name, value in (args or {}).items():
+        ET.SubElement(act, name).text = value
+    soap = StringIO.StringIO()
+    ET.ElementTree(root).write(soap, xml_declaration=True, encoding='utf-8')
+    return soap.getvalue()
+
+def put_message_args():
+    # Version and Message Type (M1) attributes; the registrar rejects this
+    # incomplete message, but the request goes through the full SOAP path
+    msg = struct.pack('>HHB', 0x104a, 1, 0x10) + \
+        struct.pack('>HHB', 0x1022, 1, 0x04)
+    return { "NewInMessage": base64.b64encode(msg) }
+
+class SoapLoad(object):
+    """Concurrent SOAP action calls to a WPS UPnP control URL
+
+    Each worker thread uses a single HTTP/1.1 connection and keeps using it
+    for the following requests unless the server closes it. The number of
+    requests that could reuse an existing connection is reported with the
+    response status codes and latency for each action."""
+
+    def __init__(self, control_url, actions, concurrency, timeout=5):
+        url = urlparse.urlparse(control_url)
+        self.netloc = url.netloc
+        self.path = url.path
+        self.requests = [ (action, soap_body(action, args))
+                          for action, args in actions ]
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.lock = threading.Lock()
+
+    def _next(self):
+        with self.lock:
+            if self.remaining <= 0 or time.time() > self.end:
+                return None
+            self.remaining -= 1
+            self.index += 1
+            return self.requests[self.index % len(self.requests)]
+
+    def _worker(self):
+        conn = httplib.HTTPConnection(self.netloc, timeout=self.timeout)
+        while True:
+            req = self._next()
+            if req is None:
+                break
+            action, body = req
+            headers = { "Content-type": 'text/xml; charset="utf-8"',
+                        "Connection": "keep-alive",
+                        "SOAPAction": '"%s#%s"' % (WPS_SERVICE, action) }
+            reused = conn.sock is not None
+            start = time.time()
+            try:
+                conn.request("POST", self.path, body, headers)
+                resp = conn.getresponse()
+                resp.read()
+                status = resp.status
+            except (socket.error, httplib.HTTPException):
+                conn.close()
+                status = "error"
+            with self.lock:
+                stats = self.stats[action]
+                stats['status'][status] = stats['status'].get(status, 0) + 1
+                if status != "error":
+                    stats['latency'].append(time.time() - start)
+                if reused:
+                    stats['reused'] += 1
+        conn.close()
+
+    def run(self, count=None, duration=None):
+        self.remaining = count if count is not None else 1 << 30
+        self.end = time.time() + duration if duration else 1 << 62
+        self.index = 0
+        self.stats = dict([ (action, { 'status': {}, 'latency': [],
+                                       'reused': 0 })
+                            for action, body in self.requests ])
+        start = time.time()
+        threads = [ threading.Thread(target=self._worker)
+                    for i in range(0, self.concurrency) ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.time() - start
+        res = { 'elapsed': elapsed, 'actions': {} }
+        total = 0
+        for action, stats in self.stats.items():
+            count = sum(stats['status'].values())
+            total += count
+            res['actions'][action] = { 'requests': count,
+                                       'status': stats['status'],
+                                       'reused': stats['reused'],
+                                       'latency': latency_stats(stats['latency']) }
+            logger.info("SOAP %s: requests=%d reused_connections=%d status=%s" % (action, count, stats['reused'], str(stats['status'])))
+            logger.info("SOAP %s latency: %s" % (action, format_latency_stats(res['actions'][action]['latency'])))
+        res['requests'] = total
+        res['per_sec'] = total / elapsed
+        logger.info("SOAP load: %d requests with %d connections in %.2f s (%.1f requests/s)" % (total, self.concurrency, elapsed, res['per_sec']))
+        return res
@@ -4,6 +4,9 @@
 # This software may be distributed under the terms of the BSD license.
 # See README for more details.
 
+import os
+import time
+
 def get_ifnames():
     ifnames = []
     with open("/proc/net/dev", "r") as f:
@@ -13,3 +16,95 @@ def get_ifnames():
             if len(val) == 2:
                 ifnames.append(val[0].strip(' '))
     return ifnames
+
+def percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return None
+    idx = int(round(pct / 100.0 * (len(sorted_samples) - 1)))
+    return sorted_samples[idx]
+
+def latency_stats(samples):
+    vals = sorted(samples)
+    stats = { 'count': len(vals) }
+    if not vals:
+        return stats
+    stats['min'] = vals[0]
+    stats['max'] = vals[-1]
+    stats['avg'] = sum(vals) / len(vals)
+    for pct in [ 50, 90, 99 ]:
+        stats['p' + str(pct)] = percentile(vals, pct)
+    return stats
+
+def format_latency_stats(stats):
+    if stats['count'] == 0:
+        return "count=0"
+    return "count=%d min=%.3f avg=%.3f p50=%.3f p90=%.3f p99=%.3f max=%.3f ms" % (stats['count'], stats['min'] * 1000, stats['avg'] * 1000, stats['p50'] * 1000, stats['p90'] * 1000, stats['p99'] * 1000, stats['max'] * 1000)
+
+def get_pid(pattern):
+    """Return the PID of a process with pattern in its command line (other
+    than a sudo wrapper) or None if no such process is found"""
+    for name in os.listdir("/proc"):
+        if not name.isdigit() or int(name) == os.getpid():
+            continue
+        try:
+            with open(os.path.join("/proc", name, "cmdline"), "r") as f:
+                args = f.read().split('\0')
+        except IOError:
+            continue
+        if os.path.basename(args[0]) == "sudo":
+            continue
+        if pattern in ' '.join(args):
+            return int(name)
+    return None
+
+def process_cpu_time(pid):
+    """Return the user+system CPU time (seconds) used by a process"""
+    with open("/proc/%d/stat" % pid, "r") as f:
+        # skip pid and comm since comm may include spaces
+        vals = f.read().rsplit(')', 1)[1].split()
+    return (int(vals[11]) + int(vals[12])) / float(os.sysconf('SC_CLK_TCK'))
+
+def process_memory(pid):
+    """Return the VmRSS and VmData (kB) of a process"""
+    vals = {}
+    with open("/proc/%d/status" % pid, "r") as f:
+        for l in f:
+            name, val = l.split(':', 1)
+            if name in [ "VmRSS", "VmData" ]:
+                vals[name] = int(val.split()[0])
+    return vals
+
+def timed_reconnect(dev, pid, count):
+    """Reconnect count times and return the connection time and hostapd
+    CPU time per reconnection"""
+    conn = []
+    cpu = []
+    for i in range(0, count):
+        dev.request("DISCONNECT")
+        dev.wait_event(["CTRL-EVENT-DISCONNECTED"], timeout=5)
+        dev.dump_monitor()
+        cpu_start = process_cpu_time(pid)
+        t = time.time()
+        dev.request("RECONNECT")
+        ev = dev.wait_event(["CTRL-EVENT-CONNECTED",
+                             "WPA: 4-Way Handshake failed"], timeout=15)
+        if ev is None or "CTRL-EVENT-CONNECTED" not in ev:
+            raise Exception("Reconnection failed")
+        conn.append(time.time() - t)
+        cpu.append(process_cpu_time(pid) - cpu_start)
+    return latency_stats(conn), latency_stats(cpu)
+
+def wait_reconnect(devs, start, timeout=15):
+    """Wait for each station to be disconnected and connected again (e.g.,
+    after hostapd RELOAD deauthenticated them) and return the time from
+    start to the reconnection of each station"""
+    res = []
+    for dev in devs:
+        ev = dev.wait_event(["CTRL-EVENT-DISCONNECTED"], timeout=timeout)
+        if ev is None:
+            raise Exception("No disconnection reported for " + dev.ifname)
+        ev = dev.wait_event(["CTRL-EVENT-CONNECTED"], timeout=timeout)
+        if ev is None:
+            raise Exception("No reconnection reported for " + dev.ifname)
+        res.append(time.time() - start)
+    return res
@@ -9,13 +9,41 @@ import time
 import logging
 import binascii
 import re
-import struct
 import subprocess
 import wpaspy
+import frames
 
 logger = logging.getLogger()
 wpas_ctrl = '/var/run/wpa_supplicant'
 
+# Network block parameters that connect() sets with and without quotes
+NETWORK_QUOTED = [ "psk", "identity", "anonymous_identity", "password",
+                   "ca_cert", "client_cert", "private_key",
+                   "private_key_passwd", "ca_cert2", "client_cert2",
+                   "private_key2", "phase1", "phase2", "domain_suffix_match",
+                   "altsubject_match", "subject_match", "pac_file", "dh_file",
+                   "bgscan", "ht_mcs", "id_str" ]
+NETWORK_NOT_QUOTED = [ "proto", "key_mgmt", "ieee80211w", "pairwise",
+                       "group", "wep_key0", "scan_freq", "eap",
+                       "eapol_flags", "fragment_size", "scan_ssid", "auth_alg",
+                       "wpa_ptk_rekey", "disable_ht", "disable_vht", "bssid",
+                       "disable_max_amsdu", "ampdu_factor", "ampdu_density",
+                       "disable_ht40", "disable_sgi", "disable_ldpc",
+                       "ht40_intolerant", "update_identifier" ]
+
+_ctrl_group = None
+
+def ctrl_group():
+    """Group for dynamically added control interfaces; looked up once"""
+    global _ctrl_group
+    if _ctrl_group is None:
+        try:
+            groups = subprocess.check_output(["id"])
+            _ctrl_group = "admin" if "(admin)" in groups else "adm"
+        except Exception, e:
+            _ctrl_group = "admin"
+    return _ctrl_group
+
 class WpaSupplicant:
     def __init__(self, ifname=None, global_iface=None):
         self.group_ifname = None
@@ -44,12 +72,7 @@ class WpaSupplicant:
             self.ifname = None
 
     def interface_add(self, ifname, config="", driver="nl80211", drv_params=None):
-        try:
-            groups = subprocess.check_output(["id"])
-            group = "admin" if "(admin)" in groups else "adm"
-        except Exception, e:
-            group = "admin"
-        cmd = "INTERFACE_ADD " + ifname + "\t" + config + "\t" + driver + "\tDIR=/var/run/wpa_supplicant GROUP=" + group
+        cmd = "INTERFACE_ADD " + ifname + "\t" + config + "\t" + driver + "\tDIR=/var/run/wpa_supplicant GROUP=" + ctrl_group()
         if drv_params:
             cmd = cmd + '\t' + drv_params
         if "FAIL" in self.global_request(cmd):
@@ -572,6 +595,8 @@ class WpaSupplicant:
         while self.mon.pending():
             ev = self.mon.recv()
             logger.debug(self.ifname + ": " + ev)
+        if self.global_iface is None:
+            return
         while self.global_mon.pending():
             ev = self.global_mon.recv()
             logger.debug(self.ifname + "(global): " + ev)
@@ -652,24 +677,11 @@ class WpaSupplicant:
         elif ssid2:
             self.set_network(id, "ssid", ssid2)
 
-        quoted = [ "psk", "identity", "anonymous_identity", "password",
-                   "ca_cert", "client_cert", "private_key",
-                   "private_key_passwd", "ca_cert2", "client_cert2",
-                   "private_key2", "phase1", "phase2", "domain_suffix_match",
-                   "altsubject_match", "subject_match", "pac_file", "dh_file",
-                   "bgscan", "ht_mcs", "id_str" ]
-        for field in quoted:
+        for field in NETWORK_QUOTED:
             if field in kwargs and kwargs[field]:
                 self.set_network_quoted(id, field, kwargs[field])
 
-        not_quoted = [ "proto", "key_mgmt", "ieee80211w", "pairwise",
-                       "group", "wep_key0", "scan_freq", "eap",
-                       "eapol_flags", "fragment_size", "scan_ssid", "auth_alg",
-                       "wpa_ptk_rekey", "disable_ht", "disable_vht", "bssid",
-                       "disable_max_amsdu", "ampdu_factor", "ampdu_density",
-                       "disable_ht40", "disable_sgi", "disable_ldpc",
-                       "ht40_intolerant", "update_identifier" ]
-        for field in not_quoted:
+        for field in NETWORK_NOT_QUOTED:
             if field in kwargs and kwargs[field]:
                 self.set_network(id, field, kwargs[field])
 
@@ -845,28 +857,10 @@ class WpaSupplicant:
         ev = self.wait_event(["MGMT-RX"], timeout=timeout)
         if ev is None:
             return None
-        msg = {}
         items = ev.split(' ')
         field,val = items[1].split('=')
         if field != "freq":
             raise Exception("Unexpected MGMT-RX event format: " + ev)
-        msg['freq'] = val
-        frame = binascii.unhexlify(items[4])
-        msg['frame'] = frame
-
-        hdr = struct.unpack('<HH6B6B6BH', frame[0:24])
-        msg['fc'] = hdr[0]
-        msg['subtype'] = (hdr[0] >> 4) & 0xf
-        hdr = hdr[1:]
-        msg['duration'] = hdr[0]
-        hdr = hdr[1:]
-        msg['da'] = "%02x:%02x:%02x:%02x:%02x:%02x" % hdr[0:6]
-        hdr = hdr[6:]
-        msg['sa'] = "%02x:%02x:%02x:%02x:%02x:%02x" % hdr[0:6]
-        hdr = hdr[6:]
-        msg['bssid'] = "%02x:%02x:%02x:%02x:%02x:%02x" % hdr[0:6]
-        hdr = hdr[6:]
-        msg['seq_ctrl'] = hdr[0]
-        msg['payload'] = frame[24:]
-
+        msg = frames.MgmtFrame.parse(binascii.unhexlify(items[4]))
+        msg.freq = val
         return msg
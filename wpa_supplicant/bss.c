@@ -192,6 +192,7 @@ static void wpa_bss_remove(struct wpa_supplicant *wpa_s, struct wpa_bss *bss,
 	}
 	dl_list_del(&bss->list);
 	dl_list_del(&bss->list_id);
+	dl_list_del(&bss->list_hash);
 	wpa_s->num_bss--;
 	wpa_dbg(wpa_s, MSG_DEBUG, "BSS: Remove id %u BSSID " MACSTR
 		" SSID '%s' due to %s", bss->id, MAC2STR(bss->bssid),
@@ -216,7 +217,8 @@ struct wpa_bss * wpa_bss_get(struct wpa_supplicant *wpa_s, const u8 *bssid,
 	struct wpa_bss *bss;
 	if (!wpa_supplicant_filter_bssid_match(wpa_s, bssid))
 		return NULL;
-	dl_list_for_each(bss, &wpa_s->bss, struct wpa_bss, list) {
+	dl_list_for_each(bss, &wpa_s->bss_hash[WPA_BSS_HASH(bssid)],
+			 struct wpa_bss, list_hash) {
 		if (os_memcmp(bss->bssid, bssid, ETH_ALEN) == 0 &&
 		    bss->ssid_len == ssid_len &&
 		    os_memcmp(bss->ssid, ssid, ssid_len) == 0)
@@ -355,6 +357,8 @@ static struct wpa_bss * wpa_bss_add(struct wpa_supplicant *wpa_s,
 
 	dl_list_add_tail(&wpa_s->bss, &bss->list);
 	dl_list_add_tail(&wpa_s->bss_id, &bss->list_id);
+	dl_list_add_tail(&wpa_s->bss_hash[WPA_BSS_HASH(bss->bssid)],
+			 &bss->list_hash);
 	wpa_s->num_bss++;
 	wpa_dbg(wpa_s, MSG_DEBUG, "BSS: Add new id %u BSSID " MACSTR
 		" SSID '%s'",
@@ -504,8 +508,9 @@ wpa_bss_update(struct wpa_supplicant *wpa_s, struct wpa_bss *bss,
 	bss->scan_miss_count = 0;
 	bss->last_update_idx = wpa_s->bss_update_idx;
 	wpa_bss_copy_res(bss, res, fetch_time);
-	/* Move the entry to the end of the list */
+	/* Move the entry to the end of the list and its hash chain */
 	dl_list_del(&bss->list);
+	dl_list_del(&bss->list_hash);
 #ifdef CONFIG_P2P
 	if (wpa_bss_get_vendor_ie(bss, P2P_IE_VENDOR_TYPE) &&
 	    !wpa_scan_get_vendor_ie(res, P2P_IE_VENDOR_TYPE)) {
@@ -554,6 +559,8 @@ wpa_bss_update(struct wpa_supplicant *wpa_s, struct wpa_bss *bss,
 	if (changes & WPA_BSS_IES_CHANGED_FLAG)
 		wpa_bss_set_hessid(bss);
 	dl_list_add_tail(&wpa_s->bss, &bss->list);
+	dl_list_add_tail(&wpa_s->bss_hash[WPA_BSS_HASH(bss->bssid)],
+			 &bss->list_hash);
 
 	notify_bss_changes(wpa_s, changes, bss);
 
@@ -647,16 +654,15 @@ void wpa_bss_update_scan_res(struct wpa_supplicant *wpa_s,
 	if (bss == NULL)
 		bss = wpa_bss_add(wpa_s, ssid + 2, ssid[1], res, fetch_time);
 	else {
+		/*
+		 * An entry that was already added or updated in this round is
+		 * already in last_scan_res.
+		 */
+		int seen = bss->last_update_idx == wpa_s->bss_update_idx;
+
 		bss = wpa_bss_update(wpa_s, bss, res, fetch_time);
-		if (wpa_s->last_scan_res) {
-			unsigned int i;
-			for (i = 0; i < wpa_s->last_scan_res_used; i++) {
-				if (bss == wpa_s->last_scan_res[i]) {
-					/* Already in the list */
-					return;
-				}
-			}
-		}
+		if (seen)
+			return;
 	}
 
 	if (bss == NULL)
@@ -809,8 +815,12 @@ static void wpa_bss_timeout(void *eloop_ctx, void *timeout_ctx)
  */
 int wpa_bss_init(struct wpa_supplicant *wpa_s)
 {
+	unsigned int i;
+
 	dl_list_init(&wpa_s->bss);
 	dl_list_init(&wpa_s->bss_id);
+	for (i = 0; i < WPA_BSS_HASH_SIZE; i++)
+		dl_list_init(&wpa_s->bss_hash[i]);
 	eloop_register_timeout(WPA_BSS_EXPIRATION_PERIOD, 0,
 			       wpa_bss_timeout, wpa_s, NULL);
 	return 0;
@@ -861,7 +871,8 @@ struct wpa_bss * wpa_bss_get_bssid(struct wpa_supplicant *wpa_s,
 	struct wpa_bss *bss;
 	if (!wpa_supplicant_filter_bssid_match(wpa_s, bssid))
 		return NULL;
-	dl_list_for_each_reverse(bss, &wpa_s->bss, struct wpa_bss, list) {
+	dl_list_for_each_reverse(bss, &wpa_s->bss_hash[WPA_BSS_HASH(bssid)],
+				 struct wpa_bss, list_hash) {
 		if (os_memcmp(bss->bssid, bssid, ETH_ALEN) == 0)
 			return bss;
 	}
@@ -886,7 +897,8 @@ struct wpa_bss * wpa_bss_get_bssid_latest(struct wpa_supplicant *wpa_s,
 	struct wpa_bss *bss, *found = NULL;
 	if (!wpa_supplicant_filter_bssid_match(wpa_s, bssid))
 		return NULL;
-	dl_list_for_each_reverse(bss, &wpa_s->bss, struct wpa_bss, list) {
+	dl_list_for_each_reverse(bss, &wpa_s->bss_hash[WPA_BSS_HASH(bssid)],
+				 struct wpa_bss, list_hash) {
 		if (os_memcmp(bss->bssid, bssid, ETH_ALEN) != 0)
 			continue;
 		if (found == NULL ||
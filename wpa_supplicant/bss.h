@@ -54,6 +54,8 @@ struct wpa_bss {
 	struct dl_list list;
 	/** List entry for struct wpa_supplicant::bss_id */
 	struct dl_list list_id;
+	/** List entry for struct wpa_supplicant::bss_hash */
+	struct dl_list list_hash;
 	/** Unique identifier for this BSS entry */
 	unsigned int id;
 	/** Number of counts without seeing this BSS */
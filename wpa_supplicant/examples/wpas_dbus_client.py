@@ -0,0 +1,282 @@
+#!/usr/bin/python
+#
+# wpa_supplicant D-Bus client with property caching
+#
+# This software may be distributed under the terms of the BSD license.
+# See README for more details.
+
+import dbus
+import sys
+import urllib
+import gobject
+from dbus.mainloop.glib import DBusGMainLoop
+
+WPAS_DBUS_SERVICE = "fi.w1.wpa_supplicant1"
+WPAS_DBUS_INTERFACE = "fi.w1.wpa_supplicant1"
+WPAS_DBUS_OPATH = "/fi/w1/wpa_supplicant1"
+
+WPAS_DBUS_INTERFACES_INTERFACE = "fi.w1.wpa_supplicant1.Interface"
+WPAS_DBUS_P2PDEVICE_INTERFACE = "fi.w1.wpa_supplicant1.Interface.P2PDevice"
+WPAS_DBUS_BSS_INTERFACE = "fi.w1.wpa_supplicant1.BSS"
+WPAS_DBUS_NETWORK_INTERFACE = "fi.w1.wpa_supplicant1.Network"
+WPAS_DBUS_PEER_INTERFACE = "fi.w1.wpa_supplicant1.Peer"
+
+# Signals that announce a new object (path, properties) or a new object
+# whose properties need to be fetched (path only)
+ADDED_SIGNALS = { "InterfaceAdded": WPAS_DBUS_INTERFACES_INTERFACE,
+		  "BSSAdded": WPAS_DBUS_BSS_INTERFACE,
+		  "NetworkAdded": WPAS_DBUS_NETWORK_INTERFACE }
+FETCH_SIGNALS = { "DeviceFound": WPAS_DBUS_PEER_INTERFACE }
+REMOVED_SIGNALS = [ "InterfaceRemoved", "BSSRemoved", "NetworkRemoved",
+		    "DeviceLost" ]
+
+def byte_array_to_string(s):
+	r = ""
+	for c in s:
+		if c >= 32 and c < 127:
+			r += "%c" % c
+		else:
+			r += urllib.quote(chr(c))
+	return r
+
+def mac_to_string(val):
+	return ':'.join([ "%02x" % b for b in val ])
+
+class WpasClient(object):
+	"""wpa_supplicant D-Bus client that keeps a local copy of object
+	properties
+
+	Objects are loaded with one GetAll call per object (or taken directly
+	from the properties included in InterfaceAdded/BSSAdded/NetworkAdded
+	signals) and the cache is updated from PropertiesChanged signals
+	instead of fetching the properties again. Methods take optional
+	reply_handler and error_handler arguments; when they are given, the
+	call is made asynchronously from the GLib main loop, otherwise the
+	call blocks and returns the result. The number of method calls sent
+	is available in the calls attribute."""
+
+	def __init__(self, bus=None):
+		self.bus = bus or dbus.SystemBus()
+		self.cache = {}
+		self.callbacks = {}
+		self.calls = 0
+		self.bus.add_signal_receiver(self._signal,
+					     bus_name=WPAS_DBUS_SERVICE,
+					     interface_keyword='interface',
+					     member_keyword='member',
+					     path_keyword='path')
+		self.wpas_obj = self.bus.get_object(WPAS_DBUS_SERVICE,
+						    WPAS_DBUS_OPATH)
+
+	def connect_signal(self, member, callback):
+		"""Call callback(path, *args) for signal member after the cache
+		has been updated"""
+		self.callbacks.setdefault(member, []).append(callback)
+
+	def _signal(self, *args, **kwargs):
+		interface = kwargs['interface']
+		member = kwargs['member']
+		path = kwargs['path']
+		if member == "PropertiesChanged":
+			if interface != dbus.PROPERTIES_IFACE:
+				# Per-interface copy of the same change
+				return
+			iface, changed, invalidated = args
+			props = self.cache.get(path, {}).get(iface)
+			if props is not None:
+				props.update(changed)
+				for name in invalidated:
+					props.pop(name, None)
+		elif member in ADDED_SIGNALS:
+			self.cache.setdefault(args[0], {})[ADDED_SIGNALS[member]] = dict(args[1])
+		elif member in FETCH_SIGNALS:
+			self.get_all(args[0], FETCH_SIGNALS[member],
+				     reply_handler=lambda props: None,
+				     error_handler=lambda err: None)
+		elif member in REMOVED_SIGNALS:
+			self.cache.pop(args[0], None)
+		for callback in self.callbacks.get(member, []):
+			callback(path, *args)
+
+	def _call(self, path, interface, method, args, reply_handler,
+		  error_handler, reply=None):
+		self.calls += 1
+		obj = self.bus.get_object(WPAS_DBUS_SERVICE, path,
+					  introspect=False)
+		func = obj.get_dbus_method(method, interface)
+		if reply_handler is None:
+			res = func(*args)
+			return reply(res) if reply else res
+		if reply:
+			handler = lambda *res: reply_handler(reply(*res))
+		else:
+			handler = reply_handler
+		func(*args, reply_handler=handler,
+		     error_handler=error_handler or (lambda err: None))
+
+	def get_all(self, path, interface, reply_handler=None,
+		    error_handler=None, refresh=False):
+		"""Return the properties of an object, using the cached copy if
+		available"""
+		props = self.cache.get(path, {}).get(interface)
+		if props is not None and not refresh:
+			if reply_handler:
+				reply_handler(props)
+				return
+			return props
+		def store(res):
+			props = dict(res)
+			self.cache.setdefault(path, {})[interface] = props
+			return props
+		return self._call(path, dbus.PROPERTIES_IFACE, "GetAll",
+				  [ interface ], reply_handler, error_handler,
+				  reply=store)
+
+	def load(self, paths, interface, callback):
+		"""Fetch the properties of all objects that are not yet cached
+		with concurrent GetAll calls and call callback(props_list) once
+		all replies have been received"""
+		pending = [ p for p in paths
+			    if interface not in self.cache.get(p, {}) ]
+		state = { 'left': len(pending) }
+		def done(res=None):
+			state['left'] -= 1
+			if state['left'] <= 0:
+				callback([ self.cache.get(p, {}).get(interface)
+					   for p in paths ])
+		if not pending:
+			callback([ self.cache[p][interface] for p in paths ])
+			return
+		for path in pending:
+			self.get_all(path, interface, reply_handler=done,
+				     error_handler=lambda err: done())
+
+	def get_interface(self, ifname):
+		self.calls += 1
+		wpas = dbus.Interface(self.wpas_obj, WPAS_DBUS_INTERFACE)
+		return wpas.GetInterface(ifname)
+
+	def interface(self, path):
+		return self.get_all(path, WPAS_DBUS_INTERFACES_INTERFACE)
+
+	def bsses(self, path, callback=None):
+		"""Return (or pass to callback) the properties of all BSSes of an
+		interface"""
+		paths = self.interface(path)['BSSs']
+		if callback:
+			self.load(paths, WPAS_DBUS_BSS_INTERFACE, callback)
+			return
+		return [ self.get_all(p, WPAS_DBUS_BSS_INTERFACE) for p in paths ]
+
+	def peers(self, path, callback=None):
+		"""Return (or pass to callback) the properties of all P2P peers
+		known to an interface"""
+		self.calls += 1
+		obj = self.bus.get_object(WPAS_DBUS_SERVICE, path)
+		paths = obj.Get(WPAS_DBUS_P2PDEVICE_INTERFACE, 'Peers',
+				dbus_interface=dbus.PROPERTIES_IFACE)
+		if callback:
+			self.load(paths, WPAS_DBUS_PEER_INTERFACE, callback)
+			return
+		return [ self.get_all(p, WPAS_DBUS_PEER_INTERFACE) for p in paths ]
+
+	# Interface operations
+
+	def scan(self, path, args, **kwargs):
+		return self._call(path, WPAS_DBUS_INTERFACES_INTERFACE, "Scan",
+				  [ dbus.Dictionary(args, signature='sv') ], kwargs.get('reply_handler'),
+				  kwargs.get('error_handler'))
+
+	def disconnect(self, path, **kwargs):
+		return self._call(path, WPAS_DBUS_INTERFACES_INTERFACE,
+				  "Disconnect", [], kwargs.get('reply_handler'),
+				  kwargs.get('error_handler'))
+
+	def add_network(self, path, args, **kwargs):
+		return self._call(path, WPAS_DBUS_INTERFACES_INTERFACE,
+				  "AddNetwork",
+				  [ dbus.Dictionary(args, signature='sv') ],
+				  kwargs.get('reply_handler'),
+				  kwargs.get('error_handler'))
+
+	def select_network(self, path, network, **kwargs):
+		return self._call(path, WPAS_DBUS_INTERFACES_INTERFACE,
+				  "SelectNetwork", [ network ],
+				  kwargs.get('reply_handler'),
+				  kwargs.get('error_handler'))
+
+	def remove_network(self, path, network, **kwargs):
+		return self._call(path, WPAS_DBUS_INTERFACES_INTERFACE,
+				  "RemoveNetwork", [ network ],
+				  kwargs.get('reply_handler'),
+				  kwargs.get('error_handler'))
+
+	# P2P Device operations
+
+	def p2p_find(self, path, args=None, **kwargs):
+		return self._call(path, WPAS_DBUS_P2PDEVICE_INTERFACE, "Find",
+				  [ dbus.Dictionary(args or {}, signature='sv') ],
+				  kwargs.get('reply_handler'),
+				  kwargs.get('error_handler'))
+
+	def p2p_stop_find(self, path, **kwargs):
+		return self._call(path, WPAS_DBUS_P2PDEVICE_INTERFACE,
+				  "StopFind", [], kwargs.get('reply_handler'),
+				  kwargs.get('error_handler'))
+
+	def p2p_listen(self, path, timeout, **kwargs):
+		return self._call(path, WPAS_DBUS_P2PDEVICE_INTERFACE, "Listen",
+				  [ dbus.Int32(timeout) ],
+				  kwargs.get('reply_handler'),
+				  kwargs.get('error_handler'))
+
+	def p2p_flush(self, path, **kwargs):
+		return self._call(path, WPAS_DBUS_P2PDEVICE_INTERFACE, "Flush",
+				  [], kwargs.get('reply_handler'),
+				  kwargs.get('error_handler'))
+
+	def p2p_connect(self, path, args, **kwargs):
+		return self._call(path, WPAS_DBUS_P2PDEVICE_INTERFACE, "Connect",
+				  [ dbus.Dictionary(args, signature='sv') ],
+				  kwargs.get('reply_handler'),
+				  kwargs.get('error_handler'))
+
+def show_bss(props):
+	wpa = "yes" if props.get('WPA') else "no"
+	wpa2 = "yes" if props.get('RSN') else "no"
+	rates = props.get('Rates', [])
+	maxrate = rates[0] / 1000000 if len(rates) > 0 else 0
+	print "  %s  ::  ssid='%s'  wpa=%s  wpa2=%s  signal=%d  rate=%d  freq=%d" % (mac_to_string(props['BSSID']), byte_array_to_string(props['SSID']), wpa, wpa2, props['Signal'], maxrate, props['Frequency'])
+
+def main():
+	if len(sys.argv) != 2:
+		print "Usage: %s <ifname>" % sys.argv[0]
+		sys.exit(1)
+
+	DBusGMainLoop(set_as_default=True)
+	client = WpasClient()
+	path = client.get_interface(sys.argv[1])
+	loop = gobject.MainLoop()
+
+	def bss_list(props_list):
+		for props in props_list:
+			if props is not None:
+				show_bss(props)
+		print "%d BSSes with %d D-Bus method calls" % (len(props_list),
+							       client.calls)
+		loop.quit()
+
+	def scan_done(path, success):
+		print "Scan done: success=%s" % success
+		client.bsses(path, callback=bss_list)
+
+	def bss_added(path, bss, properties):
+		print "BSS added: %s" % bss
+
+	client.connect_signal("ScanDone", scan_done)
+	client.connect_signal("BSSAdded", bss_added)
+	client.scan(path, { 'Type': 'passive' })
+	loop.run()
+
+if __name__ == "__main__":
+	main()
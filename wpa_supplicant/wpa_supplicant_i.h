@@ -469,6 +469,10 @@ struct wpa_supplicant {
 				 struct wpa_scan_results *scan_res);
 	struct dl_list bss; /* struct wpa_bss::list */
 	struct dl_list bss_id; /* struct wpa_bss::list_id */
+#define WPA_BSS_HASH_SIZE 256
+#define WPA_BSS_HASH(bssid) ((bssid)[5])
+	/* struct wpa_bss::list_hash; each chain in struct wpa_bss::list order */
+	struct dl_list bss_hash[WPA_BSS_HASH_SIZE];
 	size_t num_bss;
 	unsigned int bss_update_idx;
 	unsigned int bss_next_id;